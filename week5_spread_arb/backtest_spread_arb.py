@@ -1,7 +1,8 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from price_store import PriceStore
+from signals import generate_positions
 from utils import calculate_sharpe, calculate_sortino, calculate_hit_ratio, calculate_max_drawdown, calculate_calmar
 
 
@@ -15,6 +16,9 @@ class PairBacktester:
         self.file1 = os.path.join(self.data_dir, file1)
         self.file2 = os.path.join(self.data_dir, file2)
 
+        # Columnar cache of the CSVs (parsed once, then memory-mapped)
+        self.price_store = PriceStore(os.path.join(self.data_dir, ".price_store"))
+
         # Extract asset labels from filenames
         self.label1 = os.path.splitext(file1)[0].upper()
         self.label2 = os.path.splitext(file2)[0].upper()
@@ -43,11 +47,9 @@ class PairBacktester:
 
     
     def load_data(self):
-        df1 = pd.read_csv(self.file1, index_col=0, parse_dates=True)
-        df2 = pd.read_csv(self.file2, index_col=0, parse_dates=True)
         self.data = pd.DataFrame({
-            self.label1: df1["Close"] if "Close" in df1.columns else df1.iloc[:, 0],
-            self.label2: df2["Close"] if "Close" in df2.columns else df2.iloc[:, 0],
+            self.label1: self.price_store.load_close(self.file1),
+            self.label2: self.price_store.load_close(self.file2),
         }).dropna()
 
 
@@ -66,22 +68,9 @@ class PairBacktester:
     def generate_signals(self):
         z_score_lagged = self.z_score.shift(1)
 
-        entry_long = z_score_lagged < -self.z_entry
-        entry_short = z_score_lagged > self.z_entry
-        exit = (z_score_lagged > -self.z_exit) & (z_score_lagged < self.z_exit)
-
-        position = []
-        current_pos = 0
-
-        for long_sig, short_sig, exit_sig in zip(entry_long, entry_short, exit):
-            if exit_sig:
-                current_pos = 0
-            elif long_sig:
-                current_pos = 1
-            elif short_sig:
-                current_pos = -1
-            position.append(current_pos)
-        
+        # Vectorized state machine: encode entry/exit signals and carry the last state forward
+        position = generate_positions(z_score_lagged.to_numpy(), self.z_entry, self.z_exit)
+
         self.position = pd.Series(position, index=self.data.index)
     
 
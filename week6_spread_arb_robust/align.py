@@ -0,0 +1,116 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Alignment of N price series on one calendar, with integer-indexed joins:
+#   - timestamps are the PriceStore int64 UTC nanoseconds (timezones are resolved once, at conversion)
+#   - the union calendar is a single stable sort of the concatenated (already sorted) arrays, which
+#     merges the sorted runs, then de-duplicated; each symbol is scattered into its rows with searchsorted
+#   - fill policies:
+#       "drop":  keep only the bars where every symbol has a price (previous dropna() behaviour)
+#       "ffill": carry the last price forward for at most max_staleness bars (None = no limit), then
+#                drop the bars that are still incomplete
+#       "flag":  keep the whole union calendar, missing prices stay NaN for the caller to handle
+# The calendar and row positions of a symbol set are memoized per process, keyed by the data fingerprints.
+
+FILL_POLICIES = ("drop", "ffill", "flag")
+
+_CALENDARS = OrderedDict()
+_MAX_CALENDARS = 32
+
+
+def union_calendar(indexes):
+    merged = np.sort(np.concatenate(indexes), kind="stable")
+    keep = np.ones(len(merged), dtype=bool)
+    keep[1:] = merged[1:] != merged[:-1]
+    return merged[keep]
+
+
+def _calendar(indexes, cache_key):
+    if cache_key is not None and cache_key in _CALENDARS:
+        _CALENDARS.move_to_end(cache_key)
+        return _CALENDARS[cache_key]
+
+    calendar = union_calendar(indexes)
+    positions = [np.searchsorted(calendar, index) for index in indexes]
+    if cache_key is not None:
+        _CALENDARS[cache_key] = (calendar, positions)
+        if len(_CALENDARS) > _MAX_CALENDARS:
+            _CALENDARS.popitem(last=False)
+    return calendar, positions
+
+
+def _forward_fill(matrix, max_staleness=None):
+    # Row of the last valid price per column, then a staleness cap in bars
+    rows = np.arange(len(matrix))[:, None]
+    last = np.where(~np.isnan(matrix), rows, -1)
+    last = np.asfortranarray(last)
+    np.maximum.accumulate(last, axis=0, out=last)
+
+    usable = last >= 0
+    if max_staleness is not None:
+        usable &= rows - last <= max_staleness
+    filled = np.take_along_axis(matrix, np.maximum(last, 0), axis=0)
+    filled[~usable] = np.nan
+    return np.asfortranarray(filled)
+
+
+def align_arrays(indexes, values, names, fill_policy="drop", max_staleness=None, cache_key=None):
+    # indexes: sorted int64 timestamp arrays, values: matching float arrays -> (calendar, matrix, report)
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError("Invalid fill_policy. Use 'drop', 'ffill' or 'flag'.")
+
+    # Column-major: each symbol is scattered into (and later scanned from) contiguous memory,
+    # and pandas wraps the result without a copy
+    calendar, positions = _calendar(indexes, cache_key)
+    matrix = np.full((len(calendar), len(names)), np.nan, order="F")
+    for j, (pos, vals) in enumerate(zip(positions, values)):
+        matrix[pos, j] = vals
+
+    observed = ~np.isnan(matrix)
+    if fill_policy == "ffill":
+        matrix = _forward_fill(matrix, max_staleness)
+    present = ~np.isnan(matrix)
+
+    # Longest run of consecutive missing bars per symbol on the union calendar
+    max_gap = np.zeros(len(names), dtype=int)
+    for j in range(len(names)):
+        gaps = np.flatnonzero(observed[:, j])
+        if len(gaps) == 0:
+            max_gap[j] = len(calendar)
+            continue
+        max_gap[j] = max(gaps[0], len(calendar) - 1 - gaps[-1], (np.diff(gaps).max() - 1) if len(gaps) > 1 else 0)
+
+    bars = observed.sum(axis=0)
+    filled = present.sum(axis=0) - bars
+    keep = slice(None) if fill_policy == "flag" else present.all(axis=1)
+    report = {
+        "fill_policy": fill_policy,
+        "union_bars": len(calendar),
+        "aligned_bars": len(calendar[keep]),
+        "symbols": {
+            name: {
+                "bars": int(bars[j]),
+                "missing": int(len(calendar) - bars[j]),
+                "filled": int(filled[j]),
+                "max_gap": int(max_gap[j]),
+            }
+            for j, name in enumerate(names)
+        },
+    }
+    return calendar[keep], matrix[keep], report
+
+
+def load_aligned(store, paths, names, fill_policy="drop", max_staleness=None, start=None, end=None):
+    # Close prices of every path aligned on one calendar -> (DataFrame with a UTC DatetimeIndex, report)
+    indexes, values = [], []
+    for path in paths:
+        column = store.close_column(path)
+        index, data = store.load_arrays(path, columns=[column], start=start, end=end)
+        indexes.append(index)
+        values.append(data[column])
+
+    cache_key = (tuple(store.fingerprint(path) for path in paths), str(start), str(end))
+    calendar, matrix, report = align_arrays(indexes, values, names, fill_policy, max_staleness, cache_key)
+    dates = pd.DatetimeIndex(calendar.view("datetime64[ns]"), name="Date").tz_localize("UTC")
+    return pd.DataFrame(matrix, index=dates, columns=names), report
@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+
+# Bar-frequency layer for intraday and tick data. Timestamps are int64 UTC nanoseconds (as in PriceStore).
+#   - resampling: ticks are bucketed by integer division of their timestamp, and OHLCV / tick counts come
+#     from np.*.reduceat over the bucket boundaries (no Python code per bar); resample_chunks streams a
+#     file chunk by chunk, carrying the unfinished last bar into the next chunk
+#   - sessions ({"start": "09:30", "end": "16:00", "tz": "America/New_York"}): ticks outside the session
+#     are dropped and bars are anchored on the session open; the session id of a bar is its local date
+#   - rolling windows: a row count or a time span ("30min"), optionally reset at every session start so
+#     they never mix two sessions across the overnight gap (rolling sums from cumulative sums)
+#   - annualization factor from the bar frequency: trading days per year x bars per day (from the session, or
+#     the median bars per date of the data)
+
+TRADING_DAYS = 252
+DAY_NS = 86_400 * 10**9
+
+
+def to_ns(span):
+    # "1min", "5s", "1D", pd.Timedelta or integer nanoseconds -> int nanoseconds
+    return int(span) if isinstance(span, (int, np.integer)) else pd.Timedelta(span).value
+
+
+def time_of_day_ns(value):
+    # "09:30" / "16:00:00" -> nanoseconds after midnight
+    parts = [float(x) for x in str(value).split(":")]
+    return int(round(sum(x * 60 ** (2 - i) for i, x in enumerate(parts)) * 10**9))
+
+
+def _local_ns(ts, tz):
+    # Wall-clock nanoseconds in `tz` (vectorized DST offsets)
+    if tz is None:
+        return ts
+    local = pd.DatetimeIndex(ts.view("datetime64[ns]")).tz_localize("UTC").tz_convert(tz).tz_localize(None)
+    return local.asi8
+
+
+def session_length_ns(session):
+    return time_of_day_ns(session["end"]) - time_of_day_ns(session["start"]) if session else DAY_NS
+
+
+def bar_ids(ts, bar, session=None):
+    # (bucket id per tick, mask of ticks kept) for bars of `bar` nanoseconds, anchored on the session open
+    bar = to_ns(bar)
+    if session is None:
+        return ts // bar, None
+
+    local = _local_ns(ts, session.get("tz"))
+    day, time_of_day = np.divmod(local, DAY_NS)
+    offset = time_of_day - time_of_day_ns(session["start"])
+    keep = (offset >= 0) & (offset < session_length_ns(session))
+    bars_per_day = -(-session_length_ns(session) // bar)
+    return day * bars_per_day + offset // bar, keep
+
+
+def resample_ticks(ts, price, size=None, bar="1min", session=None):
+    # Sorted ticks -> dict of bar arrays: ts (bar open, UTC ns), open, high, low, close, volume, ticks
+    ts = np.asarray(ts, dtype=np.int64)
+    price = np.asarray(price, dtype=float)
+    size = np.ones(len(ts)) if size is None else np.asarray(size, dtype=float)
+
+    ids, keep = bar_ids(ts, bar, session)
+    if keep is not None:
+        ts, price, size, ids = ts[keep], price[keep], size[keep], ids[keep]
+    if len(ts) == 0:
+        return {k: np.empty(0, dtype=np.int64 if k in ("ts", "ticks") else float)
+                for k in ("ts", "open", "high", "low", "close", "volume", "ticks")}
+
+    starts = np.flatnonzero(np.diff(ids, prepend=ids[0] - 1))
+    ends = np.append(starts[1:], len(ts))
+    bar_ns = to_ns(bar)
+    return {
+        "ts": ids[starts] * bar_ns if session is None else _bar_open(ts[starts], bar_ns, session),
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends - 1],
+        "volume": np.add.reduceat(size, starts),
+        "ticks": ends - starts,
+    }
+
+
+def _bar_open(first_ts, bar_ns, session):
+    # UTC open time of each session bar: first tick time minus its offset inside the bar
+    local = _local_ns(first_ts, session.get("tz"))
+    offset_in_bar = ((local % DAY_NS) - time_of_day_ns(session["start"])) % bar_ns
+    return first_ts - offset_in_bar
+
+
+def resample_chunks(chunks, bar="1min", session=None):
+    # chunks: iterable of (ts, price, size) sorted across chunks -> completed bars per chunk.
+    # The ticks of the last bar of a chunk are held back and prepended to the next chunk.
+    carry = None
+    for ts, price, size in chunks:
+        ts = np.asarray(ts, dtype=np.int64)
+        price = np.asarray(price, dtype=float)
+        size = np.ones(len(ts)) if size is None else np.asarray(size, dtype=float)
+        if carry is not None:
+            ts, price, size = (np.concatenate((c, x)) for c, x in zip(carry, (ts, price, size)))
+        if len(ts) == 0:
+            continue
+
+        ids, _ = bar_ids(ts, bar, session)
+        cut = np.searchsorted(ids, ids[-1]) # First tick of the (possibly unfinished) last bar
+        carry = (ts[cut:], price[cut:], size[cut:])
+        if cut:
+            yield resample_ticks(ts[:cut], price[:cut], size[:cut], bar, session)
+
+    if carry is not None and len(carry[0]):
+        yield resample_ticks(*carry, bar=bar, session=session)
+
+
+def read_ticks(path, chunk_size=5_000_000, ts_col="timestamp", price_col="price", size_col="size"):
+    # CSV ticks in chunks -> (UTC ns, price, size) arrays; timestamps as ISO strings or epoch nanoseconds
+    columns = [ts_col, price_col]
+    header = pd.read_csv(path, nrows=0).columns
+    if size_col in header:
+        columns.append(size_col)
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+        ts = chunk[ts_col]
+        if pd.api.types.is_integer_dtype(ts):
+            ts_ns = ts.to_numpy(dtype=np.int64)
+        else:
+            ts_ns = pd.to_datetime(ts, utc=True).to_numpy(dtype="datetime64[ns]").view(np.int64)
+        size = chunk[size_col].to_numpy(dtype=float) if size_col in chunk else None
+        yield ts_ns, chunk[price_col].to_numpy(dtype=float), size
+
+
+def bars_frame(bars):
+    # Bar arrays -> DataFrame in the layout of the data/ CSVs (Date index, Open/High/Low/Close/Volume)
+    index = pd.DatetimeIndex(np.asarray(bars["ts"]).view("datetime64[ns]"), name="Date").tz_localize("UTC")
+    return pd.DataFrame({
+        "Open": bars["open"], "High": bars["high"], "Low": bars["low"], "Close": bars["close"],
+        "Volume": bars["volume"], "Ticks": bars["ticks"],
+    }, index=index)
+
+
+def session_ids(ts, session=None):
+    # Session (local trading date) of every bar; None -> one session per UTC day
+    local = _local_ns(np.asarray(ts, dtype=np.int64), None if session is None else session.get("tz"))
+    return local // DAY_NS
+
+
+def _window_starts(ts, window, sessions=None):
+    # First row of the trailing window ending at each row: `window` rows (int) or the bars within the
+    # time span (ts - window, ts], never before the first row of the row's session
+    rows = np.arange(len(ts))
+    if isinstance(window, (int, np.integer)):
+        start = np.maximum(rows - window + 1, 0)
+    else:
+        start = np.searchsorted(ts, ts - to_ns(window), side="right")
+    if sessions is not None and len(ts):
+        first = np.flatnonzero(np.diff(sessions, prepend=sessions[0] - 1))
+        start = np.maximum(start, first[np.searchsorted(first, rows, side="right") - 1])
+    return start
+
+
+def rolling_mean_std(values, window, ts=None, sessions=None, min_periods=None, block_size=4096):
+    # Trailing mean and sample std (ddof=1) over `window` rows (int) or a time span ("30min", needs ts),
+    # restarted at every session change when `sessions` is given. NaN values are skipped; rows with fewer
+    # than min_periods valid values (default: the full window for row counts, like pandas rolling, and
+    # 2 for time spans) are NaN, so a count window is also NaN for the first bars of every session.
+    # Sums are taken block by block (each block re-centered on its own mean and starting at its first
+    # window), so the cumulative sums stay small on long, drifting histories (as in hedge.py).
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    ts = np.arange(n) if ts is None else np.asarray(ts, dtype=np.int64)
+    start = _window_starts(ts, window, sessions) # Non-decreasing
+    valid = np.isfinite(values)
+    if min_periods is None:
+        min_periods = window if isinstance(window, (int, np.integer)) else 2
+
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    for b in range(0, n, block_size):
+        lo, hi = start[b], min(b + block_size, n)
+        ok = valid[lo:hi]
+        ref = values[lo:hi][ok].mean() if ok.any() else 0.0
+        x = np.where(ok, values[lo:hi] - ref, 0.0)
+        c0 = np.concatenate(([0], np.cumsum(ok)))
+        c1 = np.concatenate(([0.0], np.cumsum(x)))
+        c2 = np.concatenate(([0.0], np.cumsum(x * x)))
+
+        first, end = start[b:hi] - lo, np.arange(b, hi) + 1 - lo
+        count = c0[end] - c0[first]
+        s1 = c1[end] - c1[first]
+        s2 = c2[end] - c2[first]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = s1 / count
+            sd = np.sqrt(np.maximum(s2 - s1 * m, 0) / (count - 1))
+        full = count >= max(min_periods, 1)
+        mean[b:hi] = np.where(full, m + ref, np.nan)
+        std[b:hi] = np.where(full & (count > 1), sd, np.nan)
+    return mean, std
+
+
+def infer_bar_ns(ts):
+    # Typical spacing of the bars: median of the positive timestamp gaps
+    gaps = np.diff(np.asarray(ts, dtype=np.int64))
+    gaps = gaps[gaps > 0]
+    return int(np.median(gaps)) if len(gaps) else DAY_NS
+
+
+def infer_bars_per_day(ts, session=None):
+    # Typical number of bars per trading day: median count of bars per session date (per UTC date without
+    # a session: an exchange session that does not cross midnight UTC falls on one date)
+    ids = session_ids(ts, session)
+    if len(ids) == 0:
+        return np.nan
+    _, counts = np.unique(ids, return_counts=True)
+    return float(np.median(counts))
+
+
+def annualization_factor(bar, session=None, trading_days=TRADING_DAYS, bars_per_day=None):
+    # Bars per year: daily -> 252 (trading days), up to weekly -> 252 / days per bar, weekly and longer
+    # -> calendar days (52 weekly, 12 monthly bars), intraday -> 252 x bars per session, from the session
+    # length or else bars_per_day (e.g. infer_bars_per_day of the data). Bars within 4h of a whole number
+    # of days count as whole days (DST shifts of daily UTC timestamps).
+    bar = to_ns(bar)
+    if bar >= DAY_NS - 4 * 3600 * 10**9:
+        days = max(round(bar / DAY_NS), 1)
+        return trading_days / days if days < 7 else 365.25 / days
+    if session is not None:
+        return trading_days * session_length_ns(session) / bar
+    if bars_per_day is None or not bars_per_day > 0:
+        raise ValueError("Invalid intraday annualization. Use a session or bars_per_day.")
+    return trading_days * bars_per_day
+
+
+def index_annualization_factor(index, bar=None, session=None, trading_days=TRADING_DAYS):
+    # Annualization factor of a bar index (DatetimeIndex or int64 UTC ns): bar size given or inferred,
+    # bars per day from the session or from the data (intraday bars without a session). Other pandas
+    # indexes (e.g. synthetic paths on a RangeIndex) count as daily bars unless the bar size is given.
+    if isinstance(index, pd.Index) and not isinstance(index, pd.DatetimeIndex):
+        return annualization_factor(bar if bar is not None else DAY_NS, session, trading_days)
+    ts = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.asarray(index, dtype=np.int64)
+    bar = to_ns(bar) if bar is not None else infer_bar_ns(ts)
+    bars_per_day = infer_bars_per_day(ts) if bar < DAY_NS // 2 and session is None else None
+    return annualization_factor(bar, session, trading_days, bars_per_day)
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from price_store import PriceStore
+from robust_spread_arb import PairBacktester
+from universe import UniverseBacktester
+
+# Offline benchmark of the backtester hot paths on synthetic data.
+# Each record is one (suite, stage, size) measurement: best wall time over `repeat` runs and the peak
+# memory allocated during the stage (tracemalloc, measured in a separate run so it does not skew timings).
+# Records are appended as JSON lines tagged with the git commit, so runs can be compared across commits.
+
+
+def synthetic_pair(n_bars, seed=0, hedge_ratio=0.99):
+    # Cointegrated pair: price2 is a random walk, price1 = hedge * price2 + mean-reverting noise
+    rng = np.random.default_rng(seed)
+    price2 = 400 + np.cumsum(rng.normal(0, 0.5, n_bars))
+
+    # Mean-reverting spread: a random walk minus its own 50-bar moving average
+    walk = np.cumsum(rng.normal(0, 0.2, n_bars))
+    c = np.concatenate(([0.0], np.cumsum(walk)))
+    moving_average = walk.copy()
+    moving_average[50:] = (c[51:] - c[1:-50]) / 50
+    price1 = hedge_ratio * price2 + 3 + (walk - moving_average)
+    return price1, price2
+
+
+def synthetic_universe(n_bars, n_symbols, seed=0):
+    rng = np.random.default_rng(seed)
+    common = 400 + np.cumsum(rng.normal(0, 0.5, n_bars))
+    idiosyncratic = np.cumsum(rng.normal(0, 0.05, (n_bars, n_symbols)), axis=0)
+    prices = common[:, None] + idiosyncratic + rng.normal(0, 0.2, (n_bars, n_symbols))
+    index = pd.date_range("2000-01-03", periods=n_bars, freq="min", tz="UTC")
+    return pd.DataFrame(prices, index=index, columns=[f"S{i}" for i in range(n_symbols)])
+
+
+def write_csv(path, close, seed=0):
+    # Same layout as the yfinance files in data/
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2000-01-03", periods=len(close), freq="min", tz="America/New_York")
+    pd.DataFrame({
+        "Open": close,
+        "High": close,
+        "Low": close,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, len(close)),
+    }, index=pd.Index(index, name="Date")).to_csv(path)
+
+
+def measure(func, repeat):
+    # Best wall time over `repeat` runs, then one extra run under tracemalloc for peak memory
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def bench_pair(sizes, repeat, with_plots, tmp_dir):
+    records = []
+    for n_bars in sizes:
+        price1, price2 = synthetic_pair(n_bars)
+        write_csv(os.path.join(tmp_dir, "A.csv"), price1, seed=1)
+        write_csv(os.path.join(tmp_dir, "B.csv"), price2, seed=2)
+
+        bt = PairBacktester(
+            os.path.join(tmp_dir, "A.csv"), os.path.join(tmp_dir, "B.csv"),
+            hedge_ratio=0.99, window=100, z_entry=2.0, z_exit=0.5,
+        )
+        bt.price_store = PriceStore(os.path.join(tmp_dir, ".price_store")) # Keep synthetic data out of data/
+
+        # Cold load converts the CSVs into the price store, warm load reads the cached columns
+        def cold_load():
+            for label in ("A", "B"):
+                meta = os.path.join(bt.price_store.cache_dir, label, "meta.json")
+                if os.path.exists(meta):
+                    os.remove(meta)
+            bt.load_data()
+
+        stages = [
+            ("load_data_cold", cold_load),
+            ("load_data", bt.load_data),
+            ("compute_spread", bt.compute_spread),
+            ("generate_signals", bt.generate_signals),
+            ("compute_pnl", bt.compute_pnl),
+            ("compute_metrics", bt.compute_metrics),
+        ]
+
+        if with_plots:
+            from plots import plot_all, plot_pnl_curve, plot_spread_zscore, plot_drawdowns
+            plots_dir = os.path.join(tmp_dir, "plots")
+            stages += [
+                ("plot_pnl_curve", lambda: plot_pnl_curve(bt.pnl, out_dir=plots_dir)),
+                ("plot_spread_zscore", lambda: plot_spread_zscore(bt.spread, bt.z_score, out_dir=plots_dir)),
+                ("plot_drawdowns", lambda: plot_drawdowns(bt.pnl, out_dir=plots_dir)),
+                ("plot_all", lambda: plot_all(bt.pnl, bt.spread, bt.z_score, out_dir=plots_dir)),
+            ]
+
+        for stage, func in stages:
+            seconds, peak = measure(func, repeat)
+            records.append({"suite": "pair", "stage": stage, "bars": n_bars, "pairs": 1, "seconds": seconds, "peak_bytes": peak})
+            print(f"pair      {stage:<20} bars={n_bars:>10,}  {seconds * 1e3:10.2f} ms  {peak / 2**20:9.1f} MiB")
+    return records
+
+
+def bench_universe(pair_counts, n_bars, repeat):
+    records = []
+    for n_pairs in pair_counts:
+        prices = synthetic_universe(n_bars, n_pairs + 1)
+        pairs = [(f"S{i}", f"S{i + 1}", 1.0) for i in range(n_pairs)]
+        ub = UniverseBacktester(prices, pairs, window=100, z_entry=2.0, z_exit=0.5)
+
+        stages = [
+            ("compute_spread", ub.compute_spread),
+            ("generate_signals", ub.generate_signals),
+            ("compute_pnl", ub.compute_pnl),
+            ("compute_metrics", ub.compute_metrics),
+            ("pair_metrics", ub.pair_metrics),
+        ]
+        for stage, func in stages:
+            seconds, peak = measure(func, repeat)
+            records.append({"suite": "universe", "stage": stage, "bars": n_bars, "pairs": n_pairs, "seconds": seconds, "peak_bytes": peak})
+            print(f"universe  {stage:<20} pairs={n_pairs:>9,}  {seconds * 1e3:10.2f} ms  {peak / 2**20:9.1f} MiB")
+    return records
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(records, baseline_path):
+    # Ratio of current / baseline time per (suite, stage, bars, pairs), latest baseline record wins
+    baseline = {}
+    with open(baseline_path, "r") as f:
+        for line in f:
+            r = json.loads(line)
+            baseline[(r["suite"], r["stage"], r["bars"], r["pairs"])] = r["seconds"]
+
+    print("\n--- Comparison with baseline ---")
+    for r in records:
+        key = (r["suite"], r["stage"], r["bars"], r["pairs"])
+        if key in baseline and baseline[key] > 0:
+            print(f"{r['suite']:<9} {r['stage']:<20} bars={r['bars']:>10,} pairs={r['pairs']:>5}  x{r['seconds'] / baseline[key]:.2f}")
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Benchmark the backtester hot paths on synthetic data")
+    parser.add_argument("--sizes", type=str, default="1000,10000,100000,1000000", help="Comma-separated bar counts for the pair suite (up to 10000000)")
+    parser.add_argument("--pairs", type=str, default="1,10,100,1000", help="Comma-separated pair counts for the universe suite")
+    parser.add_argument("--pair_bars", type=int, default=2520, help="Bars per pair in the universe suite")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (best is kept)")
+    parser.add_argument("--plots", action="store_true", help="Also time the plotting functions")
+    parser.add_argument("--output", type=str, default="outputs/benchmarks.jsonl", help="JSON lines file the records are appended to")
+    parser.add_argument("--compare", type=str, help="Previous benchmarks.jsonl to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    pair_counts = [int(s) for s in args.pairs.split(",") if s]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        records = bench_pair(sizes, args.repeat, args.plots, tmp_dir)
+    records += bench_universe(pair_counts, args.pair_bars, args.repeat)
+
+    run = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "a") as f:
+        for record in records:
+            f.write(json.dumps({**run, **record}) + "\n")
+    print(f"\n✅ {len(records)} benchmark records appended to {output}")
+
+    if args.compare:
+        compare(records, args.compare)
+
+
+if __name__ == "__main__":
+    main()
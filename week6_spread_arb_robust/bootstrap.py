@@ -0,0 +1,154 @@
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from metrics import compute_metrics
+from robust_spread_arb import PairBacktester
+from universe import UniverseBacktester
+
+# Resampling robustness of the backtest metrics. Every batch of resamples is one (bars x paths) matrix
+# evaluated with the 2-D metrics kernels, and batches are spread over a process pool.
+#   - "block": circular block bootstrap of the strategy's daily returns (keeps autocorrelation up to
+#     block_size bars); return-based metrics only
+#   - "synthetic": new cointegrated price paths run through the whole spread / signal / PnL pipeline
+#     (UniverseBacktester, one pair per path). The second leg follows block-bootstrapped log returns of
+#     the real one, and the spread is an AR(1) fitted on the real spread, driven by resampled residuals.
+
+# Inputs shared with the worker processes (inherited on fork, sent once per worker otherwise)
+_INPUTS = None
+
+# Upper bound on the cells of one (bars x paths) batch, to keep batches on long histories in memory
+MAX_BATCH_CELLS = 20_000_000
+
+
+def block_indices(n_bars, n_paths, block_size, rng):
+    # (n_bars x n_paths) row indices made of circular blocks starting at random bars
+    block_size = max(1, min(int(block_size), n_bars))
+    n_blocks = -(-n_bars // block_size)
+    starts = rng.integers(0, n_bars, size=(n_blocks, 1, n_paths))
+    offsets = np.arange(block_size)[None, :, None]
+    return ((starts + offsets) % n_bars).reshape(n_blocks * block_size, n_paths)[:n_bars]
+
+
+def fit_spread_ar1(spread):
+    # spread_t - mu = phi * (spread_t-1 - mu) + eps_t
+    spread = spread[~np.isnan(spread)]
+    mu = spread.mean()
+    x, y = spread[:-1] - mu, spread[1:] - mu
+    phi = (x * y).sum() / (x * x).sum()
+    return mu, phi, y - phi * x
+
+
+def synthetic_pairs(inputs, n_paths, rng):
+    # (bars x paths) prices of both legs
+    price2, mu, phi, residuals, hedge_ratio, block_size = (
+        inputs["price2"], inputs["mu"], inputs["phi"], inputs["residuals"], inputs["hedge_ratio"], inputs["block_size"],
+    )
+    n = len(price2)
+
+    log_returns = np.diff(np.log(price2))
+    idx = block_indices(n - 1, n_paths, block_size, rng)
+    paths2 = np.empty((n, n_paths))
+    paths2[0] = price2[0]
+    paths2[1:] = price2[0] * np.exp(np.cumsum(log_returns[idx], axis=0))
+
+    # AR(1) recursion over time, vectorized over paths
+    eps = residuals[rng.integers(0, len(residuals), size=(n, n_paths))]
+    spread = np.empty((n, n_paths))
+    spread[0] = mu + eps[0]
+    for t in range(1, n):
+        spread[t] = mu + phi * (spread[t - 1] - mu) + eps[t]
+
+    return hedge_ratio * paths2 + spread, paths2
+
+
+def _init_worker(inputs):
+    global _INPUTS
+    _INPUTS = inputs
+
+
+def _run_batch(task):
+    method, seed, n_paths = task
+    rng = np.random.default_rng(seed)
+    inputs = _INPUTS
+
+    if method == "block":
+        r = inputs["daily_returns"]
+        return compute_metrics(r[block_indices(len(r), n_paths, inputs["block_size"], rng)], inputs["annualization_factor"])
+
+    paths1, paths2 = synthetic_pairs(inputs, n_paths, rng)
+    columns = [f"A{i}" for i in range(n_paths)] + [f"B{i}" for i in range(n_paths)]
+    prices = pd.DataFrame(np.hstack((paths1, paths2)), columns=columns)
+    ub = UniverseBacktester(
+        prices, [(f"A{i}", f"B{i}", inputs["hedge_ratio"]) for i in range(n_paths)], **inputs["strategy"],
+    )
+    ub.run_backtest(verbose=False, compute_metrics=False)
+    return ub.pair_metrics().to_dict("list")
+
+
+def confidence_intervals(samples, point=None, alpha=0.05):
+    # One row per metric: point estimate, mean, std and the (alpha/2, 1 - alpha/2) percentile interval
+    rows = {}
+    for metric, values in samples.items():
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        rows[metric] = {
+            "point": np.nan if point is None else point.get(metric, np.nan),
+            "mean": values.mean() if len(values) else np.nan,
+            "std": values.std(ddof=1) if len(values) > 1 else np.nan,
+            f"p{100 * alpha / 2:g}": np.percentile(values, 100 * alpha / 2) if len(values) else np.nan,
+            "p50": np.percentile(values, 50) if len(values) else np.nan,
+            f"p{100 * (1 - alpha / 2):g}": np.percentile(values, 100 * (1 - alpha / 2)) if len(values) else np.nan,
+            "paths": len(values),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def run_bootstrap(base_params, n_paths=10_000, method="block", block_size=20, batch_size=1_000,
+                  processes=None, seed=None, alpha=0.05):
+    if method not in ("block", "synthetic"):
+        raise ValueError("Invalid method. Use 'block' or 'synthetic'.")
+
+    # Point estimates and resampling inputs from one regular backtest
+    bt = PairBacktester(**{**base_params, "plots": False})
+    if method == "synthetic" and (isinstance(bt.window, str) or bt.session is not None):
+        raise ValueError("Synthetic bootstrap supports bar-count windows without a session only (window=int, session=None).")
+    point = bt.run_backtest(verbose=False)
+
+    price1 = bt.data[bt.label1].to_numpy()
+    price2 = bt.data[bt.label2].to_numpy()
+    mu, phi, residuals = fit_spread_ar1(price1 - bt.hedge_ratio * price2)
+    inputs = {
+        "daily_returns": bt.daily_returns.to_numpy(),
+        "price2": price2,
+        "mu": mu,
+        "phi": phi,
+        "residuals": residuals,
+        "hedge_ratio": bt.hedge_ratio,
+        "block_size": block_size,
+        "annualization_factor": bt.bars_per_year(),
+        "strategy": {
+            "window": int(bt.window), "z_entry": bt.z_entry, "z_exit": bt.z_exit,
+            "transaction_costs_bps": bt.transaction_costs_bps, "slippage_bps": bt.slippage_bps,
+            "capital": bt.capital, "positioning_method": bt.positioning_method, "margin_rate": bt.margin_rate,
+            "annualization_factor": bt.bars_per_year(), # Synthetic paths have no calendar
+        },
+    }
+
+    # Independent random streams per batch: results depend on the seed, not on the number of processes
+    batch_size = max(1, min(batch_size, MAX_BATCH_CELLS // max(len(price1), 1)))
+    sizes = [min(batch_size, n_paths - start) for start in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(method, s, size) for s, size in zip(seeds, sizes)]
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(inputs)
+        results = [_run_batch(task) for task in tasks]
+    else:
+        method_name = "fork" if "fork" in mp.get_all_start_methods() else None
+        with mp.get_context(method_name).Pool(processes, initializer=_init_worker, initargs=(inputs,)) as pool:
+            results = pool.map(_run_batch, tasks)
+
+    samples = pd.DataFrame({k: np.concatenate([np.asarray(r[k], dtype=float) for r in results]) for k in results[0]})
+    return confidence_intervals(samples, point, alpha), samples
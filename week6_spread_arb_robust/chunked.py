@@ -0,0 +1,241 @@
+import math
+import os
+import numpy as np
+import pandas as pd
+from metrics import ANNUALIZATION_FACTOR
+from price_store import _to_utc_ns
+from strategies.pair import pair_positions, spread_pnl
+
+# Out-of-core mode: prices are read from the CSVs in blocks, every stage runs vectorized on one block
+# at a time, and the state a block needs from the previous one is carried over explicitly:
+#   - the last window-1 spreads (rolling mean/std), the last spread and z-score,
+#   - the last position and trade-entry flag,
+#   - the metric accumulators (merged block by block).
+# Per-bar output is appended to a CSV as each block completes, so memory is bounded by the block
+# size plus `window`, whatever the length of the history.
+
+
+def _read_close_chunks(path, chunk_size):
+    # (timestamps as int64 UTC ns, Close) blocks, Close column if present, first column otherwise
+    header = pd.read_csv(path, nrows=0).columns
+    close = "Close" if "Close" in header else header[1]
+    for chunk in pd.read_csv(path, usecols=[header[0], close], chunksize=chunk_size):
+        ts = pd.to_datetime(chunk[header[0]], utc=True).to_numpy(dtype="int64")
+        yield ts, chunk[close].to_numpy(dtype=float)
+
+
+def aligned_chunks(path1, path2, chunk_size, start=None, end=None):
+    # Inner join of two sorted CSV streams on their timestamps, block by block
+    readers = [_read_close_chunks(path1, chunk_size), _read_close_chunks(path2, chunk_size)]
+    buffers = [(np.empty(0, dtype="int64"), np.empty(0)) for _ in readers]
+    done = [False, False]
+
+    while True:
+        for i, reader in enumerate(readers):
+            while not done[i] and len(buffers[i][0]) < chunk_size:
+                try:
+                    ts, values = next(reader)
+                except StopIteration:
+                    done[i] = True
+                    break
+                buffers[i] = (np.concatenate((buffers[i][0], ts)), np.concatenate((buffers[i][1], values)))
+
+        if all(done) and not any(len(b[0]) for b in buffers):
+            return
+
+        # Timestamps up to the horizon are final in both streams; later ones wait for the next block
+        horizon = min(np.iinfo("int64").max if done[i] else buffers[i][0][-1] for i in range(2))
+        taken = []
+        for i in range(2):
+            ts, values = buffers[i]
+            n_take = int(np.searchsorted(ts, horizon, side="right"))
+            taken.append((ts[:n_take], values[:n_take]))
+            buffers[i] = (ts[n_take:], values[n_take:])
+
+        (ts1, v1), (ts2, v2) = taken
+        common, i1, i2 = np.intersect1d(ts1, ts2, assume_unique=True, return_indices=True)
+        p1, p2 = v1[i1], v2[i2]
+        keep = ~(np.isnan(p1) | np.isnan(p2)) # Same as dropna() on the aligned frame
+        if start is not None:
+            keep &= common >= _to_utc_ns(start)
+        if end is not None:
+            keep &= common <= _to_utc_ns(end)
+        if keep.any():
+            yield common[keep], p1[keep], p2[keep]
+
+
+class ChunkedMetrics:
+    # compute_metrics / trade_stats statistics merged block by block (Chan et al. pairwise updates)
+    def __init__(self, annualization_factor=ANNUALIZATION_FACTOR):
+        self.annualization_factor = annualization_factor
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.n_neg, self.mean_neg, self.m2_neg = 0, 0.0, 0.0
+        self.n_pos = 0
+        self.n_nonzero = 0
+        self.cum = 1.0
+        self.peak = -math.inf
+        self.max_drawdown = math.nan
+
+        self.bars = 0
+        self.turnover = 0.0
+        self.trades = 0
+        self.trade_wins = 0
+        self.trade_pnl = 0.0
+        self.trade_bars = 0
+        self.open_trade_pnl = 0.0
+
+
+    @staticmethod
+    def _merge(n_a, mean_a, m2_a, values):
+        n_b = len(values)
+        if n_b == 0:
+            return n_a, mean_a, m2_a
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+    def update(self, daily_returns, position, position_lagged, trade_entry, pnl):
+        r = daily_returns[np.isfinite(daily_returns)]
+        self.n, self.mean, self.m2 = self._merge(self.n, self.mean, self.m2, r)
+        self.n_neg, self.mean_neg, self.m2_neg = self._merge(self.n_neg, self.mean_neg, self.m2_neg, r[r < 0])
+        self.n_pos += int((r > 0).sum())
+        self.n_nonzero += int((r != 0).sum())
+
+        # Drawdown of 1 + cumulative returns, continuing from the previous block's level and peak
+        if len(r):
+            cum = self.cum + np.cumsum(r)
+            peak = np.maximum(self.peak, np.maximum.accumulate(cum))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                drawdown = (cum - peak) / np.where(peak == 0, np.nan, peak)
+            if not np.isnan(drawdown).all():
+                block_min = np.nanmin(drawdown)
+                if math.isnan(self.max_drawdown) or block_min < self.max_drawdown:
+                    self.max_drawdown = block_min
+            self.cum, self.peak = cum[-1], peak[-1]
+
+        # Trade-level stats: the PnL of a bar belongs to the trade held over it (position of the previous bar)
+        self.bars += len(position)
+        self.turnover += np.abs(position - position_lagged).sum()
+        pnl = np.nan_to_num(pnl, nan=0.0, posinf=0.0, neginf=0.0)
+
+        held = position_lagged != 0
+        held_id = np.cumsum(np.concatenate(([0], trade_entry[:-1]))) # 0 = trade open from earlier blocks
+        sums = np.bincount(held_id[held], weights=pnl[held], minlength=int(trade_entry.sum()) + 1).astype(float) # int on empty input
+        self.trade_bars += int(held.sum())
+
+        sums[0] += self.open_trade_pnl
+        # Every trade but the last one of the block is closed (slot 0 is only a trade if one was opened before)
+        closed = sums[0 if self.trades else 1:-1]
+        self.trade_wins += int((closed > 0).sum())
+        self.trade_pnl += closed.sum()
+        self.open_trade_pnl = sums[-1]
+        self.trades += int(trade_entry.sum())
+
+
+    def metrics(self):
+        af = self.annualization_factor
+        volatility = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+        downside_vol = math.sqrt(self.m2_neg / (self.n_neg - 1)) if self.n_neg > 1 else math.nan
+        annual_return = self.mean * af if self.n else math.nan
+
+        if self.n == 0:
+            sharpe = sortino = calmar = hit_ratio = 0.0
+        else:
+            sharpe = 0.0 if volatility == 0 else annual_return / (volatility * math.sqrt(af))
+            sortino = 0.0 if downside_vol == 0 else annual_return / (downside_vol * math.sqrt(af))
+            calmar = 0.0 if self.max_drawdown == 0 or math.isnan(self.max_drawdown) else annual_return / abs(self.max_drawdown)
+            hit_ratio = self.n_pos / self.n_nonzero if self.n_nonzero else math.nan
+
+        # The last trade is closed by the end of the data
+        trade_wins = self.trade_wins + (self.trades > 0 and self.open_trade_pnl > 0)
+        trade_pnl = self.trade_pnl + (self.open_trade_pnl if self.trades else 0.0)
+        n_trades = self.trades if self.trades else math.nan
+
+        return {
+            "Annualize Return (%)": 100 * annual_return,
+            "Volatility (%)": 100 * volatility * math.sqrt(af),
+            "Sharpe Ratio": sharpe,
+            "Sortino Ratio": sortino,
+            "Max Drawdown (%)": 100 * self.max_drawdown,
+            "Calmar Ratio": calmar,
+            "Hit Ratio (%)": 100 * hit_ratio,
+            "Trades": float(self.trades),
+            "Turnover (x/yr)": self.turnover / max(self.bars, 1) * af,
+            "Trade Win Rate (%)": 100 * trade_wins / n_trades,
+            "Avg Trade PnL ($)": trade_pnl / n_trades,
+            "Avg Holding (bars)": self.trade_bars / n_trades,
+        }
+
+
+def run_chunked(bt, output, chunk_size=100_000):
+    # Chunked equivalent of bt.run_backtest() + bt.export_timeseries(output) for static hedge ratios
+    if bt.hedge_method != "static" or bt.execution_model != "vectorized":
+        raise ValueError("Chunked mode supports hedge_method='static' and execution_model='vectorized' only.")
+    if bt.fill_policy != "drop":
+        raise ValueError("Chunked mode aligns the legs with fill_policy='drop' only.")
+    if bt.export_format != "csv":
+        raise ValueError("Chunked mode exports CSV only (export_format='csv').")
+    if isinstance(bt.window, str) or bt.session is not None:
+        raise ValueError("Chunked mode supports bar-count windows without a session only (window=int, session=None).")
+
+    window = int(bt.window)
+    total_cost_rate = bt.transaction_costs + bt.slippage
+    accumulator = ChunkedMetrics()
+
+    # Carried state
+    tail = np.empty(0)
+    prev_spread, prev_z = np.nan, np.nan
+    prev_position, prev_trade_entry = 0, False
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    header = True
+    for ts, price1, price2 in aligned_chunks(bt.file1, bt.file2, chunk_size, bt.start, bt.end):
+        if header:
+            accumulator.annualization_factor = bt.bars_per_year(ts) # Bar frequency of the first block
+        hedged_price2 = bt.hedge_ratio * price2
+        spread = price1 - hedged_price2
+
+        # Rolling z-score with the previous block's last window-1 spreads prepended
+        extended = pd.Series(np.concatenate((tail, spread))).rolling(window=window)
+        rolling_mean = extended.mean().to_numpy()[len(tail):]
+        rolling_std = extended.std().to_numpy()[len(tail):]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z_score = (spread - rolling_mean) / rolling_std
+
+        # Signals on the lagged z-score and PnL (strategies/pair.py), starting from the carried state
+        position = pair_positions(z_score, bt.z_entry, bt.z_exit, prev_z=prev_z, prev_position=prev_position)
+        _, units, trade_entry, cost, pnl = spread_pnl(
+            position, spread, price1, hedged_price2, bt.capital, total_cost_rate, bt.positioning_method,
+            bt.margin_rate, prev_position=prev_position, prev_spread=prev_spread, prev_trade_entry=prev_trade_entry,
+        )
+        position_lagged = np.concatenate(([prev_position], position[:-1]))
+
+        daily_returns = pnl / bt.capital
+        daily_returns[np.isinf(daily_returns)] = np.nan
+        accumulator.update(daily_returns, position, position_lagged, trade_entry, pnl)
+
+        # Append this block's per-bar output
+        pd.DataFrame({
+            f"{bt.label1}_price": price1,
+            f"{bt.label2}_price": price2,
+            "spread": spread,
+            "z_score": z_score,
+            "position": position,
+            "units": units,
+            "transaction_cost": cost,
+            "pnl": pnl,
+            "daily_returns": daily_returns,
+            "trade_entry": trade_entry.astype(float),
+        }, index=pd.DatetimeIndex(ts.view("datetime64[ns]"), name="Date").tz_localize("UTC")).to_csv(
+            output, mode="w" if header else "a", header=header,
+        )
+        header = False
+
+        tail = np.concatenate((tail, spread))[-(window - 1):] if window > 1 else np.empty(0)
+        prev_spread, prev_z = spread[-1], z_score[-1]
+        prev_position, prev_trade_entry = position[-1], trade_entry[-1]
+
+    return accumulator.metrics()
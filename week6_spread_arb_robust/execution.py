@@ -0,0 +1,106 @@
+import math
+import numpy as np
+from jit import njit
+
+# Event-driven execution of the spread position, leg by leg:
+#   - a new target (units of each leg) is set when the signal position changes and kept until the next change
+#   - every bar, each leg trades toward its target at the close, capped at participation_rate * bar volume
+#     (the remainder stays working on the next bars: partial fills)
+#   - each fill pays fixed costs plus a square-root market impact: impact_bps * sqrt(|fill| / volume)
+#   - costs are charged on every fill (entries, exits and flips)
+# Bars without volume data trade uncapped with fixed costs only; zero-volume bars do not trade.
+
+
+@njit(cache=True)
+def _fill(order, volume, participation_rate):
+    if order == 0.0:
+        return 0.0
+    if math.isnan(volume):
+        return order
+    cap = participation_rate * volume
+    if abs(order) <= cap:
+        return order
+    return math.copysign(cap, order)
+
+
+@njit(cache=True)
+def _leg_cost(fill, price, volume, fixed_cost_rate, impact_rate):
+    if fill == 0.0:
+        return 0.0
+    rate = fixed_cost_rate
+    if not math.isnan(volume) and volume > 0.0:
+        rate += impact_rate * math.sqrt(abs(fill) / volume)
+    return abs(fill) * price * rate
+
+
+@njit(cache=True)
+def _execution_kernel(position, units, hedge, price1, price2, volume1, volume2,
+                      participation_rate, fixed_cost_rate, impact_rate):
+    n = len(price1)
+    holdings1 = np.zeros(n)
+    holdings2 = np.zeros(n)
+    fills1 = np.zeros(n)
+    fills2 = np.zeros(n)
+    cost = np.zeros(n)
+    pnl = np.empty(n)
+
+    h1, h2 = 0.0, 0.0
+    target1, target2 = 0.0, 0.0
+    prev_position = 0.0
+    for t in range(n):
+        # Mark-to-market of the holdings carried over the bar
+        if t == 0:
+            mtm = np.nan
+        else:
+            mtm = h1 * (price1[t] - price1[t - 1]) + h2 * (price2[t] - price2[t - 1])
+
+        # New target when the signal changes (sized at this bar's prices)
+        if position[t] != prev_position and not math.isnan(units[t]):
+            target1 = position[t] * units[t]
+            target2 = -position[t] * units[t] * hedge[t]
+            prev_position = position[t]
+
+        f1 = _fill(target1 - h1, volume1[t], participation_rate)
+        f2 = _fill(target2 - h2, volume2[t], participation_rate)
+        c = _leg_cost(f1, price1[t], volume1[t], fixed_cost_rate, impact_rate) \
+            + _leg_cost(f2, price2[t], volume2[t], fixed_cost_rate, impact_rate)
+
+        h1 += f1
+        h2 += f2
+        holdings1[t] = h1
+        holdings2[t] = h2
+        fills1[t] = f1
+        fills2[t] = f2
+        cost[t] = c
+        pnl[t] = mtm - c
+    return holdings1, holdings2, fills1, fills2, cost, pnl
+
+
+def simulate_execution(position, units, hedge, price1, price2, volume1=None, volume2=None,
+                       participation_rate=0.1, fixed_cost_rate=0.0, impact_bps=10.0):
+    n = len(price1)
+    nan_volume = np.full(n, np.nan)
+
+    def as_array(values):
+        return np.ascontiguousarray(np.broadcast_to(np.asarray(values, dtype=float), (n,)))
+
+    holdings1, holdings2, fills1, fills2, cost, pnl = _execution_kernel(
+        as_array(position),
+        as_array(units),
+        as_array(hedge),
+        as_array(price1),
+        as_array(price2),
+        nan_volume if volume1 is None else as_array(volume1),
+        nan_volume if volume2 is None else as_array(volume2),
+        float(participation_rate),
+        float(fixed_cost_rate),
+        float(impact_bps) / 10_000,
+    )
+    return {
+        "holdings1": holdings1,
+        "holdings2": holdings2,
+        "fills1": fills1,
+        "fills2": fills2,
+        "cost": cost,
+        "pnl": pnl,
+    }
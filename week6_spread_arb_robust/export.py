@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Per-bar output writers, fed directly with the backtest arrays (dict of column name -> 1-D array):
+#   - "csv": written in row blocks, so only one block is ever materialised as a DataFrame
+#   - "parquet" / "feather": Arrow columns built on top of the NumPy buffers (zero-copy for numeric
+#     columns), compressed (zstd by default); needs pyarrow, imported only when used
+# With a run_id, each run is written to its own partition of a dataset directory
+# (<export path without extension>/run_id=<id>/part-0.<format>), so many runs can be appended to one
+# dataset and read back together (e.g. pyarrow.dataset with hive partitioning). Re-exporting a run id
+# replaces only that partition.
+
+EXPORT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+
+def export_path(path, fmt="csv", run_id=None):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("Invalid export_format. Use 'csv', 'parquet' or 'feather'.")
+    stem = os.path.splitext(path)[0]
+    if run_id is None:
+        return stem + EXPORT_FORMATS[fmt]
+    return os.path.join(stem, f"run_id={run_id}", "part-0" + EXPORT_FORMATS[fmt])
+
+
+def _write_csv(path, index, columns, block_size):
+    n = len(index)
+    with open(path, "w", newline="") as f:
+        for start in range(0, max(n, 1), block_size):
+            block = slice(start, start + block_size)
+            pd.DataFrame({name: values[block] for name, values in columns.items()}, index=index[block]).to_csv(
+                f, header=start == 0,
+            )
+
+
+def _arrow_table(index, columns):
+    import pyarrow as pa
+
+    arrays = [pa.Array.from_pandas(index)]
+    arrays += [pa.array(np.asarray(values)) for values in columns.values()] # NaN kept as values, no copy
+    return pa.Table.from_arrays(arrays, names=[index.name or "Date"] + list(columns))
+
+
+def write_timeseries(path, index, columns, fmt="csv", compression=None, run_id=None, block_size=100_000):
+    # index: DatetimeIndex of the bars, columns: {name: 1-D array aligned on the index}
+    full_path = export_path(path, fmt, run_id)
+    os.makedirs(os.path.dirname(os.path.abspath(full_path)), exist_ok=True)
+
+    # Write next to the target and rename, so readers of the dataset never see a partial file
+    tmp = full_path + ".tmp"
+    if fmt == "csv":
+        _write_csv(tmp, index, columns, block_size)
+    else:
+        try:
+            table = _arrow_table(index, columns)
+        except ImportError as e:
+            raise ImportError(f"export_format='{fmt}' requires pyarrow (pip install pyarrow).") from e
+
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(table, tmp, compression=compression or "zstd")
+        else:
+            import pyarrow.feather as feather
+            feather.write_feather(table, tmp, compression=compression or "zstd")
+    os.replace(tmp, full_path)
+    return full_path
@@ -0,0 +1,75 @@
+import numpy as np
+from jit import njit
+
+# Time-varying hedge ratio estimators: one beta per bar, usable in place of the static hedge_ratio
+
+
+def _window_sum(values, window):
+    # Sums over every full trailing window, as differences of one cumulative sum
+    c = np.concatenate(([0.0], np.cumsum(values)))
+    return c[window:] - c[:-window]
+
+
+def rolling_ols_hedge(price1, price2, window, block_size=65_536):
+    # OLS slope of price1 on price2 (with intercept) over a trailing window, from cumulative sums: O(n).
+    # Sums are taken block by block (each block re-centered on its own mean, with window-1 bars of
+    # overlap) so the cumulative sums stay small on long, trending histories.
+    y = np.asarray(price1, dtype=float)
+    x = np.asarray(price2, dtype=float)
+    n = len(x)
+    beta = np.full(n, np.nan)
+
+    for start in range(window - 1, n, block_size):
+        lo, hi = start - window + 1, min(start + block_size, n)
+        xb = x[lo:hi] - x[lo:hi].mean()
+        yb = y[lo:hi] - y[lo:hi].mean()
+
+        sx = _window_sum(xb, window)
+        sy = _window_sum(yb, window)
+        var_x = _window_sum(xb * xb, window) - sx * sx / window
+        cov_xy = _window_sum(xb * yb, window) - sx * sy / window
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta[start:hi] = cov_xy / var_x
+
+    beta[~np.isfinite(beta)] = np.nan
+    return beta
+
+
+@njit(cache=True)
+def _kalman_kernel(y, x, delta, obs_var):
+    # State [beta, alpha] follows a random walk, observation price1 = beta * price2 + alpha + noise
+    n = len(y)
+    beta_out = np.empty(n)
+    trans_var = delta / (1.0 - delta)
+
+    beta, alpha = 0.0, 0.0
+    p00, p01, p11 = 0.0, 0.0, 0.0
+    for t in range(n):
+        # Predict
+        r00 = p00 + trans_var
+        r01 = p01
+        r11 = p11 + trans_var
+
+        # Update with the new observation
+        xt = x[t]
+        q = xt * xt * r00 + 2.0 * xt * r01 + r11 + obs_var
+        error = y[t] - (beta * xt + alpha)
+        k0 = (r00 * xt + r01) / q
+        k1 = (r01 * xt + r11) / q
+        beta += k0 * error
+        alpha += k1 * error
+
+        h0 = xt * r00 + r01
+        h1 = xt * r01 + r11
+        p00 = r00 - k0 * h0
+        p01 = r01 - k0 * h1
+        p11 = r11 - k1 * h1
+
+        beta_out[t] = beta
+    return beta_out
+
+
+def kalman_hedge(price1, price2, delta=1e-4, obs_var=1e-3):
+    y = np.ascontiguousarray(price1, dtype=float)
+    x = np.ascontiguousarray(price2, dtype=float)
+    return _kalman_kernel(y, x, float(delta), float(obs_var))
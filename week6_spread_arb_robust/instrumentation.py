@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Per-stage instrumentation: wall time, CPU time, rows processed and memory allocated by each stage.
+# Every record is kept in `records` and emitted as one JSON log line on the "backtest.stages" logger.
+# Memory is measured with tracemalloc, which slows pure-Python code down while tracing; pass
+# track_memory=False for timings only.
+
+logger = logging.getLogger("backtest.stages")
+
+
+class StageRecorder:
+    def __init__(self, enabled=False, track_memory=True):
+        self.enabled = enabled
+        self.track_memory = track_memory
+        self.records = []
+
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        if not self.enabled:
+            yield
+            return
+
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                "stage": name,
+                "pid": os.getpid(),
+                "wall_s": time.perf_counter() - wall_start,
+                "cpu_s": time.process_time() - cpu_start,
+                "rows": rows() if callable(rows) else rows,
+            }
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record["mem_delta_bytes"] = current - mem_start
+                record["mem_peak_bytes"] = peak - mem_start
+            if started_tracing:
+                tracemalloc.stop()
+
+            self.records.append(record)
+            logger.info(json.dumps(record))
+
+
+    def total(self):
+        return {
+            "wall_s": sum(r["wall_s"] for r in self.records),
+            "cpu_s": sum(r["cpu_s"] for r in self.records),
+        }
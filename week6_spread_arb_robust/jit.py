@@ -0,0 +1,13 @@
+# Optional Numba JIT: kernels decorated with @njit are compiled when numba is installed and run as
+# plain Python/NumPy otherwise (numba is not a hard requirement of the project).
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
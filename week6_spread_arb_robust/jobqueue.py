@@ -0,0 +1,312 @@
+import json
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import pandas as pd
+from cache import cache_key
+
+# Sweep distribution through one SQLite file (no server): a coordinator shards the sweep into jobs,
+# and workers on any node that can open the file claim jobs, run them and write the results back.
+#   - a job is one pair (file1 / file2 / hedge_ratio overrides, or none for the config pair) and a chunk
+#     of sweep specs, run by the vectorized sweep engine against the worker's own config and data cache
+#   - jobs are keyed by their content: enqueueing the same sweep twice adds nothing
+#   - claim is one UPDATE ... RETURNING inside a write transaction, so two workers never get the same job
+#   - every worker has a unique id (host, pid and a random suffix), so a restarted worker never adopts
+#     the jobs of the process it replaces
+#   - a running job is leased: its worker refreshes the heartbeat of the jobs it claimed from a background
+#     thread, and a job whose heartbeat is older than `lease` seconds (crashed worker) becomes claimable
+#     again. The heartbeat only proves the process is alive, so a job running longer than max_runtime
+#     seconds (hung job) is claimable again too, and its worker abandons it
+#   - complete / fail only apply while the caller still holds the job (same id and worker, still running)
+#   - a failed job goes back to pending until max_attempts, then stays failed with its error
+#   - results are inserted once per job key (a late duplicate of a re-claimed job is ignored)
+# Shared between machines, the file needs a filesystem with working POSIX locks, and wal=False (WAL
+# mode, the default, relies on shared memory between the processes of one host).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    sweep TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    heartbeat REAL,
+    started REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    sweep TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    elapsed REAL NOT NULL,
+    rows TEXT NOT NULL
+);
+"""
+
+
+class JobQueue:
+    def __init__(self, path, lease=60.0, max_attempts=3, wal=True, max_runtime=None):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.max_runtime = max_runtime # Seconds since the claim after which a running job is re-claimable (None: no limit)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA busy_timeout = 60000")
+        if wal:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "started" not in columns: # Queue created before the per-job runtime limit
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN started REAL")
+
+
+    def close(self):
+        self.conn.close()
+
+
+    def _write(self, sql, params=()):
+        # One statement in an immediate (write-locked) transaction, rows of RETURNING included
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.conn.execute(sql, params).fetchall()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return rows
+
+
+    def enqueue(self, sweep, payloads):
+        # payloads: [{"params": {...}, "specs": [...]}, ...] -> number of new jobs
+        rows = [(cache_key(sweep, p), sweep, json.dumps(p)) for p in payloads]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO jobs (key, sweep, payload) VALUES (?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+
+    def claim(self, worker, n=1):
+        # Pending jobs, and running jobs whose lease or runtime expired, in id order. An expired job
+        # without attempts left is marked failed instead.
+        now = time.time()
+        expired = "status = 'running' AND (heartbeat < ? OR started < ?)"
+        cutoffs = (now - self.lease, -float("inf") if self.max_runtime is None else now - self.max_runtime)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                f"""
+                UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired')
+                WHERE {expired} AND attempts >= ?
+                """,
+                (*cutoffs, self.max_attempts),
+            )
+            rows = self.conn.execute(
+                f"""
+                UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, started = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE status = 'pending' OR ({expired})
+                    ORDER BY id LIMIT ?
+                )
+                RETURNING id, key, sweep, payload, attempts
+                """,
+                (worker, now, now, *cutoffs, n),
+            ).fetchall()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [
+            {"id": i, "key": key, "sweep": sweep, "payload": json.loads(payload), "attempts": attempts, "claimed": now}
+            for i, key, sweep, payload, attempts in sorted(rows)
+        ]
+
+
+    def heartbeat(self, worker, job_ids):
+        # Refresh the lease of the given jobs only, while this worker still holds them
+        if not job_ids:
+            return
+        ids = list(job_ids)
+        self._write(
+            f"UPDATE jobs SET heartbeat = ? WHERE worker = ? AND status = 'running' AND id IN ({', '.join('?' * len(ids))})",
+            (time.time(), worker, *ids),
+        )
+
+
+    def complete(self, job, worker, rows, elapsed):
+        # Store the result if the worker still holds the job; False when it was re-claimed meanwhile
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            held = self.conn.execute(
+                "UPDATE jobs SET status = 'done', error = NULL WHERE id = ? AND worker = ? AND status = 'running' RETURNING id",
+                (job["id"], worker),
+            ).fetchall()
+            if held:
+                self.conn.execute(
+                    "INSERT INTO results (key, sweep, worker, elapsed, rows) VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO NOTHING",
+                    (job["key"], job["sweep"], worker, elapsed, json.dumps(rows)),
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return bool(held)
+
+
+    def fail(self, job, worker, error):
+        # Back to pending while attempts remain (no-op if the job was re-claimed or finished meanwhile)
+        self._write(
+            """
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?
+            WHERE id = ? AND worker = ? AND status = 'running'
+            """,
+            (self.max_attempts, error, job["id"], worker),
+        )
+
+
+    def retry_failed(self, sweep=None):
+        # Give failed jobs a new set of attempts
+        rows = self._write(
+            "UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed' AND (? IS NULL OR sweep = ?) RETURNING id",
+            (sweep, sweep),
+        )
+        return len(rows)
+
+
+    def counts(self, sweep=None):
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE (? IS NULL OR sweep = ?) GROUP BY status", (sweep, sweep),
+        ).fetchall()
+        return {"pending": 0, "running": 0, "done": 0, "failed": 0, **dict(rows)}
+
+
+    def results(self, sweep=None):
+        rows = self.conn.execute(
+            "SELECT worker, elapsed, rows FROM results WHERE (? IS NULL OR sweep = ?) ORDER BY rowid", (sweep, sweep),
+        ).fetchall()
+        return pd.DataFrame([{**row, "worker": worker} for worker, _, data in rows for row in json.loads(data)])
+
+
+def shard_jobs(specs, pairs=None, chunk_size=64):
+    # One job per (pair, chunk of specs); specs sorted by (window, hedge_ratio) so a chunk shares spreads
+    pairs = pairs or [{}]
+    order = sorted(specs, key=lambda s: (s.get("window", 0), s.get("hedge_ratio", 0)))
+    return [
+        {"params": pair, "specs": order[start:start + chunk_size]}
+        for pair in pairs
+        for start in range(0, len(order), chunk_size)
+    ]
+
+
+def run_job(base_params, payload):
+    from sweep import run_sweep # Imported by the worker only (loads the backtester stack)
+    params = {**base_params, **payload["params"], "plots": False}
+    results = run_sweep(params, payload["specs"], processes=1)
+    pair = {k: params[k] for k in ("file1", "file2")}
+    return [{**pair, **row} for row in results.to_dict("records")]
+
+
+def worker_id():
+    # Unique per process and start: a restarted worker does not inherit the name (and jobs) of the old one
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout("max runtime exceeded")
+
+
+def run_worker(queue_path, base_params, worker=None, batch=1, poll=1.0, lease=60.0, max_attempts=3, wal=True, max_runtime=None):
+    # Claim and run jobs until no job is pending or running; returns the number of jobs completed
+    worker = worker or worker_id()
+    queue = JobQueue(queue_path, lease=lease, max_attempts=max_attempts, wal=wal, max_runtime=max_runtime)
+    beat_queue = JobQueue(queue_path, lease=lease, max_attempts=max_attempts, wal=wal, max_runtime=max_runtime)
+
+    # Jobs held by this worker, whose leases the background thread keeps alive
+    held = set()
+    lock = threading.Lock()
+    stop = threading.Event()
+    def beat():
+        while not stop.wait(lease / 3):
+            with lock:
+                ids = list(held)
+            beat_queue.heartbeat(worker, ids)
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+
+    # A job over max_runtime is interrupted by SIGALRM (Unix, main thread only); elsewhere it is still
+    # re-claimed by other workers once its runtime expires, and its late result is discarded
+    alarm = max_runtime is not None and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+
+    completed = 0
+    try:
+        while True:
+            jobs = queue.claim(worker, batch)
+            if not jobs:
+                counts = queue.counts()
+                if counts["pending"] == 0 and counts["running"] == 0:
+                    break
+                time.sleep(poll) # Others are still running: their jobs come back if they stall
+                continue
+
+            with lock:
+                held.update(job["id"] for job in jobs)
+            for job in jobs:
+                start = time.perf_counter()
+                try:
+                    if alarm:
+                        signal.setitimer(signal.ITIMER_REAL, max(max_runtime - (time.time() - job["claimed"]), 1e-3))
+                    try:
+                        rows = run_job(base_params, job["payload"])
+                    finally:
+                        if alarm:
+                            signal.setitimer(signal.ITIMER_REAL, 0)
+                except Exception as e:
+                    queue.fail(job, worker, f"{type(e).__name__}: {e}")
+                    continue
+                finally:
+                    with lock:
+                        held.discard(job["id"])
+                if queue.complete(job, worker, rows, time.perf_counter() - start):
+                    completed += 1
+    finally:
+        stop.set()
+        thread.join()
+        if alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+        beat_queue.close()
+        queue.close()
+    return completed
+
+
+def run_local_workers(queue_path, base_params, processes=None, **kwargs):
+    # Several workers on this machine, as independent processes (same behaviour as workers on other nodes)
+    processes = processes or os.cpu_count() or 1
+    method = "fork" if "fork" in mp.get_all_start_methods() else None
+    with mp.get_context(method).Pool(processes) as pool:
+        done = pool.starmap(_run_worker, [(queue_path, base_params, kwargs)] * processes)
+    return dict(done)
+
+
+def _run_worker(queue_path, base_params, kwargs):
+    worker = worker_id()
+    return worker, run_worker(queue_path, base_params, worker=worker, **kwargs)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# Performance statistics computed from one NumPy array, with every intermediate (valid mask, mean,
+# deviations, cumulative PnL) shared between the metrics instead of re-scanned per metric.
+# Inputs are 1-D (one strategy) or 2-D (bars x strategies); NaN/inf returns are skipped per column,
+# like dropna() in the original utils functions.
+
+ANNUALIZATION_FACTOR = 252
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return values.reshape(-1, 1) if values.ndim == 1 else values
+
+
+def _unwrap(result, one_dim):
+    # 1-D input -> dict of floats, 2-D input -> dict of arrays (one value per column)
+    if one_dim:
+        return {k: float(v[0]) for k, v in result.items()}
+    return result
+
+
+def compute_metrics(daily_returns, annualization_factor=ANNUALIZATION_FACTOR):
+    one_dim = np.ndim(daily_returns) == 1
+    r = _as_2d(daily_returns)
+
+    valid = np.isfinite(r)
+    x = np.where(valid, r, 0.0)
+    n = valid.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Mean and sample std (ddof=1)
+        mean = x.sum(axis=0) / n
+        dev = np.where(valid, r - mean, 0.0)
+        std = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+        std[n < 2] = np.nan
+
+        # Downside std: sample std of the negative returns only
+        negative = valid & (r < 0)
+        n_neg = negative.sum(axis=0)
+        mean_neg = np.where(negative, r, 0.0).sum(axis=0) / n_neg
+        dev_neg = np.where(negative, r - mean_neg, 0.0)
+        downside_std = np.sqrt((dev_neg * dev_neg).sum(axis=0) / (n_neg - 1))
+        downside_std[n_neg < 2] = np.nan
+
+        # Max drawdown of 1 + cumulative returns, relative to the running peak
+        cum = 1 + np.cumsum(x, axis=0)
+        peak = np.maximum.accumulate(cum, axis=0)
+        drawdown = (cum - peak) / np.where(peak == 0, np.nan, peak)
+        drawdown[~valid] = np.nan
+        max_drawdown = np.full(r.shape[1], np.nan)
+        has_dd = (~np.isnan(drawdown)).any(axis=0)
+        max_drawdown[has_dd] = np.nanmin(drawdown[:, has_dd], axis=0)
+
+        annual_return = mean * annualization_factor
+        sharpe = np.where(std == 0, 0.0, annual_return / (std * np.sqrt(annualization_factor)))
+        sortino = np.where(downside_std == 0, 0.0, annual_return / (downside_std * np.sqrt(annualization_factor)))
+        calmar = np.where((max_drawdown == 0) | np.isnan(max_drawdown), 0.0, annual_return / np.abs(max_drawdown))
+        hit_ratio = (valid & (r > 0)).sum(axis=0) / (valid & (r != 0)).sum(axis=0)
+
+    empty = n == 0
+    sharpe[empty] = sortino[empty] = calmar[empty] = hit_ratio[empty] = 0.0
+
+    return _unwrap({
+        "Annualize Return (%)": 100 * annual_return,
+        "Volatility (%)": 100 * std * np.sqrt(annualization_factor),
+        "Sharpe Ratio": sharpe,
+        "Sortino Ratio": sortino,
+        "Max Drawdown (%)": 100 * max_drawdown,
+        "Calmar Ratio": calmar,
+        "Hit Ratio (%)": 100 * hit_ratio,
+    }, one_dim)
+
+
+def rolling_sharpe(daily_returns, window, annualization_factor=ANNUALIZATION_FACTOR):
+    # Trailing-window Sharpe ratio per bar (same shape as the input)
+    r = pd.DataFrame(_as_2d(daily_returns))
+    rolling = r.rolling(window=window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (rolling.mean() * annualization_factor) / (rolling.std() * np.sqrt(annualization_factor))
+    sharpe = sharpe.to_numpy()
+    return sharpe[:, 0] if np.ndim(daily_returns) == 1 else sharpe
+
+
+def trade_stats(position, pnl, annualization_factor=ANNUALIZATION_FACTOR):
+    # Trade-level statistics from the position (-1/0/1) and per-bar PnL series.
+    # The PnL of bar t belongs to the trade held over the bar, i.e. the position of bar t-1.
+    one_dim = np.ndim(position) == 1
+    position = _as_2d(position)
+    pnl = np.nan_to_num(_as_2d(pnl), nan=0.0, posinf=0.0, neginf=0.0)
+    n_bars, n_cols = position.shape
+
+    position_lagged = np.zeros_like(position)
+    position_lagged[1:] = position[:-1]
+    trade_entry = (position != 0) & (position_lagged != position)
+
+    # Turnover: average absolute position change per bar, annualized
+    turnover = np.abs(np.diff(position, axis=0, prepend=0)).sum(axis=0) / max(n_bars, 1) * annualization_factor
+
+    # Global trade ids: one id per entry, offset per column so a single bincount covers every column
+    trade_id = np.cumsum(trade_entry, axis=0)
+    n_trades = trade_id[-1] if n_bars else np.zeros(n_cols, dtype=int)
+    offsets = np.concatenate(([0], np.cumsum(n_trades)[:-1]))
+    held = np.zeros_like(trade_entry)
+    held[1:] = position[:-1] != 0
+    held_id = np.zeros_like(trade_id)
+    held_id[1:] = trade_id[:-1]
+
+    ids = (held_id + offsets - 1)[held]
+    total = int(n_trades.sum())
+    trade_pnl = np.bincount(ids, weights=pnl[held], minlength=total)
+    trade_bars = np.bincount(ids, minlength=total)
+    trade_column = np.repeat(np.arange(n_cols), n_trades)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wins = np.bincount(trade_column, weights=trade_pnl > 0, minlength=n_cols)
+        win_rate = wins / n_trades
+        avg_trade_pnl = np.bincount(trade_column, weights=trade_pnl, minlength=n_cols) / n_trades
+        avg_holding = np.bincount(trade_column, weights=trade_bars, minlength=n_cols) / n_trades
+
+    return _unwrap({
+        "Trades": n_trades.astype(float),
+        "Turnover (x/yr)": turnover,
+        "Trade Win Rate (%)": 100 * win_rate,
+        "Avg Trade PnL ($)": avg_trade_pnl,
+        "Avg Holding (bars)": avg_holding,
+    }, one_dim)
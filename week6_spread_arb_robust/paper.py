@@ -0,0 +1,259 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import defaultdict
+import numpy as np
+from align import union_calendar
+from price_store import PriceStore
+from streaming import StreamingPairBacktester
+
+# Asyncio paper trading of the spread strategy against a local market feed.
+#   - ReplayServer streams the CSV close prices over TCP as JSON lines, per-symbol subscriptions,
+#     at `speed` calendar bars per second (0 = as fast as the clients read)
+#   - each PairSession is one subscription (one connection) to the two legs of a pair; when both legs
+#     of a bar have arrived the StreamingPairBacktester logic updates the signal, and a position change
+#     becomes an order to the SimulatedBroker
+#   - latency is recorded from the arrival of the bar completing a pair to the order decision
+# Everything runs on one event loop, so hundreds of sessions share a single process.
+#
+# Protocol: client -> {"subscribe": ["SPY", "IVV"]}
+#           server -> {"type": "bar", "symbol": "SPY", "ts": <UTC ns>, "close": 412.3} ... {"type": "end"}
+
+
+class ReplayServer:
+    def __init__(self, series, speed=0.0, host="127.0.0.1", port=0):
+        # series: {symbol: (sorted int64 UTC ns timestamps, close prices)}
+        self.series = series
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.server = None
+        self._payloads = {}
+
+
+    @classmethod
+    def from_files(cls, files, data_subdir="data", **kwargs):
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        data_dir = os.path.join(script_dir, data_subdir)
+        store = PriceStore(os.path.join(data_dir, ".price_store"))
+
+        series = {}
+        for file in files:
+            path = os.path.join(data_dir, file)
+            column = store.close_column(path)
+            index, data = store.load_arrays(path, columns=[column])
+            series[os.path.splitext(file)[0].upper()] = (index, data[column])
+        return cls(series, **kwargs)
+
+
+    def _payload(self, symbols):
+        # Encoded messages of one subscription, one bytes block per calendar bar (shared by identical subscriptions)
+        key = tuple(sorted(symbols))
+        if key not in self._payloads:
+            calendar = union_calendar([self.series[s][0] for s in key])
+            blocks = [[] for _ in range(len(calendar))]
+            for symbol in key:
+                index, close = self.series[symbol]
+                rows = np.searchsorted(calendar, index)
+                for row, ts, price in zip(rows.tolist(), index.tolist(), close.tolist()):
+                    if price != price:
+                        continue # No NaN prices on the feed (same as the dropna alignment)
+                    blocks[row].append(json.dumps({"type": "bar", "symbol": symbol, "ts": ts, "close": price}))
+            self._payloads[key] = [("\n".join(lines) + "\n").encode() for lines in blocks]
+        return self._payloads[key]
+
+
+    async def _handle(self, reader, writer):
+        try:
+            request = json.loads(await reader.readline())
+            symbols = list(request.get("subscribe", []))
+            unknown = [s for s in symbols if s not in self.series]
+            if unknown:
+                writer.write((json.dumps({"type": "error", "message": f"Unknown symbols: {unknown}"}) + "\n").encode())
+                return
+
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for i, block in enumerate(self._payload(symbols)):
+                if self.speed > 0:
+                    delay = started + i / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                writer.write(block)
+                await writer.drain()
+            writer.write(b'{"type": "end"}\n')
+            await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=2**20)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class SimulatedBroker:
+    # Fills every order immediately at the bar close, after an optional acknowledgement delay.
+    # Each account (one per session) holds shares and cash. Cost models:
+    #   - "spread" (default): the backtester's model (PairBacktester vectorized / StreamingPairBacktester),
+    #     cost_rate x |spread| x units on every order that enters a position, i.e. on the net notional
+    #     |sum of target shares x price| of the spread bought or sold; exits are free
+    #   - "notional": cost_rate x traded notional on every fill of every leg (as execution_model="event")
+    def __init__(self, transaction_costs_bps=1, slippage_bps=1, latency=0.0, cost_model="spread"):
+        if cost_model not in ("spread", "notional"):
+            raise ValueError("Invalid cost_model. Use 'spread' or 'notional'.")
+        self.cost_rate = transaction_costs_bps / 10_000 + slippage_bps / 10_000
+        self.latency = latency
+        self.cost_model = cost_model
+        self.holdings = defaultdict(lambda: defaultdict(float))
+        self.cash = defaultdict(float)
+        self.costs = defaultdict(float)
+        self.fills = []
+
+
+    async def submit(self, order):
+        # order: {"account": name, "ts": bar timestamp, "legs": {symbol: (target shares, price)}}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        account = order["account"]
+        # Spread model: one charge per order, booked on its first fill
+        order_cost = self.cost_rate * abs(sum(target * price for target, price in order["legs"].values()))
+        for symbol, (target, price) in order["legs"].items():
+            quantity = target - self.holdings[account][symbol]
+            if quantity == 0:
+                continue
+            if self.cost_model == "notional":
+                cost = abs(quantity) * price * self.cost_rate
+            else:
+                cost, order_cost = order_cost, 0.0
+            self.holdings[account][symbol] = target
+            self.cash[account] -= quantity * price + cost
+            self.costs[account] += cost
+            self.fills.append((account, order["ts"], symbol, quantity, price, cost))
+
+
+    def equity(self, account, prices):
+        # Cash plus holdings marked at `prices` ({symbol: last price})
+        return self.cash[account] + sum(q * prices[s] for s, q in self.holdings[account].items())
+
+
+class PairSession:
+    def __init__(self, name, symbol1, symbol2, strategy, broker):
+        self.name = name
+        self.symbol1 = symbol1
+        self.symbol2 = symbol2
+        self.strategy = strategy # StreamingPairBacktester
+        self.broker = broker
+        self.last = {}
+        self.latencies_ns = []
+        self.orders = 0
+
+
+    @classmethod
+    def from_params(cls, name, symbol1, symbol2, params, broker):
+        if params.get("execution_model", "vectorized") != "vectorized":
+            raise ValueError("Paper trading supports execution_model='vectorized' only (the broker simulates the fills).")
+        keys = ("hedge_ratio", "hedge_method", "hedge_window", "kalman_delta", "kalman_obs_var", "window", "z_entry", "z_exit", "transaction_costs_bps", "slippage_bps",
+                "capital", "positioning_method", "margin_rate", "annualization_factor")
+        return cls(name, symbol1, symbol2, StreamingPairBacktester(**{k: params[k] for k in keys if k in params}), broker)
+
+
+    async def _on_message(self, message, arrived_ns):
+        self.last[message["symbol"]] = (message["ts"], message["close"])
+        leg1, leg2 = self.last.get(self.symbol1), self.last.get(self.symbol2)
+        if leg1 is None or leg2 is None or leg1[0] != leg2[0]:
+            return # Pair bar not complete yet
+
+        previous = self.strategy.position
+        bar = self.strategy.on_bar(leg1[1], leg2[1])
+        order = None
+        if bar["position"] != previous and not math.isnan(bar["units"]):
+            units = bar["position"] * bar["units"]
+            order = {
+                "account": self.name,
+                "ts": leg1[0],
+                "legs": {
+                    self.symbol1: (units, leg1[1]),
+                    self.symbol2: (-units * bar["hedge_ratio"], leg2[1]),
+                },
+            }
+        self.latencies_ns.append(time.perf_counter_ns() - arrived_ns) # Bar arrival -> order decision
+
+        if order is not None:
+            self.orders += 1
+            await self.broker.submit(order)
+
+
+    async def run(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port, limit=2**20)
+        writer.write((json.dumps({"subscribe": [self.symbol1, self.symbol2]}) + "\n").encode())
+        await writer.drain()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                arrived_ns = time.perf_counter_ns()
+                message = json.loads(line)
+                if message["type"] == "bar":
+                    await self._on_message(message, arrived_ns)
+                elif message["type"] == "error":
+                    raise ValueError(message["message"])
+                else:
+                    break
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        return self
+
+
+    def summary(self):
+        # broker_pnl (account equity: shares held fixed between orders, costs booked at the fill) is the
+        # authoritative figure. strategy_pnl is the streaming backtest bookkeeping (units resized every bar,
+        # entry cost charged the next bar); with cost_model="spread" both use the same costs and differ by
+        # the unit resizing only, with "notional" the gap is the extra cost of trading both legs' notional.
+        prices = {symbol: close for symbol, (_, close) in self.last.items()}
+        return {
+            "session": self.name,
+            "bars": self.strategy.bars,
+            "orders": self.orders,
+            "cost_model": self.broker.cost_model,
+            "broker_pnl": self.broker.equity(self.name, prices) if prices else 0.0,
+            "broker_costs": self.broker.costs[self.name],
+            "strategy_pnl": self.strategy.cumulative_pnl,
+            **self.strategy.metrics(),
+        }
+
+
+def latency_stats(sessions):
+    latencies = np.concatenate([np.asarray(s.latencies_ns, dtype=float) for s in sessions]) / 1_000 # microseconds
+    if len(latencies) == 0:
+        return {}
+    return {
+        "decisions": len(latencies),
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p95_us": float(np.percentile(latencies, 95)),
+        "p99_us": float(np.percentile(latencies, 99)),
+        "max_us": float(latencies.max()),
+    }
+
+
+async def run_paper_trading(server, sessions):
+    # Serve the feed and run every session concurrently on the current event loop
+    await server.start()
+    try:
+        await asyncio.gather(*(session.run(server.host, server.port) for session in sessions))
+    finally:
+        await server.stop()
+    return sessions
@@ -1,58 +1,134 @@
+import multiprocessing as mp
+import os
 from pathlib import Path
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Rendering path for long histories:
+#   - equity, drawdown and the scaled z-score are computed once and shared by the three figures
+#   - every series is reduced to at most `max_points` points by min/max downsampling (the extremes of
+#     each bucket are kept, so spikes and drawdown troughs survive)
+#   - figures are drawn on the Agg canvas directly (no pyplot state, no interactive backend)
+#   - plot_all renders the three figures in parallel worker processes
+
+MAX_POINTS = 4000
+
 
 def _ensure_dir(path: str) -> Path:
     p = Path(path)
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def plot_pnl_curve(pnl, out_dir="outputs", filename="pnl_curve.png") -> str:
-    out = _ensure_dir(out_dir) / filename
-    equity = pnl.cumsum()
-    plt.figure(figsize=(10, 5))
-    equity.plot()
-    plt.title("Cumulative PnL")
-    plt.ylabel("PnL ($)")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(out)
-    plt.close()
+def minmax_downsample(y, max_points=MAX_POINTS):
+    # Indices of the points to draw: min and max of each of max_points/2 equal buckets, plus both ends
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    n_buckets = max(max_points // 2, 1)
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+
+    offsets = np.arange(n_buckets) * size
+    lo = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    hi = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    idx = np.unique(np.concatenate(([0, n - 1], lo, hi)))
+    return idx[idx < n]
+
+def _downsample(series, max_points):
+    idx = minmax_downsample(series.to_numpy(dtype=float), max_points)
+    return series.index.to_numpy()[idx], series.to_numpy(dtype=float)[idx]
+
+def prepare_plot_data(pnl=None, spread=None, z_score=None, max_points=MAX_POINTS):
+    # Everything the figures draw, already downsampled (small enough to ship to worker processes)
+    data = {}
+    if pnl is not None:
+        equity = pnl.cumsum()
+        peak = equity.cummax()
+        # avoid divide by zero at the start
+        drawdown_pct = (equity - peak) / peak.replace(0, np.nan)
+        data["equity"] = _downsample(equity, max_points)
+        data["drawdown"] = _downsample(drawdown_pct, max_points)
+    if spread is not None and z_score is not None:
+        # scale z-score to spread units for overlay (mean/std on overlapping sample)
+        z_scaled = z_score * spread.std() + spread.mean()
+        data["spread"] = _downsample(spread, max_points)
+        data["z_scaled"] = _downsample(z_scaled, max_points)
+    return data
+
+def _save(fig, out):
+    fig.tight_layout()
+    FigureCanvasAgg(fig).print_png(str(out))
     return str(out)
 
-def plot_spread_zscore(spread, z_score, out_dir="outputs", filename="spread_zscore.png") -> str:
+def _render_pnl_curve(data, out):
+    fig = Figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    ax.plot(*data["equity"])
+    ax.set_title("Cumulative PnL")
+    ax.set_ylabel("PnL ($)")
+    ax.grid(True)
+    return _save(fig, out)
+
+def _render_spread_zscore(data, out):
+    fig = Figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    ax.plot(*data["spread"], label="Spread")
+    ax.plot(*data["z_scaled"], label="Z-score (scaled)")
+    ax.set_title("Spread and Z-score (overlay)")
+    ax.legend()
+    ax.grid(True)
+    return _save(fig, out)
+
+def _render_drawdowns(data, out):
+    fig = Figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+    ax.plot(*data["drawdown"])
+    ax.set_title("Drawdown (%)")
+    ax.set_ylabel("Drawdown")
+    ax.grid(True)
+    return _save(fig, out)
+
+def _render(job):
+    renderer, data, out = job
+    return renderer(data, out)
+
+def plot_pnl_curve(pnl, out_dir="outputs", filename="pnl_curve.png", max_points=MAX_POINTS) -> str:
     out = _ensure_dir(out_dir) / filename
-    # scale z-score to spread units for overlay (mean/std on overlapping sample)
-    s_mean = spread.mean()
-    s_std = spread.std()
-    z_scaled = z_score * s_std + s_mean
-
-    plt.figure(figsize=(10, 5))
-    spread.plot(label="Spread")
-    plt.plot(z_scaled, label="Z-score (scaled)")
-    plt.title("Spread and Z-score (overlay)")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(out)
-    plt.close()
-    return str(out)
+    return _render_pnl_curve(prepare_plot_data(pnl=pnl, max_points=max_points), out)
 
-def plot_drawdowns(pnl, out_dir="outputs", filename="drawdowns.png") -> str:
+def plot_spread_zscore(spread, z_score, out_dir="outputs", filename="spread_zscore.png", max_points=MAX_POINTS) -> str:
     out = _ensure_dir(out_dir) / filename
-    equity = pnl.cumsum()
-    peak = equity.cummax()
-    drawdown = equity - peak
-    # avoid divide by zero at the start
-    peak_safe = peak.replace(0, np.nan)
-    drawdown_pct = drawdown / peak_safe
-
-    plt.figure(figsize=(10, 4))
-    drawdown_pct.plot()
-    plt.title("Drawdown (%)")
-    plt.ylabel("Drawdown")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(out)
-    plt.close()
-    return str(out)
+    return _render_spread_zscore(prepare_plot_data(spread=spread, z_score=z_score, max_points=max_points), out)
+
+def plot_drawdowns(pnl, out_dir="outputs", filename="drawdowns.png", max_points=MAX_POINTS) -> str:
+    out = _ensure_dir(out_dir) / filename
+    return _render_drawdowns(prepare_plot_data(pnl=pnl, max_points=max_points), out)
+
+def plot_all(pnl, spread, z_score, out_dir="outputs", processes=None, max_points=MAX_POINTS):
+    # The three figures from one shared pass over the series, rendered in parallel
+    return render_jobs(report_jobs(pnl, spread, z_score, out_dir, max_points=max_points), processes)
+
+def render_jobs(jobs, processes=None):
+    # jobs: [(renderer, data, out)], rendered inline on a single core, in a process pool otherwise
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    if processes <= 1:
+        return [_render(job) for job in jobs]
+
+    method = "fork" if "fork" in mp.get_all_start_methods() else None
+    with mp.get_context(method).Pool(processes) as pool:
+        return pool.map(_render, jobs)
+
+def report_jobs(pnl, spread, z_score, out_dir, max_points=MAX_POINTS):
+    # Render jobs of the three figures of one run (used to batch the reports of many runs)
+    out_dir = _ensure_dir(out_dir)
+    data = prepare_plot_data(pnl, spread, z_score, max_points=max_points)
+    return [
+        (_render_pnl_curve, data, out_dir / "pnl_curve.png"),
+        (_render_spread_zscore, data, out_dir / "spread_zscore.png"),
+        (_render_drawdowns, data, out_dir / "drawdowns.png"),
+    ]
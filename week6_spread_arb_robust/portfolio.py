@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+from bars import index_annualization_factor
+from metrics import compute_metrics
+
+# Capital allocation across many strategy books (e.g. the pair columns of a UniverseBacktester).
+# Inputs are per-bar returns on one unit of strategy capital and optionally the positions (-1/0/1).
+# Weights are multiples of the portfolio capital given to each strategy:
+#   - decided at the close of a bar from the covariance of the returns up to that bar, applied over the
+#     next bar (same lag as positions -> PnL in the backtesters)
+#   - "vol_target":  inverse-volatility weights, "risk_parity": equal risk contributions; both are then
+#     scaled so that the ex-ante portfolio volatility equals target_vol
+#   - capped per strategy (max_weight), then scaled down to the gross / net exposure limits, where
+#     gross = sum(w * |position|) and net = sum(w * position) in multiples of capital
+# The covariance is updated incrementally between rebalances (one block of bars at a time).
+
+
+class RollingCovariance:
+    # Incremental covariance of n return streams (NaN returns count as 0):
+    #   "ewma":    exponentially weighted sums, decayed by lam**k for a block of k bars (halflife in bars)
+    #   "rolling": sums over the last `window` bars; rows entering the window are added, rows leaving it subtracted
+    def __init__(self, n, method="ewma", halflife=60, window=60):
+        if method not in ("ewma", "rolling"):
+            raise ValueError("Invalid covariance method. Use 'ewma' or 'rolling'.")
+        self.method = method
+        self.lam = 0.5 ** (1 / halflife)
+        self.window = window
+        self.count = 0 # Bars seen
+        self.weight = 0.0 # Sum of the observation weights
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros((n, n))
+        self.buffer = np.empty((0, n)) # Last `window` rows ("rolling")
+
+
+    def update(self, rows):
+        rows = np.nan_to_num(np.atleast_2d(np.asarray(rows, dtype=float)), nan=0.0, posinf=0.0, neginf=0.0)
+        k = len(rows)
+        self.count += k
+
+        if self.method == "ewma":
+            decay = self.lam ** np.arange(k - 1, -1, -1) # Weight of each row at the end of the block
+            carry = self.lam ** k
+            self.weight = carry * self.weight + decay.sum()
+            self.s1 *= carry
+            self.s1 += decay @ rows
+            self.s2 *= carry
+            self.s2 += (rows * decay[:, None]).T @ rows
+            return
+
+        self.buffer = np.concatenate((self.buffer, rows))
+        dropped = self.buffer[:-self.window]
+        self.buffer = self.buffer[-self.window:]
+        self.weight = float(len(self.buffer))
+        self.s1 += rows.sum(axis=0) - dropped.sum(axis=0)
+        self.s2 += rows.T @ rows
+        if len(dropped):
+            self.s2 -= dropped.T @ dropped
+
+
+    def _ddof(self):
+        # Sample covariance (ddof=1) for "rolling", weighted moments for "ewma"
+        return self.weight / (self.weight - 1) if self.method == "rolling" and self.weight > 1 else 1.0
+
+
+    def covariance(self):
+        if self.weight == 0:
+            return np.full(self.s2.shape, np.nan)
+        mean = self.s1 / self.weight
+        return (self.s2 / self.weight - np.outer(mean, mean)) * self._ddof()
+
+
+    def variance(self):
+        if self.weight == 0:
+            return np.full(len(self.s1), np.nan)
+        mean = self.s1 / self.weight
+        return (np.diag(self.s2) / self.weight - mean * mean) * self._ddof()
+
+
+    def quadratic(self, weights):
+        # weights' cov weights without forming the covariance matrix
+        if self.weight == 0:
+            return np.nan
+        return (weights @ self.s2 @ weights / self.weight - (weights @ self.s1 / self.weight) ** 2) * self._ddof()
+
+
+def vol_target_weights(var):
+    # Inverse volatility: every strategy with a non-zero variance gets the same volatility budget
+    active = var > 0
+    weights = np.zeros(len(var))
+    weights[active] = 1 / np.sqrt(var[active])
+    return weights
+
+
+def risk_parity_weights(cov, initial=None, max_iter=50, tol=1e-3):
+    # Equal risk contributions w_i * (cov @ w)_i, normalized to sum to 1. Damped Newton on the convex
+    # problem min 0.5 * x'cov x - sum(log(x_i)) / n (Spinu 2013), whose minimum has x_i * (cov @ x)_i = 1/n.
+    # Stops once the Newton decrement is below tol (the last full step then lands within ~tol**2).
+    # Each iteration is one (n x n) solve; warm-started from the previous rebalance it takes two or three.
+    var = np.diag(cov)
+    active = var > 0
+    weights = np.zeros(len(var))
+    if not active.any():
+        return weights
+
+    sub = cov if active.all() else cov[np.ix_(active, active)]
+    budget = 1 / len(sub)
+    x = 1 / np.sqrt(var[active]) if initial is None else np.where(initial[active] > 0, initial[active], 1 / np.sqrt(var[active]))
+    x = x / np.sqrt(x @ sub @ x) # Scale of the solution: x'cov x = sum of the risk budgets = 1
+
+    for _ in range(max_iter):
+        gradient = sub @ x - budget / x
+        hessian = sub + np.diag(budget / (x * x))
+        step = np.linalg.solve(hessian, gradient)
+        decrement = np.sqrt(max(gradient @ step, 0.0))
+        x = x - (step / (1 + decrement) if decrement > 0.25 else step) # Damped phase keeps x > 0
+        if decrement <= tol:
+            break
+
+    weights[active] = x / x.sum()
+    return weights
+
+
+def apply_exposure_limits(weights, position=None, max_weight=None, max_gross=None, max_net=None):
+    # Cap each weight, then scale the whole book down (never up) to the gross / net limits.
+    # weights / position: 1-D (strategies) or 2-D (bars x strategies, one book per row)
+    weights = np.asarray(weights, dtype=float)
+    if max_weight is not None:
+        weights = np.minimum(weights, max_weight)
+
+    exposure = np.ones_like(weights) if position is None else np.asarray(position, dtype=float)
+    gross = (weights * np.abs(exposure)).sum(axis=-1, keepdims=True)
+    net = np.abs((weights * exposure).sum(axis=-1, keepdims=True))
+    scale = np.ones_like(gross)
+    with np.errstate(divide="ignore"):
+        if max_gross is not None:
+            scale = np.minimum(scale, np.where(gross > max_gross, max_gross / gross, 1.0))
+        if max_net is not None:
+            scale = np.minimum(scale, np.where(net > max_net, max_net / net, 1.0))
+    return weights * scale
+
+
+class PortfolioBacktester:
+    def __init__(
+            self,
+            returns,
+            positions=None,
+            method="vol_target",
+            target_vol=0.10,
+            cov_method="ewma",
+            halflife=60,
+            window=60,
+            min_periods=60,
+            rebalance_every=1,
+            shrinkage=0.1,
+            max_weight=None,
+            max_gross=None,
+            max_net=None,
+            capital=1_000_000,
+            annualization_factor=None,
+         ):
+
+        # returns: DataFrame (bars x strategies) of returns on one unit of strategy capital
+        # positions: same shape, position held over the next bar (for the exposure limits), optional
+        if method not in ("vol_target", "risk_parity"):
+            raise ValueError("Invalid method. Use 'vol_target' or 'risk_parity'.")
+
+        self.returns = returns
+        self.positions = positions
+        self.method = method
+        self.target_vol = target_vol
+        self.cov_method = cov_method
+        self.halflife = halflife
+        self.window = window
+        self.min_periods = min_periods
+        self.rebalance_every = rebalance_every
+        self.shrinkage = shrinkage # Weight of the diagonal target: keeps the covariance invertible with more strategies than bars
+        self.max_weight = max_weight
+        self.max_gross = max_gross
+        self.max_net = max_net
+        self.capital = capital
+        # None: from the bar frequency of the returns index (252 for daily bars)
+        self.annualization_factor = annualization_factor if annualization_factor is not None else index_annualization_factor(returns.index)
+
+        # Internal containers
+        self.weights = None
+        self.gross_exposure = None
+        self.net_exposure = None
+        self.pnl = None
+        self.daily_returns = None
+
+
+    @classmethod
+    def from_universe(cls, ub, **kwargs):
+        # Allocate across the pair books of a UniverseBacktester that has run its PnL stage
+        returns = pd.DataFrame(ub.pnl / ub.capital, index=ub.prices.index, columns=ub.labels)
+        positions = pd.DataFrame(ub.position, index=ub.prices.index, columns=ub.labels)
+        kwargs.setdefault("annualization_factor", ub.bars_per_year())
+        return cls(returns, positions, capital=kwargs.pop("capital", ub.capital * len(ub.pairs)), **kwargs)
+
+
+    @classmethod
+    def from_strategies(cls, strategies, cache, **kwargs):
+        # Allocate across Strategy objects (strategies package) evaluated on one IndicatorCache
+        results = [s.run(cache) for s in strategies]
+        names = [s.name for s in strategies]
+        returns = pd.DataFrame(
+            np.column_stack([pnl / s.capital for s, (_, pnl) in zip(strategies, results)]), index=cache.index, columns=names,
+        )
+        positions = pd.DataFrame(np.column_stack([p for p, _ in results]), index=cache.index, columns=names)
+        return cls(returns, positions, **kwargs)
+
+
+    def _allocate(self, cov, previous):
+        # cov: RollingCovariance, shrunk towards its diagonal: (1 - shrinkage) * cov + shrinkage * diag(cov)
+        var = cov.variance()
+        if self.method == "risk_parity":
+            shrunk = cov.covariance() * (1 - self.shrinkage)
+            shrunk[np.diag_indices_from(shrunk)] = var
+            weights = risk_parity_weights(shrunk, initial=previous)
+            portfolio_var = weights @ shrunk @ weights
+        else:
+            weights = vol_target_weights(var)
+            portfolio_var = (1 - self.shrinkage) * cov.quadratic(weights) + self.shrinkage * (weights * weights) @ var
+
+        portfolio_var *= self.annualization_factor
+        if portfolio_var <= 0 or not np.isfinite(portfolio_var):
+            return np.zeros_like(weights)
+        return weights * self.target_vol / np.sqrt(portfolio_var)
+
+
+    def compute_weights(self):
+        r = self.returns.to_numpy(dtype=float)
+        position = None if self.positions is None else self.positions.to_numpy(dtype=float)
+        n_bars, n = r.shape
+
+        cov = RollingCovariance(n, self.cov_method, self.halflife, self.window)
+        weights = np.zeros((n_bars, n))
+        target = np.zeros(n)
+        updated = 0 # First bar not yet in the covariance
+
+        # Rebalance at the close of every rebalance_every-th bar once min_periods bars are available
+        for t in range(self.min_periods - 1, n_bars, self.rebalance_every):
+            cov.update(r[updated:t + 1])
+            updated = t + 1
+            target = self._allocate(cov, target)
+            weights[t:t + self.rebalance_every] = target
+
+        # Exposure limits on the positions actually held over each next bar
+        weights = apply_exposure_limits(weights, position, self.max_weight, self.max_gross, self.max_net)
+
+        exposure = np.ones_like(weights) if position is None else position
+        self.weights = pd.DataFrame(weights, index=self.returns.index, columns=self.returns.columns)
+        self.gross_exposure = pd.Series((weights * np.abs(exposure)).sum(axis=1), index=self.returns.index)
+        self.net_exposure = pd.Series((weights * exposure).sum(axis=1), index=self.returns.index)
+
+
+    def compute_pnl(self):
+        r = np.nan_to_num(self.returns.to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        weights = self.weights.to_numpy()
+
+        portfolio_returns = np.full(len(r), np.nan)
+        portfolio_returns[1:] = (weights[:-1] * r[1:]).sum(axis=1) # Weights of bar t-1 earn the returns of bar t
+        self.pnl = pd.Series(self.capital * portfolio_returns, index=self.returns.index)
+
+
+    def compute_metrics(self):
+        daily_returns = self.pnl / self.capital
+        self.daily_returns = daily_returns.iloc[self.min_periods:]
+        return compute_metrics(self.daily_returns.to_numpy(), self.annualization_factor)
+
+
+    def run_backtest(self, verbose=True):
+        self.compute_weights()
+        self.compute_pnl()
+        metrics = self.compute_metrics()
+
+        if verbose:
+            print("✅ Portfolio backtest complete")
+            print(f"Strategies: {self.returns.shape[1]}")
+            print(f"Allocation: {self.method} (target vol {self.target_vol:.0%}, {self.cov_method} covariance)")
+            print(f"Final cumulative PnL: ${self.pnl.sum():.2f}")
+            print(f"Average gross exposure: {self.gross_exposure.iloc[self.min_periods:].mean():.2f}x")
+        return metrics
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+# Local columnar cache of the price CSVs: one directory per symbol holding one .npy file per column
+# (plus the UTC timestamps as int64 nanoseconds), so later loads skip CSV and date parsing entirely
+# and only memory-map the columns they need.
+# Several processes may convert the same symbol at once (sweep / walk-forward pools, queue workers): every
+# file is written under a unique temporary name and moved into place with os.replace, arrays first and
+# meta.json last, so a reader that sees a meta.json only ever opens complete arrays.
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _to_utc_ns(value):
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+class PriceStore:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+
+    def _symbol_dir(self, path):
+        symbol = os.path.splitext(os.path.basename(path))[0].upper()
+        return os.path.join(self.cache_dir, symbol)
+
+
+    def _read_meta(self, symbol_dir):
+        try:
+            with open(os.path.join(symbol_dir, "meta.json"), "r") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+
+    @staticmethod
+    def _tmp_path(path):
+        # Unique per writer, in the same directory (os.replace is atomic within one filesystem)
+        return f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+
+
+    def _write_meta(self, symbol_dir, meta):
+        path = os.path.join(symbol_dir, "meta.json")
+        tmp = self._tmp_path(path)
+        with open(tmp, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp, path)
+
+
+    def _save_array(self, symbol_dir, name, values):
+        path = os.path.join(symbol_dir, f"{name}.npy")
+        tmp = self._tmp_path(path)
+        with open(tmp, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp, path)
+
+
+    def _ensure(self, path):
+        # Return the cache metadata for `path`, converting the CSV first if the cache is missing or stale
+        symbol_dir = self._symbol_dir(path)
+        stat = os.stat(path)
+        meta = self._read_meta(symbol_dir)
+
+        if meta is not None and meta["source"] == os.path.abspath(path):
+            if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+                return meta
+            # File touched but possibly unchanged: compare content hashes before re-converting
+            if meta["size"] == stat.st_size and meta["sha256"] == _file_hash(path):
+                meta["mtime_ns"] = stat.st_mtime_ns
+                self._write_meta(symbol_dir, meta)
+                return meta
+
+        return self._convert(path, symbol_dir, stat)
+
+
+    def _convert(self, path, symbol_dir, stat):
+        os.makedirs(symbol_dir, exist_ok=True)
+        df = pd.read_csv(path)
+
+        # Timestamps with mixed UTC offsets (DST) are normalized to UTC once, here
+        index = pd.to_datetime(df.iloc[:, 0], utc=True)
+        order = np.argsort(index.to_numpy(dtype="int64"), kind="stable")
+        self._save_array(symbol_dir, "index", index.to_numpy(dtype="int64")[order])
+
+        columns = []
+        for column in df.columns[1:]:
+            values = df[column]
+            if not pd.api.types.is_numeric_dtype(values):
+                continue
+            self._save_array(symbol_dir, column, values.to_numpy(dtype=float)[order])
+            columns.append(column)
+
+        meta = {
+            "source": os.path.abspath(path),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": _file_hash(path),
+            "index_name": df.columns[0],
+            "columns": columns,
+        }
+        self._write_meta(symbol_dir, meta) # Published once every array is in place
+        return meta
+
+
+    def fingerprint(self, path):
+        # Content hash of the source CSV (cached alongside the columns, re-hashed only when the file changes)
+        return self._ensure(path)["sha256"]
+
+
+    def columns(self, path):
+        return list(self._ensure(path)["columns"])
+
+
+    def load_arrays(self, path, columns=None, start=None, end=None):
+        # Raw arrays: (timestamps as sorted int64 UTC nanoseconds, {column: float64 values})
+        meta = self._ensure(path)
+        symbol_dir = self._symbol_dir(path)
+        columns = meta["columns"] if columns is None else list(columns)
+
+        missing = [c for c in columns if c not in meta["columns"]]
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {path}")
+
+        # Date range selection on the sorted int64 index, before touching any price column
+        index = np.load(os.path.join(symbol_dir, "index.npy"), mmap_mode="r")
+        lo = 0 if start is None else int(np.searchsorted(index, _to_utc_ns(start), side="left"))
+        hi = len(index) if end is None else int(np.searchsorted(index, _to_utc_ns(end), side="right"))
+
+        data = {
+            column: np.array(np.load(os.path.join(symbol_dir, f"{column}.npy"), mmap_mode="r")[lo:hi])
+            for column in columns
+        }
+        return np.array(index[lo:hi]), data
+
+
+    def load(self, path, columns=None, start=None, end=None):
+        # Date index in UTC: the source offsets (e.g. -05:00 / -04:00 across DST) are not kept
+        index, data = self.load_arrays(path, columns=columns, start=start, end=end)
+        dates = pd.DatetimeIndex(index.view("datetime64[ns]"), name=self._ensure(path)["index_name"]).tz_localize("UTC")
+        return pd.DataFrame(data, index=dates)
+
+
+    def close_column(self, path):
+        # Close column if present, first column otherwise (same rule as PairBacktester.load_data)
+        columns = self.columns(path)
+        return "Close" if "Close" in columns else columns[0]
+
+
+    def load_close(self, path, start=None, end=None):
+        column = self.close_column(path)
+        return self.load(path, columns=[column], start=start, end=end)[column]
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from metrics import ANNUALIZATION_FACTOR, compute_metrics, trade_stats
+
+# Compact, read-only record of a finished PairBacktester run, for keeping many runs in memory:
+#   - one index object shared with the backtester (and with every result built from the same data)
+#   - the float columns in one contiguous (columns x bars) buffer, float64 or float32
+#   - positions as int8 and trade entries as a bit-packed boolean bitmap (1 bit per bar)
+#   - daily returns are not stored: they are pnl / capital on the bars where it is finite
+# to_pandas() / series() wrap the buffers without copying (only the bitmap is unpacked).
+
+FLOAT_COLUMNS = ("price1", "price2", "hedge_ratio", "spread", "z_score", "unit_cost", "units", "cost", "pnl")
+
+
+class BacktestResult:
+    __slots__ = ("index", "labels", "capital", "values", "position", "trade_bits", "metrics", "params")
+
+
+    def __init__(self, index, labels, capital, values, position, trade_bits, metrics=None, params=None):
+        self.index = index
+        self.labels = labels # (label1, label2)
+        self.capital = capital
+        self.values = values # (len(FLOAT_COLUMNS) x bars), read-only
+        self.position = position # int8, read-only
+        self.trade_bits = trade_bits # np.packbits of the trade entries
+        self.metrics = metrics
+        self.params = params
+
+
+    @classmethod
+    def from_backtester(cls, bt, precision="float64", metrics=None):
+        if bt.data is None or bt.pnl is None:
+            raise ValueError("Backtest not complete. Run run_backtest() first.")
+        if precision not in ("float64", "float32"):
+            raise ValueError("Invalid precision. Use 'float64' or 'float32'.")
+
+        n = len(bt.data.index)
+        hedge = bt.hedge_ratios.to_numpy() if bt.hedge_ratios is not None else np.full(n, bt.hedge_ratio)
+        arrays = {
+            "price1": bt.data[bt.label1].to_numpy(),
+            "price2": bt.data[bt.label2].to_numpy(),
+            "hedge_ratio": hedge,
+            "spread": bt.spread.to_numpy(),
+            "z_score": bt.z_score.to_numpy(),
+            "unit_cost": bt.unit_cost.to_numpy(),
+            "units": bt.units.to_numpy(),
+            "cost": bt.cost.to_numpy(),
+            "pnl": bt.pnl.to_numpy(),
+        }
+        values = np.empty((len(FLOAT_COLUMNS), n), dtype=precision)
+        for row, column in enumerate(FLOAT_COLUMNS):
+            values[row] = arrays[column]
+        values.flags.writeable = False
+
+        position = bt.position.to_numpy().astype(np.int8)
+        position.flags.writeable = False
+        trade_bits = np.packbits(bt.trade_entry.to_numpy(dtype=bool))
+
+        params = {k: getattr(bt, k) for k in ("window", "z_entry", "z_exit", "hedge_method", "positioning_method")}
+        params["annualization_factor"] = bt.bars_per_year()
+        return cls(bt.data.index, (bt.label1, bt.label2), bt.capital, values, position, trade_bits, metrics, params)
+
+
+    def __len__(self):
+        return len(self.index)
+
+
+    def __getattr__(self, name):
+        # Float columns by name (result.pnl, result.spread, ...), as read-only views of the buffer
+        if name in FLOAT_COLUMNS:
+            return self.values[FLOAT_COLUMNS.index(name)]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+
+    @property
+    def trade_entry(self):
+        return np.unpackbits(self.trade_bits, count=len(self.index)).astype(bool)
+
+
+    @property
+    def nbytes(self):
+        # Memory of the arrays owned by the result (the shared index is not counted)
+        return self.values.nbytes + self.position.nbytes + self.trade_bits.nbytes
+
+
+    def daily_returns(self):
+        with np.errstate(invalid="ignore"):
+            returns = self.pnl / self.capital
+        valid = np.isfinite(returns)
+        return pd.Series(returns[valid], index=self.index[valid])
+
+
+    def compute_metrics(self):
+        # Same metrics as PairBacktester.compute_metrics (computed in float64 from the stored PnL)
+        factor = (self.params or {}).get("annualization_factor", ANNUALIZATION_FACTOR)
+        metrics = compute_metrics(self.daily_returns().to_numpy(dtype=float), factor)
+        metrics.update(trade_stats(self.position, self.pnl.astype(float), factor))
+        return metrics
+
+
+    def series(self, name):
+        if name == "position":
+            return pd.Series(self.position, index=self.index, name=name, copy=False)
+        if name == "trade_entry":
+            return pd.Series(self.trade_entry, index=self.index, name=name, copy=False)
+        return pd.Series(getattr(self, name), index=self.index, name=name, copy=False)
+
+
+    def to_pandas(self):
+        # One DataFrame over the stored buffers (zero-copy except the unpacked trade entries)
+        columns = {column: self.values[row] for row, column in enumerate(FLOAT_COLUMNS)}
+        columns["position"] = self.position
+        columns["trade_entry"] = self.trade_entry
+        return pd.DataFrame(columns, index=self.index, copy=False)
@@ -1,8 +1,14 @@
 import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from utils import calculate_sharpe, calculate_sortino, calculate_hit_ratio, calculate_max_drawdown, calculate_calmar
+from align import load_aligned
+from bars import index_annualization_factor, rolling_mean_std, session_ids
+from cache import ResultCache, cache_key, code_version
+from export import write_timeseries
+from instrumentation import StageRecorder
+from price_store import PriceStore
+from strategies.pair import pair_positions, spread_pnl
+from metrics import compute_metrics, trade_stats
 
 
 class PairBacktester:
@@ -12,6 +18,10 @@ class PairBacktester:
             file2,
             data_subdir="data",
             hedge_ratio=1,
+            hedge_method="static",
+            hedge_window=60,
+            kalman_delta=1e-4,
+            kalman_obs_var=1e-3,
             window=100,
             z_entry=2.0,
             z_exit=0.5,
@@ -20,10 +30,25 @@ class PairBacktester:
             capital=1_000_000,
             positioning_method="net",
             margin_rate=0.1,
+            execution_model="vectorized",
+            participation_rate=0.1,
+            impact_bps=10,
             export_filename="backtest_timeseries",
             export_subdir="outputs",
+            export_format="csv",
+            export_compression=None,
+            run_id=None,
+            cache_subdir=None,
+            cache_max_mb=512,
             plots=True,
-            log_file="logs"
+            log_file="logs",
+            start=None,
+            end=None,
+            fill_policy="drop",
+            max_staleness=None,
+            bar_frequency=None,
+            session=None,
+            instrument=False
          ):
         
         # Resolve absolute path to the data directory relative to this script
@@ -34,12 +59,30 @@ class PairBacktester:
         self.file1 = os.path.join(self.data_dir, file1)
         self.file2 = os.path.join(self.data_dir, file2)
 
+        # Columnar cache of the CSVs (parsed once, then memory-mapped)
+        self.price_store = PriceStore(os.path.join(self.data_dir, ".price_store"))
+        self.start = start
+        self.end = end
+
+        # Bars where a leg is missing: "drop", "ffill" (at most max_staleness bars) or "flag" (kept as NaN)
+        self.fill_policy = fill_policy
+        self.max_staleness = max_staleness
+
+        # Bar size ("5min", "1D", ...; None: inferred from the data) for the annualization factor, and the
+        # trading session ({"start": "09:30", "end": "16:00", "tz": ...}) at which rolling windows restart
+        self.bar_frequency = bar_frequency
+        self.session = session
+
         # Extract asset labels from filenames
         self.label1 = os.path.splitext(file1)[0].upper()
         self.label2 = os.path.splitext(file2)[0].upper()
 
         self.hedge_ratio = hedge_ratio
-        self.window=window
+        self.hedge_method = hedge_method # "static" (hedge_ratio), "rolling_ols" or "kalman"
+        self.hedge_window = hedge_window
+        self.kalman_delta = kalman_delta
+        self.kalman_obs_var = kalman_obs_var
+        self.window=window # Bars (int) or a time span ("2h", intraday data)
         self.z_entry=z_entry
         self.z_exit=z_exit
 
@@ -52,8 +95,31 @@ class PairBacktester:
         self.positioning_method = positioning_method
         self.margin_rate = margin_rate
 
+        # "vectorized": flat cost rate the bar after an entry; "event": per-leg fills with
+        # volume-dependent impact, participation caps and partial fills (see execution.py)
+        self.execution_model = execution_model
+        self.participation_rate = participation_rate
+        self.impact_bps = impact_bps
+
+        # Per-bar output: "csv", "parquet" or "feather", optionally appended to a dataset partitioned by run_id
+        self.export_format = export_format
+        self.export_compression = export_compression
+        self.run_id = run_id
+
+        # Per-stage timings / memory (no-op unless instrument=True)
+        self.instrumentation = StageRecorder(enabled=instrument)
+
+        # Stage outputs memoized on disk, keyed by code version, data fingerprints and parameters (None disables)
+        self.cache = None
+        if cache_subdir is not None:
+            self.cache = ResultCache(os.path.join(script_dir, cache_subdir), max_bytes=int(cache_max_mb * 2**20))
+        self._cache_key = None
+
         # Internal containers
         self.data = None
+        self.alignment = None
+        self.volume = None
+        self.hedge_ratios = None
         self.spread = None
         self.z_score = None
         self.position = None
@@ -62,86 +128,144 @@ class PairBacktester:
         self.trade_entry = None
         self.cost = None
         self.pnl = None
+        self.fills = None
         self.daily_returns = None
 
     
     def load_data(self):
-        df1 = pd.read_csv(self.file1, index_col=0, parse_dates=True)
-        df2 = pd.read_csv(self.file2, index_col=0, parse_dates=True)
-        self.data = pd.DataFrame({
-            self.label1: df1["Close"] if "Close" in df1.columns else df1.iloc[:, 0],
-            self.label2: df2["Close"] if "Close" in df2.columns else df2.iloc[:, 0],
-        }).dropna()
+        self.data, self.alignment = load_aligned(
+            self.price_store, [self.file1, self.file2], [self.label1, self.label2],
+            fill_policy=self.fill_policy, max_staleness=self.max_staleness, start=self.start, end=self.end,
+        )
+
+        # Traded volumes are only needed by the event-driven execution model
+        if self.execution_model == "event":
+            self.volume = pd.DataFrame({
+                label: self._load_volume(path).reindex(self.data.index)
+                for label, path in ((self.label1, self.file1), (self.label2, self.file2))
+            })
+
+
+    def _load_volume(self, path):
+        if "Volume" not in self.price_store.columns(path):
+            return pd.Series(np.nan, index=self.data.index)
+        return self.price_store.load(path, columns=["Volume"], start=self.start, end=self.end)["Volume"]
+
+
+    def compute_hedge_ratios(self):
+        price1 = self.data[self.label1]
+        price2 = self.data[self.label2]
+
+        # Per-bar hedge ratio (None when the static hedge_ratio is used)
+        if self.hedge_method == "static":
+            self.hedge_ratios = None
+        elif self.hedge_method == "rolling_ols":
+            from hedge import rolling_ols_hedge # Lazy: the hedge/execution kernels pull in numba
+            beta = rolling_ols_hedge(price1.to_numpy(), price2.to_numpy(), int(self.hedge_window))
+            self.hedge_ratios = pd.Series(beta, index=self.data.index)
+        elif self.hedge_method == "kalman":
+            from hedge import kalman_hedge
+            beta = kalman_hedge(price1.to_numpy(), price2.to_numpy(), self.kalman_delta, self.kalman_obs_var)
+            self.hedge_ratios = pd.Series(beta, index=self.data.index)
+        else:
+            raise ValueError("Invalid hedge_method. Use 'static', 'rolling_ols' or 'kalman'.")
+
+
+    def _hedge(self):
+        return self.hedge_ratio if self.hedge_ratios is None else self.hedge_ratios
 
 
     def compute_spread(self):
         price1 = self.data[self.label1]
         price2 = self.data[self.label2]
 
-        self.spread = price1 - self.hedge_ratio * price2
+        self.compute_hedge_ratios()
+        self.spread = price1 - self._hedge() * price2
         
-        rolling_mean = self.spread.rolling(window=self.window).mean()
-        rolling_std = self.spread.rolling(window=self.window).std()
+        if isinstance(self.window, str) or self.session is not None:
+            # Time-span windows and / or windows that do not reach back into the previous session
+            ts = self.spread.index.asi8
+            sessions = None if self.session is None else session_ids(ts, self.session)
+            mean, std = rolling_mean_std(self.spread.to_numpy(dtype=float), self.window, ts=ts, sessions=sessions)
+            rolling_mean = pd.Series(mean, index=self.spread.index)
+            rolling_std = pd.Series(std, index=self.spread.index)
+        else:
+            rolling_mean = self.spread.rolling(window=self.window).mean()
+            rolling_std = self.spread.rolling(window=self.window).std()
 
         self.z_score = (self.spread - rolling_mean) / rolling_std
     
 
     def generate_signals(self):
-        z_score_lagged = self.z_score.shift(1)
-
-        entry_long = z_score_lagged < -self.z_entry
-        entry_short = z_score_lagged > self.z_entry
-        exit = (z_score_lagged > -self.z_exit) & (z_score_lagged < self.z_exit)
-
-        position = []
-        current_pos = 0
-
-        for long_sig, short_sig, exit_sig in zip(entry_long, entry_short, exit):
-            if exit_sig:
-                current_pos = 0
-            elif long_sig:
-                current_pos = 1
-            elif short_sig:
-                current_pos = -1
-            position.append(current_pos)
-        
+        # State machine on the previous bar's z-score (strategies/pair.py)
+        position = pair_positions(self.z_score.to_numpy(), self.z_entry, self.z_exit)
+
         self.position = pd.Series(position, index=self.data.index)
     
 
     def compute_pnl(self):
-        price1 = self.data[self.label1]
-        price2 = self.data[self.label2]
+        if self.execution_model not in ("vectorized", "event"):
+            raise ValueError("Invalid execution_model. Use 'vectorized' or 'event'.")
+        price1 = self.data[self.label1].to_numpy()
+        price2 = self.data[self.label2].to_numpy()
+        hedge = self._hedge()
+        hedge = hedge.to_numpy() if isinstance(hedge, pd.Series) else hedge
 
-        # Per-unit cost of a spread (depending on the positioning method)
-        if self.positioning_method == "gross":
-            unit_cost = price1 + (self.hedge_ratio * price2).abs()
-        elif self.positioning_method == "net":
-            unit_cost = np.maximum(price1, (self.hedge_ratio * price2).abs())
-        elif self.positioning_method == "margin":
-            unit_cost = (price1 + (self.hedge_ratio * price2).abs()) * self.margin_rate
-        else:
-            raise ValueError("Invalid positioning_method. Use 'gross', 'net' or 'margin'.")
-        
-        unit_cost = unit_cost.replace(0, np.nan)
-        self.unit_cost = unit_cost
-        units = self.capital / unit_cost
-        self.units = units
+        spread_return = None
+        if self.hedge_ratios is not None:
+            # The spread held over a bar keeps the previous bar's hedge ratio
+            spread_return = np.diff(price1, prepend=np.nan) - np.concatenate(([np.nan], hedge[:-1])) * np.diff(price2, prepend=np.nan)
 
-        spread_return = self.spread.diff()
-        position_lagged = self.position.shift(1).fillna(0) # Shift position to avoid lookahead bias (necessary additionally to the shift in z_score_lagged)
+        # Units, entry costs and PnL (strategies/pair.py, shared with the universe, sweep and chunked engines)
+        unit_cost, units, trade_entry, cost, pnl = spread_pnl(
+            self.position.to_numpy(), self.spread.to_numpy(), price1, hedge * price2, self.capital,
+            self.transaction_costs + self.slippage, self.positioning_method, self.margin_rate, spread_return,
+        )
+        index = self.data.index
+        self.unit_cost = pd.Series(unit_cost, index=index)
+        self.units = pd.Series(units, index=index)
 
-        raw_pnl = position_lagged * units * spread_return
+        if self.execution_model == "event":
+            self._compute_pnl_event(self.units)
+            return
 
-        # Transaction cost when a trade is done (when position change)
-        trade_entry = (self.position != 0) & (position_lagged != self.position)
-        self.trade_entry = trade_entry
+        self.trade_entry = pd.Series(trade_entry, index=index)
+        self.cost = pd.Series(cost, index=index)
+        self.pnl = pd.Series(pnl, index=index)
 
-        total_cost_rate = self.transaction_costs + self.slippage
-        cost = trade_entry.shift(1).astype("boolean").fillna(False).astype(float) \
-            * total_cost_rate * self.spread.abs() * units
-        self.cost = cost
-        
-        self.pnl = raw_pnl - cost
+
+    def _compute_pnl_event(self, units):
+        from execution import simulate_execution
+        hedge = self._hedge()
+        if self.hedge_ratios is not None:
+            hedge = hedge.to_numpy()
+
+        position_lagged = self.position.shift(1).fillna(0)
+        self.trade_entry = (self.position != 0) & (position_lagged != self.position)
+
+        volume = self.volume if self.volume is not None else pd.DataFrame(np.nan, index=self.data.index, columns=[self.label1, self.label2])
+        result = simulate_execution(
+            self.position.to_numpy(),
+            units.to_numpy(),
+            hedge,
+            self.data[self.label1].to_numpy(),
+            self.data[self.label2].to_numpy(),
+            volume[self.label1].to_numpy(),
+            volume[self.label2].to_numpy(),
+            participation_rate=self.participation_rate,
+            fixed_cost_rate=self.transaction_costs + self.slippage,
+            impact_bps=self.impact_bps,
+        )
+
+        index = self.data.index
+        self.fills = pd.DataFrame({
+            f"{self.label1}_holdings": result["holdings1"],
+            f"{self.label2}_holdings": result["holdings2"],
+            f"{self.label1}_fill": result["fills1"],
+            f"{self.label2}_fill": result["fills2"],
+        }, index=index)
+        self.cost = pd.Series(result["cost"], index=index)
+        self.pnl = pd.Series(result["pnl"], index=index)
      
     def compute_metrics(self):
         if self.pnl is None:
@@ -151,22 +275,77 @@ class PairBacktester:
         daily_returns = daily_returns.replace([np.inf, -np.inf], np.nan).dropna()
         self.daily_returns = daily_returns
 
-        metrics = {
-            "Annualize Return (%)": 100 * self.daily_returns.mean() * 252,
-            "Volatility (%)": 100 * daily_returns.std() * np.sqrt(252),
-            "Sharpe Ratio": calculate_sharpe(self.daily_returns),
-            "Sortino Ratio": calculate_sortino(self.daily_returns),
-            "Max Drawdown (%)": 100 * calculate_max_drawdown(self.daily_returns),
-            "Calmar Ratio": calculate_calmar(self.daily_returns),
-            "Hit Ratio (%)": 100 * calculate_hit_ratio(self.daily_returns),
-        }
+        # All statistics from one pass over the returns array, plus trade-level stats
+        factor = self.bars_per_year()
+        metrics = compute_metrics(self.daily_returns.to_numpy(), factor)
+        if self.position is not None: # Callers that only set the PnL (e.g. stitched slices) get the return metrics
+            metrics.update(trade_stats(self.position.to_numpy(), self.pnl.to_numpy(), factor))
         return metrics
-    
+
+
+    def bars_per_year(self, ts=None):
+        # Annualization factor of the bar frequency (252 for daily bars; intraday bars without a session
+        # count the median number of bars per date), from the loaded data or the given timestamps
+        return index_annualization_factor(self.data.index if ts is None else ts, self.bar_frequency, self.session)
+
+
+    def stage(self, name):
+        # Context manager recording one stage (also usable around export / plots by the caller)
+        return self.instrumentation.stage(name, rows=lambda: 0 if self.data is None else len(self.data))
+
+
+    def _cached_stage(self, name, params, attrs, compute):
+        # Run one stage, or restore its outputs from the cache when neither its parameters nor any upstream stage changed
+        with self.stage(name):
+            if self.cache is None:
+                return compute()
+
+            self._cache_key = cache_key(self._cache_key, name, params)
+            cached = self.cache.get(self._cache_key)
+            if cached is not None:
+                for attr in attrs:
+                    setattr(self, attr, cached[attr])
+                return cached["result"]
+
+            result = compute()
+            self.cache.put(self._cache_key, {"result": result, **{attr: getattr(self, attr) for attr in attrs}})
+            return result
+
+
     def run_backtest(self, verbose=True, compute_metrics=True):
-        self.load_data()
-        self.compute_spread()
-        self.generate_signals()
-        self.compute_pnl()
+        if self.cache is not None:
+            self._cache_key = cache_key(
+                code_version(), self.price_store.fingerprint(self.file1), self.price_store.fingerprint(self.file2),
+            )
+
+        self._cached_stage(
+            "load", {
+                "start": self.start, "end": self.end, "volume": self.execution_model == "event",
+                "fill_policy": self.fill_policy, "max_staleness": self.max_staleness,
+            },
+            ["data", "alignment", "volume"], self.load_data,
+        )
+        self._cached_stage(
+            "spread", {
+                "hedge_method": self.hedge_method, "hedge_ratio": self.hedge_ratio, "hedge_window": self.hedge_window,
+                "kalman_delta": self.kalman_delta, "kalman_obs_var": self.kalman_obs_var, "window": self.window,
+                "session": self.session,
+            },
+            ["hedge_ratios", "spread", "z_score"], self.compute_spread,
+        )
+        self._cached_stage(
+            "signals", {"z_entry": self.z_entry, "z_exit": self.z_exit},
+            ["position"], self.generate_signals,
+        )
+        self._cached_stage(
+            "pnl", {
+                "transaction_costs_bps": self.transaction_costs_bps, "slippage_bps": self.slippage_bps,
+                "capital": self.capital, "positioning_method": self.positioning_method, "margin_rate": self.margin_rate,
+                "execution_model": self.execution_model, "participation_rate": self.participation_rate,
+                "impact_bps": self.impact_bps,
+            },
+            ["unit_cost", "units", "trade_entry", "cost", "pnl", "fills"], self.compute_pnl,
+        )
 
         if verbose:
             print("✅ Backtest complete")
@@ -175,9 +354,18 @@ class PairBacktester:
             print(f"Total trades: {self.trade_entry.sum()}")
         
         if compute_metrics:
-            return self.compute_metrics()
+            return self._cached_stage(
+                "metrics", {"bar_frequency": self.bar_frequency, "session": self.session},
+                ["daily_returns"], self.compute_metrics,
+            )
         
     
+    def result(self, precision="float64", metrics=None):
+        # Compact record of the finished run (see results.py), to keep many runs in memory
+        from results import BacktestResult
+        return BacktestResult.from_backtester(self, precision=precision, metrics=metrics)
+
+
     def export_timeseries(self, filename="backtest_timeseries.csv"):
         if self.data is None or self.spread is None or self.pnl is None:
             raise ValueError("Backtest not complete. Run run_backtest() first.")
@@ -186,21 +374,23 @@ class PairBacktester:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         full_path = os.path.join(script_dir, filename)
 
-        price1 = self.data[self.label1]
-        price2 = self.data[self.label2]
+        # Columns passed as the underlying arrays (no intermediate DataFrame of the whole run)
+        columns = {
+            f"{self.label1}_price": self.data[self.label1].to_numpy(),
+            f"{self.label2}_price": self.data[self.label2].to_numpy(),
+            "spread": self.spread.to_numpy(),
+            "z_score": self.z_score.to_numpy(),
+            "position": self.position.to_numpy(),
+            "units": self.units.to_numpy(),
+            "transaction_cost": self.cost.to_numpy(),
+            "pnl": self.pnl.to_numpy(),
+            "daily_returns": self.daily_returns.reindex(self.data.index).to_numpy(),
+            "trade_entry": self.trade_entry.to_numpy(dtype=float),
+        }
 
-        df_export = pd.DataFrame({
-            f"{self.label1}_price": price1,
-            f"{self.label2}_price": price2,
-            "spread": self.spread,
-            "z_score": self.z_score,
-            "position": self.position,
-            "units": self.units,
-            "transaction_cost": self.cost,
-            "pnl": self.pnl,
-            "daily_returns": self.daily_returns,
-            "trade_entry": self.trade_entry.astype(float),
-        })
-
-        df_export.to_csv(full_path)
-        print(f"✅ Time series exported to {full_path}")
\ No newline at end of file
+        full_path = write_timeseries(
+            full_path, self.data.index, columns,
+            fmt=self.export_format, compression=self.export_compression, run_id=self.run_id,
+        )
+        print(f"✅ Time series exported to {full_path}")
+        return full_path
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+# Rolling moments of a base spread s0 = p1 - h0*p2 and of p2. The rolling mean/std of the spread for
+# ANY hedge ratio h follow from them, with d = h - h0:
+#   mean(p1 - h*p2) = mean(s0) - d*mean(p2)
+#   var(p1 - h*p2)  = var(s0) + d^2*var(p2) - 2*d*cov(s0, p2)
+# so they are computed once per window and reused for every hedge ratio and every slice of the history.
+# Working around a base spread (rather than p1 and p2 directly) keeps d small and avoids the
+# cancellation between the large price variances.
+
+
+def rolling_moments(price1, price2, window, base_hedge_ratio=1.0):
+    price1 = np.asarray(price1, dtype=float)
+    price2 = pd.Series(np.asarray(price2, dtype=float))
+    base_spread = pd.Series(price1 - base_hedge_ratio * price2.to_numpy())
+
+    rs = base_spread.rolling(window=window)
+    r2 = price2.rolling(window=window)
+    return {
+        "base_hedge_ratio": base_hedge_ratio,
+        "mean_spread": rs.mean().to_numpy(),
+        "mean2": r2.mean().to_numpy(),
+        "var_spread": rs.var().to_numpy(),
+        "var2": r2.var().to_numpy(),
+        "cov": rs.cov(price2).to_numpy(),
+    }
+
+
+def spread_zscore(price1, price2, moments, hedge_ratio, lo=0, hi=None):
+    # Spread p1 - h*p2 and its z-score over bars [lo, hi) from precomputed moments
+    hi = len(price1) if hi is None else hi
+    p1 = np.asarray(price1, dtype=float)[lo:hi]
+    p2 = np.asarray(price2, dtype=float)[lo:hi]
+    d = hedge_ratio - moments["base_hedge_ratio"]
+
+    spread = p1 - hedge_ratio * p2
+    mean = moments["mean_spread"][lo:hi] - d * moments["mean2"][lo:hi]
+    var = moments["var_spread"][lo:hi] + d**2 * moments["var2"][lo:hi] - 2 * d * moments["cov"][lo:hi]
+    var = np.maximum(var, 0) # Clamp tiny negative values from cancellation
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (spread - mean) / np.sqrt(var)
+    return spread, z_score
@@ -0,0 +1,101 @@
+import json
+import os
+import time
+import logging
+import argparse
+from jobqueue import JobQueue, run_local_workers, run_worker, shard_jobs, worker_id
+from sweep import grid_specs, random_specs
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+    sweep_dir = os.path.join(script_dir, "sweep.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Distributed sweep through a SQLite job queue: enqueue on one node, run workers on any node")
+    parser.add_argument("command", choices=["enqueue", "work", "status", "collect", "retry"], help="Coordinator (enqueue / status / collect / retry) or worker (work) action")
+    parser.add_argument("--queue", type=str, default="outputs/jobs.sqlite", help="Path to the queue database (shared by every node)")
+    parser.add_argument("--name", type=str, default="sweep", help="Sweep name (several sweeps can share one queue)")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to this node's config.json (data and cache location)")
+    parser.add_argument("--sweep", type=str, default=sweep_dir, help="Path to the sweep spec (enqueue)")
+    parser.add_argument("--random", type=int, help="Sample N random configurations from the spec instead of the full grid (enqueue)")
+    parser.add_argument("--seed", type=int, help="Seed for random search (enqueue)")
+    parser.add_argument("--pairs_file", type=str, help="Ranked pair table from run_screening.py: one shard per pair (enqueue)")
+    parser.add_argument("--top", type=int, help="Only the N best ranked pairs of --pairs_file (enqueue)")
+    parser.add_argument("--chunk_size", type=int, default=64, help="Sweep configurations per job (enqueue)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes on this node (work)")
+    parser.add_argument("--lease", type=float, default=60.0, help="Seconds without heartbeat before a running job is re-claimed")
+    parser.add_argument("--max_runtime", type=float, help="Seconds a job may run before it is abandoned and re-claimed (default: no limit)")
+    parser.add_argument("--max_attempts", type=int, default=3, help="Attempts per job before it is marked failed")
+    parser.add_argument("--no_wal", action="store_true", help="Rollback journal instead of WAL (queue file on a network filesystem)")
+    parser.add_argument("--output", type=str, default="outputs/distributed_results.csv", help="Results table path (collect)")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
+    queue_path = os.path.join(script_dir, args.queue)
+    os.makedirs(os.path.dirname(queue_path), exist_ok=True)
+    queue_options = {"lease": args.lease, "max_attempts": args.max_attempts, "wal": not args.no_wal, "max_runtime": args.max_runtime}
+
+    # --- Coordinator: shard the sweep into jobs ---
+    if args.command == "enqueue":
+        with open(args.sweep, "r") as sweep_file:
+            spec = json.load(sweep_file)
+        specs = random_specs(spec, args.random, seed=args.seed) if args.random else grid_specs(spec)
+
+        pairs = None
+        if args.pairs_file:
+            import csv
+            with open(args.pairs_file, "r", newline="") as pairs_file:
+                rows = list(csv.DictReader(pairs_file))[:args.top]
+            pairs = [{"file1": r["file1"], "file2": r["file2"], "hedge_ratio": float(r["hedge_ratio"])} for r in rows]
+            specs = [{k: v for k, v in s.items() if k != "hedge_ratio"} for s in specs] # Hedge ratio comes from the pair
+
+        queue = JobQueue(queue_path, **queue_options)
+        added = queue.enqueue(args.name, shard_jobs(specs, pairs, args.chunk_size))
+        logging.info("Enqueued %d jobs of sweep %s (%d configurations x %d pairs)", added, args.name, len(specs), len(pairs or [None]))
+        print(f"✅ Enqueued {added} new jobs ({len(specs)} configurations x {len(pairs or [None])} pairs) in {queue_path}")
+
+    # --- Worker(s) on this node ---
+    elif args.command == "work":
+        start = time.perf_counter()
+        if args.processes > 1:
+            done = run_local_workers(queue_path, params, processes=args.processes, **queue_options)
+        else:
+            worker = worker_id()
+            done = {worker: run_worker(queue_path, params, worker=worker, **queue_options)}
+        elapsed = time.perf_counter() - start
+        logging.info("Workers finished in %.2fs: %s", elapsed, done)
+        print(f"✅ {sum(done.values())} jobs completed by {len(done)} workers in {elapsed:.2f}s")
+
+    elif args.command == "status":
+        counts = JobQueue(queue_path, **queue_options).counts(args.name)
+        print(" ".join(f"{k}: {v}" for k, v in counts.items()))
+
+    elif args.command == "retry":
+        reset = JobQueue(queue_path, **queue_options).retry_failed(args.name)
+        print(f"✅ {reset} failed jobs back to pending")
+
+    # --- Coordinator: gather the results ---
+    else:
+        queue = JobQueue(queue_path, **queue_options)
+        results = queue.results(args.name)
+        output = os.path.join(script_dir, args.output)
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        results.to_csv(output, index=False)
+        counts = queue.counts(args.name)
+        logging.info("Collected %d results of sweep %s: %s", len(results), args.name, counts)
+        print(f"✅ {len(results)} results exported to {output} ({counts['done']} jobs done, {counts['failed']} failed)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+import logging
+import argparse
+import pandas as pd
+from bars import bars_frame, index_annualization_factor, read_ticks, resample_chunks, resample_ticks
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Resample a tick CSV (timestamp, price[, size]) to OHLCV bars in the data/ CSV format")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to config.json")
+    parser.add_argument("--input", type=str, required=True, help="Tick CSV path")
+    parser.add_argument("--bar", type=str, default="1min", help="Bar size (e.g. 30s, 5min, 1h)")
+    parser.add_argument("--session_start", type=str, help="Session open, local time (e.g. 09:30); ticks outside the session are dropped")
+    parser.add_argument("--session_end", type=str, help="Session close, local time (e.g. 16:00)")
+    parser.add_argument("--session_tz", type=str, default="America/New_York", help="Time zone of the session times")
+    parser.add_argument("--ts_col", type=str, default="timestamp", help="Timestamp column (ISO strings or epoch nanoseconds)")
+    parser.add_argument("--price_col", type=str, default="price", help="Trade price column")
+    parser.add_argument("--size_col", type=str, default="size", help="Trade size column (tick counts as volume if absent)")
+    parser.add_argument("--chunk_size", type=int, default=5_000_000, help="Ticks read per chunk")
+    parser.add_argument("--output", type=str, required=True, help="Bar CSV path (e.g. data/SPY_5min.csv)")
+    args = parser.parse_args()
+
+    if (args.session_start is None) != (args.session_end is None):
+        raise ValueError("Invalid session. Use both --session_start and --session_end, or neither.")
+    session = None
+    if args.session_start is not None:
+        session = {"start": args.session_start, "end": args.session_end, "tz": args.session_tz}
+
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    logging.info("Resampling %s to %s bars (session=%s)", args.input, args.bar, session)
+
+    # --- Run ---
+    start = time.perf_counter()
+    ticks = 0
+    def counted(chunks):
+        nonlocal ticks
+        for chunk in chunks:
+            ticks += len(chunk[0])
+            yield chunk
+
+    chunks = read_ticks(args.input, args.chunk_size, args.ts_col, args.price_col, args.size_col)
+    frames = [bars_frame(bars) for bars in resample_chunks(counted(chunks), args.bar, session)]
+    table = pd.concat(frames) if frames else bars_frame(resample_ticks([], [], bar=args.bar))
+    elapsed = time.perf_counter() - start
+
+    if session is not None:
+        table.index = table.index.tz_convert(session["tz"])
+
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    table.to_csv(output)
+
+    rate = ticks / elapsed * 60 if elapsed > 0 else float("inf")
+    logging.info("Resampling complete: %d ticks -> %d bars in %.2fs. Saved to %s", ticks, len(table), elapsed, output)
+    print(f"✅ Resampled {ticks:,} ticks into {len(table):,} {args.bar} bars in {elapsed:.2f}s ({rate:,.0f} ticks/min)")
+    if len(table):
+        print(f"Annualization factor: {index_annualization_factor(table.index.asi8, args.bar, session):.0f} bars/year")
+    print(f"✅ Bars exported to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,37 @@
+import csv
 import json
+import math
 import os
+import sys
 import logging
 import argparse
 from robust_spread_arb import PairBacktester
-from plots import plot_pnl_curve, plot_spread_zscore, plot_drawdowns
+
+# Heavy or optional dependencies (matplotlib, profilers, numba kernels) are imported where they are used,
+# so runs with "plots": false start without loading them.
+
+def serve(params, stream_in=sys.stdin, stream_out=sys.stdout):
+    # Persistent worker: one JSON object per input line (overrides of config.json, plus an optional "id"),
+    # one JSON line per run with its metrics. Imports, compiled kernels and caches stay warm between runs.
+    for line in stream_in:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.pop("id", None)
+            bt = PairBacktester(**{**params, **request, "plots": False})
+            metrics = bt.run_backtest(verbose=False)
+            reply = {"id": request_id, "metrics": {k: None if math.isnan(v) else v for k, v in metrics.items()}}
+            logging.info("Served run %s: %s", request_id, request)
+        except Exception as e:
+            reply = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+            logging.exception("Run %s failed", request_id)
+
+        stream_out.write(json.dumps(reply) + "\n")
+        stream_out.flush()
 
 def run_backtest():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,14 +45,31 @@ def run_backtest():
     parser.add_argument("--z_exit", type=float, help="Z-score exit threshold")
     parser.add_argument("--capital", type=float, help="Capital in USD")
     parser.add_argument("--hedge_ratio", type=float, help="Hedge ratio")
+    parser.add_argument("--hedge_method", type=str, choices=["static", "rolling_ols", "kalman"], help="Hedge ratio estimator")
+    parser.add_argument("--pairs_file", type=str, help="Ranked pair table from run_screening.py (sets file1, file2 and hedge_ratio)")
+    parser.add_argument("--pair_rank", type=int, default=0, help="Row of --pairs_file to backtest (0 = best ranked)")
+    parser.add_argument("--start", type=str, help="First date of the backtest (e.g. 2022-01-01)")
+    parser.add_argument("--end", type=str, help="Last date of the backtest (e.g. 2024-12-31)")
+    parser.add_argument("--export_format", type=str, choices=["csv", "parquet", "feather"], help="Per-bar output format")
+    parser.add_argument("--run_id", type=str, help="Append the output as partition run_id=<id> of a dataset")
+    parser.add_argument("--chunk_size", type=int, help="Out-of-core mode: stream the CSVs in blocks of this many rows (static hedge, no plots)")
+    parser.add_argument("--profile", action="store_true", help="Record per-stage timings/memory as JSON lines in logs/stages.jsonl")
+    parser.add_argument("--profiler", type=str, choices=["cprofile", "pyinstrument"], help="Also dump a full profile of the run to logs/")
+    parser.add_argument("--serve", action="store_true", help="Worker mode: read configs as JSON lines on stdin, write metrics as JSON lines on stdout")
     args = parser.parse_args()
 
     # --- Load base config ---
     with open(config_dir, "r") as params_file:
         params = json.load(params_file)
 
+    # --- Pair selected by the screening ---
+    if args.pairs_file:
+        with open(args.pairs_file, "r", newline="") as pairs_file:
+            pair = list(csv.DictReader(pairs_file))[args.pair_rank]
+        params.update(file1=pair["file1"], file2=pair["file2"], hedge_ratio=float(pair["hedge_ratio"]))
+
     # --- Override config.json with CLI arguments if provided ---
-    for keys in ["window", "z_entry", "z_exit", "capital", "hedge_ratio"]:
+    for keys in ["window", "z_entry", "z_exit", "capital", "hedge_ratio", "hedge_method", "start", "end", "export_format", "run_id"]:
         val = getattr(args, keys)
         if val is not None:
             params[keys] = val
@@ -39,23 +84,76 @@ def run_backtest():
     )
     logging.info("Starting backtest with parameters: %s", params)
 
+    # --- Instrumentation / profiling ---
+    if args.profile:
+        params["instrument"] = True
+        stages_handler = logging.FileHandler(os.path.join(os.path.dirname(log_file), "stages.jsonl"))
+        stages_handler.setFormatter(logging.Formatter("%(message)s")) # Pure JSON lines
+        logging.getLogger("backtest.stages").addHandler(stages_handler)
+
+    # --- Worker mode ---
+    if args.serve:
+        serve(params)
+        return
+
+    profiler = None
+    if args.profiler == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif args.profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+
     # --- Run Backtest ---
     bt = PairBacktester(**params)
-    metrics = bt.run_backtest(verbose=True)
-
-    # --- Export CSV ---
     export_file = os.path.join(script_dir, params["export_filename"])
     os.makedirs(os.path.dirname(export_file), exist_ok=True)
-    bt.export_timeseries(filename=export_file)
+
+    if args.chunk_size:
+        from chunked import run_chunked
+
+        # Block-by-block run: per-bar output is written while streaming, metrics come from accumulators
+        with bt.stage("chunked"):
+            metrics = run_chunked(bt, export_file, chunk_size=args.chunk_size)
+        print(f"✅ Chunked backtest complete, time series exported to {export_file}")
+    else:
+        metrics = bt.run_backtest(verbose=True)
+
+        # --- Export CSV ---
+        with bt.stage("export"):
+            bt.export_timeseries(filename=export_file)
 
     # --- Plots ---
-    if params.get("plots", True):
-        plots_dir = os.path.join(script_dir, "outputs")
-        out1 = plot_pnl_curve(bt.pnl, out_dir=plots_dir, filename="pnl_curve.png")
-        out2 = plot_spread_zscore(bt.spread, bt.z_score, out_dir=plots_dir, filename="spread_zscore.png")
-        out3 = plot_drawdowns(bt.pnl, out_dir=plots_dir, filename="drawdowns.png")
+    if params.get("plots", True) and not args.chunk_size:
+        from plots import plot_all
+
+        with bt.stage("plots"):
+            plots_dir = os.path.join(script_dir, "outputs")
+            out1, out2, out3 = plot_all(bt.pnl, bt.spread, bt.z_score, out_dir=plots_dir)
         logging.info("Saved plots: %s, %s, %s", out1, out2, out3)
 
+    if args.profiler == "cprofile":
+        profiler.disable()
+        profile_file = os.path.join(os.path.dirname(log_file), "profile.prof")
+        profiler.dump_stats(profile_file)
+        logging.info("cProfile stats saved to %s", profile_file)
+    elif args.profiler == "pyinstrument":
+        profiler.stop()
+        profile_file = os.path.join(os.path.dirname(log_file), "profile.html")
+        with open(profile_file, "w") as f:
+            f.write(profiler.output_html())
+        logging.info("pyinstrument profile saved to %s", profile_file)
+
+    if bt.alignment is not None:
+        logging.info("Alignment report: %s", bt.alignment)
+    if bt.cache is not None:
+        logging.info("Result cache: %d stage(s) reused, %d computed", bt.cache.hits, bt.cache.misses)
+
+    if args.profile:
+        logging.info("Stage totals: %s", bt.instrumentation.total())
+
     logging.info("Backtest complete. Metrics: %s", metrics)
     print("\n--- Metrics ---")
     for k, v in metrics.items():
@@ -0,0 +1,70 @@
+import json
+import os
+import time
+import logging
+import argparse
+from screening import screen_directory, EG_CRITICAL_VALUES
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Correlation + Engle-Granger screening of every pair in a directory of price CSVs")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to config.json")
+    parser.add_argument("--data_subdir", type=str, help="Directory of price CSVs (default: config data_subdir or data)")
+    parser.add_argument("--min_corr", type=float, default=0.8, help="Minimum log-return correlation of a candidate pair")
+    parser.add_argument("--lags", type=int, default=1, help="Lagged differences in the ADF regression")
+    parser.add_argument("--fill_policy", type=str, choices=["drop", "ffill", "flag"], help="Alignment of the symbols (default: config fill_policy)")
+    parser.add_argument("--start", type=str, help="First date of the sample (e.g. 2022-01-01)")
+    parser.add_argument("--end", type=str, help="Last date of the sample (e.g. 2024-12-31)")
+    parser.add_argument("--top", type=int, default=0, help="Keep only the N best ranked pairs (0 = all candidates)")
+    parser.add_argument("--processes", type=int, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default="outputs/pair_candidates.csv", help="Ranked pair table path")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+
+    data_subdir = args.data_subdir or params.get("data_subdir", "data")
+    fill_policy = args.fill_policy or params.get("fill_policy", "drop")
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    logging.info("Starting pair screening of %s (min_corr=%s, lags=%d)", data_subdir, args.min_corr, args.lags)
+
+    # --- Run ---
+    start = time.perf_counter()
+    table, report = screen_directory(
+        os.path.join(script_dir, data_subdir), min_corr=args.min_corr, lags=args.lags, fill_policy=fill_policy,
+        max_staleness=params.get("max_staleness"), start=args.start, end=args.end, processes=args.processes,
+    )
+    elapsed = time.perf_counter() - start
+
+    symbols = len(report["symbols"])
+    candidates = len(table)
+    cointegrated = int(table["coint_5%"].sum())
+    if args.top:
+        table = table.head(args.top)
+
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    table.to_csv(output, index=False)
+
+    logging.info("Screening complete: %d symbols, %d candidate pairs, %d cointegrated at 5%% in %.2fs. Saved to %s",
+                 symbols, candidates, cointegrated, elapsed, output)
+    print(f"✅ Screening complete: {symbols} symbols, {symbols * (symbols - 1) // 2} pairs in {elapsed:.2f}s")
+    print(f"Candidates (corr >= {args.min_corr}): {candidates}")
+    print(f"Cointegrated at 5% (ADF t < {EG_CRITICAL_VALUES['5%']}): {cointegrated}")
+    print(f"✅ Ranked pairs exported to {output}")
+    print("\n--- Top pairs ---")
+    print(table.head(10).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+if __name__ == "__main__":
+    main()
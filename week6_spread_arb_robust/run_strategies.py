@@ -0,0 +1,60 @@
+import json
+import os
+import time
+import logging
+import argparse
+from strategies import IndicatorCache, from_spec, run_strategies
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+    strategies_dir = os.path.join(script_dir, "strategies.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Run SMA, RSI and spread arbitrage strategies side by side on one price store")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to config.json (data, alignment and logging settings)")
+    parser.add_argument("--strategies", type=str, default=strategies_dir, help="Path to the strategy spec (files and one entry per strategy)")
+    parser.add_argument("--start", type=str, help="First date of the backtest (e.g. 2022-01-01)")
+    parser.add_argument("--end", type=str, help="Last date of the backtest (e.g. 2024-12-31)")
+    parser.add_argument("--output", type=str, default="outputs/strategies_pnl.csv", help="Per-bar PnL table path (one column per strategy)")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+    with open(args.strategies, "r") as spec_file:
+        spec = json.load(spec_file)
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    logging.info("Starting %d strategies on %s", len(spec["strategies"]), spec["files"])
+
+    # --- Run ---
+    start = time.perf_counter()
+    cache = IndicatorCache.from_files(
+        spec["files"], data_subdir=params.get("data_subdir", "data"), fill_policy=params.get("fill_policy", "drop"),
+        max_staleness=params.get("max_staleness"), start=args.start or params.get("start"), end=args.end or params.get("end"),
+    )
+    strategies = [from_spec(s) for s in spec["strategies"]]
+    pnl, metrics = run_strategies(strategies, cache)
+    elapsed = time.perf_counter() - start
+
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    pnl.to_csv(output)
+
+    logging.info("Strategies complete in %.2fs (indicator cache: %d hits, %d misses). PnL saved to %s",
+                 elapsed, cache.hits, cache.misses, output)
+    print(f"✅ {len(strategies)} strategies complete in {elapsed:.2f}s")
+    print(f"Indicator cache: {cache.hits} hits, {cache.misses} misses")
+    print(f"✅ Per-bar PnL exported to {output}")
+    print("\n--- Strategy metrics ---")
+    print(metrics.T.to_string(float_format=lambda v: f"{v:.2f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import logging
+import argparse
+from sweep import grid_specs, random_specs, render_sweep_reports, run_sweep
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+    sweep_dir = os.path.join(script_dir, "sweep.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of the spread arbitrage backtest")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to the base config.json")
+    parser.add_argument("--sweep", type=str, default=sweep_dir, help="Path to the sweep spec (grid of values per parameter)")
+    parser.add_argument("--random", type=int, help="Sample N random configurations from the spec instead of the full grid")
+    parser.add_argument("--seed", type=int, help="Seed for random search")
+    parser.add_argument("--processes", type=int, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default="outputs/sweep_results.csv", help="Results table path")
+    parser.add_argument("--reports", type=int, help="Render plots for the top N runs by Sharpe ratio (0 = every run)")
+    parser.add_argument("--reports_dir", type=str, default="outputs/sweep_reports", help="Directory of the per-run plot reports")
+    args = parser.parse_args()
+
+    # --- Load base config and sweep spec ---
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+    with open(args.sweep, "r") as sweep_file:
+        spec = json.load(sweep_file)
+
+    specs = random_specs(spec, args.random, seed=args.seed) if args.random else grid_specs(spec)
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    logging.info("Starting sweep of %d configurations over base parameters: %s", len(specs), params)
+
+    # --- Run Sweep ---
+    start = time.perf_counter()
+    results = run_sweep(params, specs, processes=args.processes)
+    elapsed = time.perf_counter() - start
+
+    # --- Export results table ---
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    results.to_csv(output, index=False)
+
+    logging.info("Sweep complete: %d runs in %.2fs. Results saved to %s", len(results), elapsed, output)
+    print(f"✅ Sweep complete: {len(results)} runs in {elapsed:.2f}s")
+    print(f"✅ Results exported to {output}")
+
+    # --- Batch plot reports (run_<i> matches the row index of the results table) ---
+    if args.reports is not None:
+        reports_dir = os.path.join(script_dir, args.reports_dir)
+        paths = render_sweep_reports(params, results, reports_dir, top=args.reports or None, processes=args.processes)
+        logging.info("Saved %d report plots to %s", len(paths), reports_dir)
+        print(f"✅ {len(paths)} report plots saved to {reports_dir}")
+
+    print("\n--- Top 5 by Sharpe Ratio ---")
+    print(results.sort_values("Sharpe Ratio", ascending=False).head(5).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
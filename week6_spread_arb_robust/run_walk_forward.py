@@ -0,0 +1,65 @@
+import json
+import os
+import logging
+import argparse
+from walk_forward import run_walk_forward
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config_dir = os.path.join(script_dir, "config.json")
+    sweep_dir = os.path.join(script_dir, "sweep.json")
+
+    # --- CLI Parser ---
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of the spread arbitrage backtest")
+    parser.add_argument("--config", type=str, default=config_dir, help="Path to the base config.json")
+    parser.add_argument("--sweep", type=str, default=sweep_dir, help="Candidate window / z_entry / z_exit values (hedge ratio is re-estimated)")
+    parser.add_argument("--train", type=int, default=504, help="Train slice length in bars")
+    parser.add_argument("--test", type=int, default=126, help="Test slice length in bars")
+    parser.add_argument("--step", type=int, help="Bars between folds (default: test length)")
+    parser.add_argument("--anchored", action="store_true", help="Expanding train window instead of rolling")
+    parser.add_argument("--objective", type=str, default="Sharpe Ratio", help="Train metric to maximize")
+    parser.add_argument("--processes", type=int, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--output", type=str, default="outputs/walk_forward_folds.csv", help="Fold table path")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as params_file:
+        params = json.load(params_file)
+    with open(args.sweep, "r") as sweep_file:
+        grid = json.load(sweep_file)
+
+    # --- Logging setup ---
+    log_file = os.path.join(script_dir, params["log_file"])
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+    logging.info("Starting walk-forward (train=%d, test=%d) with parameters: %s", args.train, args.test, params)
+
+    # --- Run Walk-Forward ---
+    folds, oos_pnl, oos_metrics = run_walk_forward(
+        params,
+        grid,
+        train_size=args.train,
+        test_size=args.test,
+        step=args.step,
+        anchored=args.anchored,
+        objective=args.objective,
+        processes=args.processes,
+    )
+
+    # --- Export fold table ---
+    output = os.path.join(script_dir, args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    folds.to_csv(output, index=False)
+
+    logging.info("Walk-forward complete: %d folds. Out-of-sample metrics: %s", len(folds), oos_metrics)
+    print(f"✅ Walk-forward complete: {len(folds)} folds")
+    print(f"✅ Fold table exported to {output}")
+    print("\n--- Out-of-sample Metrics ---")
+    for k, v in oos_metrics.items():
+        print(f"{k}: {v:.2f}")
+
+if __name__ == "__main__":
+    main()
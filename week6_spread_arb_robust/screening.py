@@ -0,0 +1,140 @@
+import glob
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from align import load_aligned
+from price_store import PriceStore
+
+# Pair selection over a directory of price CSVs (same layout as data/):
+#   1. correlation pre-filter: one matrix product on the standardized log-return matrix gives the
+#      correlation of every pair; pairs below min_corr are discarded
+#   2. Engle-Granger on the survivors, in batches of pairs (columns of 2-D arrays) over a process pool:
+#      OLS hedge ratio of price1 on price2 (with intercept, from the price covariance matrix), then an
+#      ADF regression without constant on the residual spread, with `lags` lagged differences
+#   3. half-life of mean reversion from the AR(1) coefficient of the residual spread
+# The ranked table has file1 / file2 / hedge_ratio columns, i.e. PairBacktester keyword arguments.
+
+# Engle-Granger critical values of the ADF t-statistic, 2 variables with constant (MacKinnon 2010, asymptotic)
+EG_CRITICAL_VALUES = {"1%": -3.8977, "5%": -3.3369, "10%": -3.0445}
+
+# Demeaned prices and their covariance matrix, shared with the worker processes
+# (inherited on fork, sent once per worker otherwise)
+_CENTERED = None
+_COV = None
+
+
+def correlation_candidates(prices, min_corr=0.8):
+    # (i, j, correlation) of every pair i < j whose log-return correlation is at least min_corr
+    returns = np.diff(np.log(prices), axis=0)
+    z = (returns - returns.mean(axis=0)) / returns.std(axis=0, ddof=1)
+    corr = z.T @ z / (len(z) - 1)
+
+    i, j = np.triu_indices(prices.shape[1], k=1)
+    values = corr[i, j]
+    keep = values >= min_corr
+    return i[keep], j[keep], values[keep]
+
+
+def adf_tstat(spread, lags=1):
+    # ADF t-statistic (no constant) of every column of `spread`: diff_t = gamma * e_t-1 + sum(beta_k * diff_t-k)
+    # The normal equations are built from column sums of products, so no (pairs x bars x regressors) array
+    diff = np.diff(spread, axis=0)
+    y = diff[lags:]
+    regressors = [spread[lags:-1]] + [diff[lags - k:-k] for k in range(1, lags + 1)]
+    k = len(regressors)
+
+    xtx = np.empty((spread.shape[1], k, k))
+    xty = np.empty((spread.shape[1], k))
+    for a in range(k):
+        xty[:, a] = np.einsum("bp,bp->p", regressors[a], y)
+        for c in range(a, k):
+            xtx[:, a, c] = xtx[:, c, a] = np.einsum("bp,bp->p", regressors[a], regressors[c])
+
+    inverse = np.linalg.inv(xtx)
+    beta = np.einsum("pij,pj->pi", inverse, xty)
+    rss = np.einsum("bp,bp->p", y, y) - np.einsum("pi,pi->p", beta, xty) # y'y - beta'X'y
+    s2 = rss / (len(y) - k)
+    return beta[:, 0] / np.sqrt(s2 * inverse[:, 0, 0])
+
+
+def half_life(spread):
+    # -ln(2) / ln(1 + gamma), gamma from diff_t = gamma * e_t-1 (NaN when not mean reverting)
+    lagged = spread[:-1]
+    gamma = np.einsum("bp,bp->p", np.diff(spread, axis=0), lagged) / np.einsum("bp,bp->p", lagged, lagged)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hl = -np.log(2) / np.log1p(gamma)
+    hl[(gamma >= 0) | (gamma <= -1)] = np.nan
+    return hl
+
+
+def _init_worker(centered, cov):
+    global _CENTERED, _COV
+    _CENTERED = centered
+    _COV = cov
+
+
+def _test_batch(task):
+    i, j, lags = task
+    hedge_ratio = _COV[i, j] / _COV[j, j]
+    spread = _CENTERED[:, i] - hedge_ratio * _CENTERED[:, j] # OLS residuals (intercept absorbed by the centering)
+    return adf_tstat(spread, lags), half_life(spread)
+
+
+def screen_pairs(prices, min_corr=0.8, lags=1, batch_size=1_000, processes=None):
+    # prices: aligned DataFrame (bars x symbols) -> ranked DataFrame of the candidate pairs
+    values = prices.to_numpy(dtype=float)
+    symbols = np.asarray(prices.columns)
+
+    i, j, corr = correlation_candidates(values, min_corr)
+    columns = ["symbol1", "symbol2", "corr", "hedge_ratio", "adf_t", "half_life", "spread_std"]
+    if len(i) == 0:
+        return pd.DataFrame(columns=columns)
+
+    centered = values - values.mean(axis=0)
+    cov = centered.T @ centered / (len(values) - 1)
+    hedge_ratio = cov[i, j] / cov[j, j]
+    spread_std = np.sqrt(np.maximum(cov[i, i] - hedge_ratio * cov[i, j], 0)) # std of price1 - h * price2
+
+    tasks = [(i[s:s + batch_size], j[s:s + batch_size], lags) for s in range(0, len(i), batch_size)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(centered, cov)
+        results = [_test_batch(task) for task in tasks]
+    else:
+        method = "fork" if "fork" in mp.get_all_start_methods() else None
+        with mp.get_context(method).Pool(processes, initializer=_init_worker, initargs=(centered, cov)) as pool:
+            results = pool.map(_test_batch, tasks)
+
+    adf_t, hl = (np.concatenate(parts) for parts in zip(*results))
+    table = pd.DataFrame({
+        "symbol1": symbols[i],
+        "symbol2": symbols[j],
+        "corr": corr,
+        "hedge_ratio": hedge_ratio,
+        "adf_t": adf_t,
+        "half_life": hl,
+        "spread_std": spread_std,
+    })
+    for level, critical in EG_CRITICAL_VALUES.items():
+        table[f"coint_{level}"] = table["adf_t"] < critical
+    return table.sort_values("adf_t").reset_index(drop=True)
+
+
+def screen_directory(data_dir, min_corr=0.8, lags=1, fill_policy="drop", max_staleness=None, start=None, end=None,
+                     batch_size=1_000, processes=None):
+    # Every CSV of data_dir aligned on one calendar, then screened; adds the file1 / file2 columns
+    paths = sorted(glob.glob(os.path.join(data_dir, "*.csv")))
+    if len(paths) < 2:
+        raise ValueError(f"Need at least two CSV files in {data_dir}")
+
+    store = PriceStore(os.path.join(data_dir, ".price_store"))
+    files = {os.path.splitext(os.path.basename(p))[0].upper(): os.path.basename(p) for p in paths}
+    prices, report = load_aligned(
+        store, paths, list(files), fill_policy=fill_policy, max_staleness=max_staleness, start=start, end=end,
+    )
+
+    table = screen_pairs(prices, min_corr=min_corr, lags=lags, batch_size=batch_size, processes=processes)
+    table.insert(2, "file1", table["symbol1"].map(files))
+    table.insert(3, "file2", table["symbol2"].map(files))
+    return table, report
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Encoded states: exit -> 0, long entry -> 1, short entry -> -1, hold -> NaN (carry last state)
+# Each week folder is a standalone project run from its own directory, so week5_spread_arb and
+# week6_spread_arb_robust keep identical copies of this module (tests/test_signals.py checks both).
+
+
+def encode_signals(z_score_lagged, z_entry, z_exit):
+    z = np.asarray(z_score_lagged, dtype=float)
+
+    # Thresholds broadcast against z, so a 2-D z can carry one (z_entry, z_exit) pair per column
+    entry_long = z < -np.asarray(z_entry)
+    entry_short = z > np.asarray(z_entry)
+    exit = (z > -np.asarray(z_exit)) & (z < np.asarray(z_exit))
+
+    # Same priority as the original loop: exit first, then long, then short
+    state = np.full(np.broadcast(z, entry_long, exit).shape, np.nan)
+    state[entry_short] = -1
+    state[entry_long] = 1
+    state[exit] = 0
+    return state
+
+
+def forward_fill_state(state, initial=0):
+    state = np.asarray(state, dtype=float)
+    n = state.shape[0]
+
+    # Row index of the last non-hold state seen so far (along the time axis)
+    valid = ~np.isnan(state)
+    idx = np.where(valid, np.arange(n).reshape((n,) + (1,) * (state.ndim - 1)), -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+
+    filled = np.take_along_axis(state, np.maximum(idx, 0), axis=0)
+    filled[idx < 0] = initial # Nothing seen yet: flat
+    return filled.astype(np.int64)
+
+
+def generate_positions(z_score_lagged, z_entry, z_exit):
+    # z_score_lagged: 1-D (time) or 2-D (time x pairs / parameter sets)
+    return forward_fill_state(encode_signals(z_score_lagged, z_entry, z_exit))
@@ -0,0 +1,20 @@
+from .base import Strategy, run_strategies
+from .indicators import IndicatorCache
+from .pair import PairStrategy
+from .rsi import RSIStrategy
+from .sma import SMACrossover
+
+# Strategy types by name, for JSON strategy specs ({"type": "sma", "symbol": "SPY", ...})
+STRATEGIES = {
+    "sma": SMACrossover,
+    "rsi": RSIStrategy,
+    "pair": PairStrategy,
+}
+
+
+def from_spec(spec):
+    spec = dict(spec)
+    kind = spec.pop("type")
+    if kind not in STRATEGIES:
+        raise ValueError(f"Invalid strategy type {kind!r}. Use one of {sorted(STRATEGIES)}.")
+    return STRATEGIES[kind](**spec)
@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+from bars import index_annualization_factor
+from metrics import compute_metrics, trade_stats
+
+# Common interface of the strategies:
+#   - symbols(): the price columns the strategy trades
+#   - positions(cache): position decided at the close of each bar (held over the next bar), 1-D array
+#   - pnl(cache, position): per-bar PnL in $ of `capital`, 1-D array (NaN before the first tradable bar)
+# run_strategies evaluates any mix of strategies on one IndicatorCache and computes every metric on the
+# stacked (bars x strategies) matrices in single 2-D calls. symbols and positions are abstract: a subclass
+# missing either cannot be instantiated.
+
+
+class Strategy(ABC):
+    def __init__(self, name=None, capital=1_000_000, transaction_costs_bps=0, slippage_bps=0):
+        self.name = name or type(self).__name__
+        self.capital = capital
+        self.transaction_costs_bps = transaction_costs_bps
+        self.slippage_bps = slippage_bps
+        self.cost_rate = transaction_costs_bps / 10_000 + slippage_bps / 10_000
+
+
+    @abstractmethod
+    def symbols(self):
+        pass
+
+
+    @abstractmethod
+    def positions(self, cache):
+        pass
+
+
+    def pnl(self, cache, position):
+        # Single-asset default: position (-1/0/1 or a fraction) of `capital` in the first symbol.
+        # Costs are charged the bar after a position change, on the traded fraction of capital.
+        returns = cache.returns(self.symbols()[0])
+        position_lagged = np.zeros_like(position, dtype=float)
+        position_lagged[1:] = position[:-1]
+
+        change = np.abs(np.diff(position, prepend=0))
+        change_lagged = np.zeros_like(change, dtype=float)
+        change_lagged[1:] = change[:-1]
+
+        return self.capital * (position_lagged * returns - change_lagged * self.cost_rate)
+
+
+    def run(self, cache):
+        position = self.positions(cache)
+        return position, self.pnl(cache, position)
+
+
+def run_strategies(strategies, cache, annualization_factor=None):
+    # -> (per-bar PnL DataFrame (bars x strategies), metrics DataFrame (one row per strategy)).
+    # annualization_factor None: from the bar frequency of the cache index (252 for daily bars)
+    names = [s.name for s in strategies]
+    if len(set(names)) != len(names):
+        raise ValueError("Strategy names must be unique.")
+
+    results = [s.run(cache) for s in strategies]
+    position = np.column_stack([p for p, _ in results]).astype(float)
+    pnl = np.column_stack([p for _, p in results])
+    capital = np.array([s.capital for s in strategies], dtype=float)
+
+    factor = index_annualization_factor(cache.index) if annualization_factor is None else annualization_factor
+    metrics = compute_metrics(pnl / capital, factor)
+    metrics.update(trade_stats(position, pnl, factor))
+    return pd.DataFrame(pnl, index=cache.index, columns=names), pd.DataFrame(metrics, index=names)
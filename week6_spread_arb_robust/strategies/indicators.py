@@ -0,0 +1,95 @@
+import os
+import numpy as np
+import pandas as pd
+from align import load_aligned
+from price_store import PriceStore
+
+# Shared indicator layer of the strategies: one aligned price matrix, and every indicator memoized per
+# (indicator, series, window). Strategies ask the cache instead of computing, so a 20-bar mean of SPY
+# used by an SMA crossover and by a band strategy is computed once.
+# Derived series (e.g. a pair spread) are registered under a name and get the same memoized indicators.
+
+
+class IndicatorCache:
+    def __init__(self, prices):
+        # prices: DataFrame with one aligned price column per symbol
+        self.prices = prices
+        self.index = prices.index
+        self.series = {symbol: prices[symbol].to_numpy(dtype=float) for symbol in prices.columns}
+        self.indicators = {}
+        self.alignment = None # Alignment report when loaded with from_files
+        self.hits = 0
+        self.misses = 0
+
+
+    @classmethod
+    def from_files(cls, files, data_subdir="data", fill_policy="drop", max_staleness=None, start=None, end=None):
+        script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        data_dir = os.path.join(script_dir, data_subdir)
+
+        store = PriceStore(os.path.join(data_dir, ".price_store"))
+        prices, report = load_aligned(
+            store, [os.path.join(data_dir, file) for file in files], [os.path.splitext(file)[0].upper() for file in files],
+            fill_policy=fill_policy, max_staleness=max_staleness, start=start, end=end,
+        )
+        cache = cls(prices)
+        cache.alignment = report
+        return cache
+
+
+    def _memo(self, key, compute):
+        if key in self.indicators:
+            self.hits += 1
+            return self.indicators[key]
+        self.misses += 1
+        values = compute()
+        values.flags.writeable = False # Shared between strategies: nobody may modify it in place
+        self.indicators[key] = values
+        return values
+
+
+    def add_series(self, name, compute):
+        # Register a derived series once (later calls with the same name reuse it)
+        if name not in self.series:
+            self.series[name] = np.asarray(compute(), dtype=float)
+        return self.series[name]
+
+
+    def returns(self, name):
+        # Simple bar returns (NaN on the first bar)
+        def compute():
+            values = self.series[name]
+            r = np.full(len(values), np.nan)
+            r[1:] = values[1:] / values[:-1] - 1
+            return r
+        return self._memo(("returns", name), compute)
+
+
+    def rolling_mean(self, name, window):
+        return self._memo(
+            ("mean", name, window), lambda: pd.Series(self.series[name]).rolling(window=window).mean().to_numpy(),
+        )
+
+
+    def rolling_std(self, name, window):
+        return self._memo(
+            ("std", name, window), lambda: pd.Series(self.series[name]).rolling(window=window).std().to_numpy(),
+        )
+
+
+    def rsi(self, name, window):
+        # Simple-average RSI (rolling means of gains and losses), as in the week4 notebook
+        def compute():
+            delta = pd.Series(np.diff(self.series[name], prepend=np.nan))
+            avg_gain = delta.clip(lower=0).rolling(window=window).mean().to_numpy()
+            avg_loss = (-delta.clip(upper=0)).rolling(window=window).mean().to_numpy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return 100 - 100 / (1 + avg_gain / avg_loss)
+        return self._memo(("rsi", name, window), compute)
+
+
+    def z_score(self, name, window):
+        def compute():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return (self.series[name] - self.rolling_mean(name, window)) / self.rolling_std(name, window)
+        return self._memo(("z", name, window), compute)
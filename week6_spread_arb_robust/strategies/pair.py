@@ -0,0 +1,108 @@
+import numpy as np
+from signals import encode_signals, forward_fill_state
+from .base import Strategy
+
+# Spread arbitrage: the one implementation of the pair signal and PnL arithmetic.
+#   - pair_positions: state machine on the previous bar's z-score
+#   - spread_pnl: units, entry costs and PnL of the spread positions, on (bars x columns) arrays
+# PairBacktester (vectorized execution), UniverseBacktester, the sweep engine and chunked mode call
+# these functions; chunked mode passes the state carried from the previous block (prev_* arguments).
+# PairStrategy runs them on an IndicatorCache with a static hedge ratio. The spread is registered in
+# the cache, so pairs sharing legs and a hedge ratio share its rolling statistics.
+
+
+def pair_positions(z_score, z_entry, z_exit, prev_z=np.nan, prev_position=0):
+    # Position decided on the previous bar's z-score (no lookahead), starting from prev_position
+    z = np.asarray(z_score, dtype=float)
+    z_lagged = np.empty_like(z)
+    if len(z):
+        z_lagged[0] = prev_z
+        z_lagged[1:] = z[:-1]
+    return forward_fill_state(encode_signals(z_lagged, z_entry, z_exit), initial=prev_position)
+
+
+def spread_pnl(position, spread, price1, hedged_price2, capital, total_cost_rate, positioning_method="net",
+               margin_rate=0.1, spread_return=None, prev_position=0, prev_spread=np.nan, prev_trade_entry=False):
+    # Units, costs and PnL of spread positions on (bars x columns) arrays (or 1-D). spread / price1 /
+    # hedged_price2 may be (bars x 1) and broadcast against several position columns (e.g. one per
+    # parameter set). spread_return defaults to the bar-to-bar change of the spread (static hedge ratio).
+    # prev_*: position, spread and trade-entry flag of the bar before the first row (defaults: no history).
+
+    # Per-unit cost of each spread (depending on the positioning method)
+    if positioning_method == "gross":
+        unit_cost = price1 + np.abs(hedged_price2)
+    elif positioning_method == "net":
+        unit_cost = np.maximum(price1, np.abs(hedged_price2))
+    elif positioning_method == "margin":
+        unit_cost = (price1 + np.abs(hedged_price2)) * margin_rate
+    else:
+        raise ValueError("Invalid positioning_method. Use 'gross', 'net' or 'margin'.")
+
+    unit_cost = np.where(unit_cost == 0, np.nan, unit_cost)
+    units = capital / unit_cost
+
+    if spread_return is None:
+        spread_return = np.full_like(spread, np.nan)
+        spread_return[1:] = np.diff(spread, axis=0)
+        if len(spread):
+            spread_return[0] = spread[0] - prev_spread
+
+    position_lagged = np.zeros_like(position)
+    if len(position):
+        position_lagged[0] = prev_position
+        position_lagged[1:] = position[:-1]
+
+    raw_pnl = position_lagged * units * spread_return
+
+    # Transaction cost charged the bar after a trade entry
+    trade_entry = (position != 0) & (position_lagged != position)
+    trade_entry_lagged = np.zeros_like(trade_entry)
+    if len(trade_entry):
+        trade_entry_lagged[0] = prev_trade_entry
+        trade_entry_lagged[1:] = trade_entry[:-1]
+
+    cost = trade_entry_lagged.astype(float) * total_cost_rate * np.abs(spread) * units
+    pnl = raw_pnl - cost
+    return unit_cost, units, trade_entry, cost, pnl
+
+
+class PairStrategy(Strategy):
+    def __init__(self, symbol1, symbol2, hedge_ratio=1, window=100, z_entry=2.0, z_exit=0.5,
+                 transaction_costs_bps=1, slippage_bps=1, positioning_method="net", margin_rate=0.1, **kwargs):
+        super().__init__(
+            name=kwargs.pop("name", f"Pair {symbol1}/{symbol2} {window} {z_entry}/{z_exit}"),
+            transaction_costs_bps=transaction_costs_bps, slippage_bps=slippage_bps, **kwargs,
+        )
+        self.symbol1 = symbol1
+        self.symbol2 = symbol2
+        self.hedge_ratio = hedge_ratio
+        self.window = window
+        self.z_entry = z_entry
+        self.z_exit = z_exit
+        self.positioning_method = positioning_method
+        self.margin_rate = margin_rate
+        self.spread_name = f"{symbol1}-{hedge_ratio!r}*{symbol2}"
+
+
+    def symbols(self):
+        return [self.symbol1, self.symbol2]
+
+
+    def spread(self, cache):
+        return cache.add_series(
+            self.spread_name, lambda: cache.series[self.symbol1] - self.hedge_ratio * cache.series[self.symbol2],
+        )
+
+
+    def positions(self, cache):
+        self.spread(cache)
+        return pair_positions(cache.z_score(self.spread_name, self.window), self.z_entry, self.z_exit)
+
+
+    def pnl(self, cache, position):
+        spread = self.spread(cache)
+        _, _, _, _, pnl = spread_pnl(
+            position, spread, cache.series[self.symbol1], self.hedge_ratio * cache.series[self.symbol2],
+            self.capital, self.cost_rate, self.positioning_method, self.margin_rate,
+        )
+        return pnl
@@ -0,0 +1,39 @@
+import numpy as np
+from signals import forward_fill_state
+from .base import Strategy
+
+# RSI mean reversion (week4 notebook): enter long when RSI < lower, exit when RSI > upper, hold otherwise.
+# With cash_symbol, capital earns that symbol's return while flat (e.g. a money-market series).
+
+
+class RSIStrategy(Strategy):
+    def __init__(self, symbol, window=14, lower=30, upper=80, cash_symbol=None, **kwargs):
+        if lower >= upper:
+            raise ValueError("lower threshold must be below upper threshold.")
+        super().__init__(name=kwargs.pop("name", f"RSI {symbol} {window} {lower}/{upper}"), **kwargs)
+        self.symbol = symbol
+        self.window = window
+        self.lower = lower
+        self.upper = upper
+        self.cash_symbol = cash_symbol
+
+
+    def symbols(self):
+        return [self.symbol] + ([self.cash_symbol] if self.cash_symbol else [])
+
+
+    def positions(self, cache):
+        rsi = cache.rsi(self.symbol, self.window)
+        state = np.full(len(rsi), np.nan)
+        state[rsi < self.lower] = 1
+        state[rsi > self.upper] = 0
+        return forward_fill_state(state)
+
+
+    def pnl(self, cache, position):
+        pnl = super().pnl(cache, position)
+        if self.cash_symbol:
+            flat = np.zeros(len(position), dtype=bool)
+            flat[1:] = position[:-1] == 0
+            pnl = pnl + self.capital * np.where(flat, np.nan_to_num(cache.returns(self.cash_symbol)), 0.0)
+        return pnl
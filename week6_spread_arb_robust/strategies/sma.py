@@ -0,0 +1,29 @@
+import numpy as np
+from .base import Strategy
+
+# Moving-average crossover (week3 notebook): long while the fast SMA is above the slow one, flat otherwise
+# (long_short=True goes short instead of flat).
+
+
+class SMACrossover(Strategy):
+    def __init__(self, symbol, fast=20, slow=50, long_short=False, **kwargs):
+        if fast >= slow:
+            raise ValueError("fast window must be shorter than slow window.")
+        super().__init__(name=kwargs.pop("name", f"SMA {symbol} {fast}x{slow}"), **kwargs)
+        self.symbol = symbol
+        self.fast = fast
+        self.slow = slow
+        self.long_short = long_short
+
+
+    def symbols(self):
+        return [self.symbol]
+
+
+    def positions(self, cache):
+        fast = cache.rolling_mean(self.symbol, self.fast)
+        slow = cache.rolling_mean(self.symbol, self.slow)
+        position = (fast > slow).astype(np.int64)
+        if self.long_short:
+            position[fast < slow] = -1
+        return position
@@ -0,0 +1,373 @@
+import math
+import pandas as pd
+from metrics import ANNUALIZATION_FACTOR
+
+NAN = float("nan")
+
+
+class RollingWindow:
+    # Fixed-size ring buffer with Welford add/remove updates: O(1) mean and sample std per new value
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        if self.count == self.window:
+            # Remove the oldest value before overwriting its slot
+            old = self.buffer[self.head]
+            self.count -= 1
+            if self.count == 0:
+                self.mean = 0.0
+                self.m2 = 0.0
+            else:
+                delta = old - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (old - self.mean)
+
+        self.buffer[self.head] = value
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def ready(self):
+        return self.count == self.window
+
+    def std(self):
+        if self.count < 2:
+            return NAN
+        return math.sqrt(max(self.m2 / (self.count - 1), 0.0))
+
+
+class RollingOLSHedge:
+    # Per-bar rolling_ols_hedge: OLS slope of price1 on price2 (with intercept) over the last `window` bars.
+    # Ring buffer with Welford add/remove updates of the means, the x variance and the xy co-moment: O(1)
+    # per bar. The moments are recomputed from the buffer once per `window` bars (amortized O(1)), so the
+    # rounding error of the remove steps does not build up. NaN until the window is full.
+    def __init__(self, window):
+        self.window = window
+        self.x = [0.0] * window
+        self.y = [0.0] * window
+        self.head = 0
+        self.count = 0
+        self.since_refresh = 0
+        self.mean_x, self.mean_y = 0.0, 0.0
+        self.m2_x, self.c_xy = 0.0, 0.0
+
+    def _refresh(self):
+        # Exact (two-pass) moments of the full window
+        n = self.count
+        self.mean_x = sum(self.x) / n
+        self.mean_y = sum(self.y) / n
+        self.m2_x = sum((x - self.mean_x) ** 2 for x in self.x)
+        self.c_xy = sum((x - self.mean_x) * (y - self.mean_y) for x, y in zip(self.x, self.y))
+        self.since_refresh = 0
+
+    def update(self, price1, price2):
+        if self.count == self.window:
+            # Remove the oldest pair before overwriting its slot
+            old_x, old_y = self.x[self.head], self.y[self.head]
+            self.count -= 1
+            if self.count == 0:
+                self.mean_x, self.mean_y, self.m2_x, self.c_xy = 0.0, 0.0, 0.0, 0.0
+            else:
+                dx = old_x - self.mean_x
+                dy = old_y - self.mean_y
+                self.mean_x -= dx / self.count
+                self.mean_y -= dy / self.count
+                self.m2_x -= dx * (old_x - self.mean_x)
+                self.c_xy -= dy * (old_x - self.mean_x)
+
+        self.x[self.head] = price2
+        self.y[self.head] = price1
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        dx = price2 - self.mean_x
+        self.mean_x += dx / self.count
+        self.mean_y += (price1 - self.mean_y) / self.count
+        self.m2_x += dx * (price2 - self.mean_x)
+        self.c_xy += dx * (price1 - self.mean_y)
+
+        if self.count < self.window:
+            return NAN
+        self.since_refresh += 1
+        if self.since_refresh >= self.window:
+            self._refresh()
+        beta = self.c_xy / self.m2_x if self.m2_x != 0 else NAN
+        return beta if math.isfinite(beta) else NAN
+
+
+class KalmanHedge:
+    # Per-bar kalman_hedge: same recursion as hedge._kalman_kernel, one observation at a time
+    def __init__(self, delta=1e-4, obs_var=1e-3):
+        self.trans_var = delta / (1.0 - delta)
+        self.obs_var = obs_var
+        self.beta, self.alpha = 0.0, 0.0
+        self.p00, self.p01, self.p11 = 0.0, 0.0, 0.0
+
+    def update(self, price1, price2):
+        r00 = self.p00 + self.trans_var
+        r01 = self.p01
+        r11 = self.p11 + self.trans_var
+
+        xt = price2
+        q = xt * xt * r00 + 2.0 * xt * r01 + r11 + self.obs_var
+        error = price1 - (self.beta * xt + self.alpha)
+        k0 = (r00 * xt + r01) / q
+        k1 = (r01 * xt + r11) / q
+        self.beta += k0 * error
+        self.alpha += k1 * error
+
+        h0 = xt * r00 + r01
+        h1 = xt * r01 + r11
+        self.p00 = r00 - k0 * h0
+        self.p01 = r01 - k0 * h1
+        self.p11 = r11 - k1 * h1
+        return self.beta
+
+
+class RunningMetrics:
+    # O(1) per-return accumulators for the statistics reported by compute_metrics
+    def __init__(self, annualization_factor=ANNUALIZATION_FACTOR):
+        self.annualization_factor = annualization_factor
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.n_neg = 0
+        self.mean_neg = 0.0
+        self.m2_neg = 0.0
+        self.n_pos = 0
+        self.n_nonzero = 0
+        self.cum = 1.0
+        self.peak = -math.inf
+        self.max_drawdown = NAN
+
+    def update(self, r):
+        self.n += 1
+        delta = r - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (r - self.mean)
+
+        if r < 0:
+            self.n_neg += 1
+            delta = r - self.mean_neg
+            self.mean_neg += delta / self.n_neg
+            self.m2_neg += delta * (r - self.mean_neg)
+        if r > 0:
+            self.n_pos += 1
+        if r != 0:
+            self.n_nonzero += 1
+
+        self.cum += r
+        self.peak = max(self.peak, self.cum)
+        if self.peak != 0:
+            drawdown = (self.cum - self.peak) / self.peak
+            if math.isnan(self.max_drawdown) or drawdown < self.max_drawdown:
+                self.max_drawdown = drawdown
+
+    def metrics(self):
+        af = self.annualization_factor
+        volatility = math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else NAN
+        downside_vol = math.sqrt(self.m2_neg / (self.n_neg - 1)) if self.n_neg > 1 else NAN
+        annual_return = self.mean * af if self.n else NAN
+
+        sharpe = 0.0 if volatility == 0 else annual_return / (volatility * math.sqrt(af))
+        sortino = 0.0 if downside_vol == 0 else annual_return / (downside_vol * math.sqrt(af))
+        if self.n == 0 or self.max_drawdown == 0 or math.isnan(self.max_drawdown):
+            calmar = 0.0
+        else:
+            calmar = annual_return / abs(self.max_drawdown)
+        hit_ratio = self.n_pos / self.n_nonzero if self.n_nonzero else NAN
+
+        return {
+            "Annualize Return (%)": 100 * annual_return,
+            "Volatility (%)": 100 * volatility * math.sqrt(af),
+            "Sharpe Ratio": sharpe,
+            "Sortino Ratio": sortino,
+            "Max Drawdown (%)": 100 * self.max_drawdown,
+            "Calmar Ratio": calmar,
+            "Hit Ratio (%)": 100 * hit_ratio,
+        }
+
+
+class StreamingPairBacktester:
+    def __init__(
+            self,
+            hedge_ratio=1,
+            hedge_method="static",
+            hedge_window=60,
+            kalman_delta=1e-4,
+            kalman_obs_var=1e-3,
+            window=100,
+            z_entry=2.0,
+            z_exit=0.5,
+            transaction_costs_bps=1,
+            slippage_bps=1,
+            capital=1_000_000,
+            positioning_method="net",
+            margin_rate=0.1,
+            annualization_factor=ANNUALIZATION_FACTOR,
+         ):
+
+        if positioning_method not in ("gross", "net", "margin"):
+            raise ValueError("Invalid positioning_method. Use 'gross', 'net' or 'margin'.")
+
+        # Hedge ratio: static, or re-estimated every bar like PairBacktester.compute_hedge_ratios
+        if hedge_method == "static":
+            self.hedge = None
+        elif hedge_method == "rolling_ols":
+            self.hedge = RollingOLSHedge(int(hedge_window))
+        elif hedge_method == "kalman":
+            self.hedge = KalmanHedge(kalman_delta, kalman_obs_var)
+        else:
+            raise ValueError("Invalid hedge_method. Use 'static', 'rolling_ols' or 'kalman'.")
+        self.hedge_method = hedge_method
+        self.hedge_ratio = hedge_ratio # Current hedge ratio (the static one, or the last estimate)
+        self.window = int(window)
+        self.z_entry = z_entry
+        self.z_exit = z_exit
+        self.total_cost_rate = transaction_costs_bps / 10_000 + slippage_bps / 10_000
+        self.capital = capital
+        self.positioning_method = positioning_method
+        self.margin_rate = margin_rate
+
+        # Streaming state carried from one bar to the next
+        self.rolling = RollingWindow(self.window)
+        self.running_metrics = RunningMetrics(annualization_factor)
+        self.prev_spread = NAN
+        self.prev_price1 = NAN
+        self.prev_price2 = NAN
+        self.prev_z_score = NAN
+        self.position = 0
+        self.prev_trade_entry = False
+        self.cumulative_pnl = 0.0
+        self.trades = 0
+        self.bars = 0
+
+
+    @classmethod
+    def from_backtester(cls, bt):
+        # Same strategy parameters as a batch PairBacktester (annualized on its bar frequency once its data is loaded)
+        if isinstance(bt.window, str) or bt.session is not None:
+            raise ValueError("Streaming mode supports bar-count windows without a session only (window=int, session=None).")
+        if bt.execution_model != "vectorized":
+            raise ValueError("Streaming mode supports execution_model='vectorized' only.")
+        return cls(
+            hedge_ratio=bt.hedge_ratio,
+            hedge_method=bt.hedge_method,
+            hedge_window=bt.hedge_window,
+            kalman_delta=bt.kalman_delta,
+            kalman_obs_var=bt.kalman_obs_var,
+            window=bt.window,
+            z_entry=bt.z_entry,
+            z_exit=bt.z_exit,
+            transaction_costs_bps=bt.transaction_costs_bps,
+            slippage_bps=bt.slippage_bps,
+            capital=bt.capital,
+            positioning_method=bt.positioning_method,
+            margin_rate=bt.margin_rate,
+            annualization_factor=ANNUALIZATION_FACTOR if bt.data is None else bt.bars_per_year(),
+        )
+
+
+    def on_bar(self, price1, price2):
+        prev_hedge = self.hedge_ratio
+        if self.hedge is not None:
+            self.hedge_ratio = self.hedge.update(price1, price2)
+        hedged_price2 = self.hedge_ratio * price2
+        spread = price1 - hedged_price2
+
+        # Rolling z-score of the spread (NaN until the window holds `window` consecutive valid spreads,
+        # as with pandas rolling over the NaN hedge ratios of a filling rolling OLS window)
+        if math.isnan(spread):
+            self.rolling = RollingWindow(self.window)
+        else:
+            self.rolling.update(spread)
+        z_score = NAN
+        if self.rolling.ready():
+            std = self.rolling.std()
+            deviation = spread - self.rolling.mean
+            if std != 0:
+                z_score = deviation / std
+            elif deviation != 0:
+                z_score = math.copysign(math.inf, deviation) # Same as the batch division by a zero std
+
+        # Signal on the previous bar's z-score (same state machine as generate_signals)
+        z_lagged = self.prev_z_score
+        prev_position = self.position
+        if -self.z_exit < z_lagged < self.z_exit:
+            position = 0
+        elif z_lagged < -self.z_entry:
+            position = 1
+        elif z_lagged > self.z_entry:
+            position = -1
+        else:
+            position = prev_position
+
+        # Per-unit cost of the spread (depending on the positioning method)
+        if self.positioning_method == "gross":
+            unit_cost = price1 + abs(hedged_price2)
+        elif self.positioning_method == "net":
+            unit_cost = max(price1, abs(hedged_price2))
+        else:
+            unit_cost = (price1 + abs(hedged_price2)) * self.margin_rate
+        units = self.capital / unit_cost if unit_cost != 0 and not math.isnan(hedged_price2) else NAN
+
+        # PnL on the position held over the bar (which keeps the previous bar's hedge ratio), cost
+        # charged the bar after an entry
+        if self.hedge is None:
+            spread_return = spread - self.prev_spread
+        else:
+            spread_return = (price1 - self.prev_price1) - prev_hedge * (price2 - self.prev_price2)
+        raw_pnl = prev_position * units * spread_return
+        cost = float(self.prev_trade_entry) * self.total_cost_rate * abs(spread) * units
+        pnl = raw_pnl - cost
+
+        trade_entry = position != 0 and position != prev_position
+
+        if not math.isnan(pnl):
+            self.cumulative_pnl += pnl
+            r = pnl / self.capital
+            if not math.isinf(r):
+                self.running_metrics.update(r)
+
+        self.prev_spread = spread
+        self.prev_price1 = price1
+        self.prev_price2 = price2
+        self.prev_z_score = z_score
+        self.position = position
+        self.prev_trade_entry = trade_entry
+        self.trades += trade_entry
+        self.bars += 1
+
+        return {
+            "hedge_ratio": self.hedge_ratio,
+            "spread": spread,
+            "z_score": z_score,
+            "position": position,
+            "units": units,
+            "transaction_cost": cost,
+            "pnl": pnl,
+            "trade_entry": trade_entry,
+        }
+
+
+    def metrics(self):
+        return self.running_metrics.metrics()
+
+
+def replay(bt):
+    # Feed a batch PairBacktester's aligned prices bar by bar through the streaming engine
+    if bt.data is None:
+        bt.load_data()
+    stream = StreamingPairBacktester.from_backtester(bt)
+
+    price1 = bt.data[bt.label1].to_numpy().tolist()
+    price2 = bt.data[bt.label2].to_numpy().tolist()
+    rows = [stream.on_bar(p1, p2) for p1, p2 in zip(price1, price2)]
+    return pd.DataFrame(rows, index=bt.data.index), stream
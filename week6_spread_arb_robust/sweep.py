@@ -0,0 +1,162 @@
+import itertools
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from robust_spread_arb import PairBacktester
+from metrics import compute_metrics, trade_stats
+from strategies.pair import pair_positions, spread_pnl
+
+SWEEP_KEYS = ["window", "z_entry", "z_exit", "hedge_ratio"]
+
+# Aligned prices shared with the worker processes (inherited on fork, sent once per worker otherwise)
+_DATA = None
+_VOLUME = None
+
+
+def grid_specs(grid):
+    # grid: {"window": [10, 20], "z_entry": [1.64, 1.96], ...} -> cartesian product
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_specs(space, n_samples, seed=None):
+    # space values: a list (sampled uniformly among its items) or {"low": a, "high": b} (uniform range, int if both ints)
+    rng = np.random.default_rng(seed)
+    specs = []
+    for _ in range(n_samples):
+        spec = {}
+        for key, dist in space.items():
+            if isinstance(dist, dict):
+                low, high = dist["low"], dist["high"]
+                if isinstance(low, int) and isinstance(high, int):
+                    spec[key] = int(rng.integers(low, high + 1))
+                else:
+                    spec[key] = float(rng.uniform(low, high))
+            else:
+                spec[key] = dist[rng.integers(len(dist))]
+        specs.append(spec)
+    return specs
+
+
+def _group_specs(base_params, specs, chunk_size):
+    # Runs sharing (window, hedge_ratio) share the spread and its rolling mean/std
+    groups = {}
+    for spec in specs:
+        params = {**base_params, **spec}
+        key = (int(params["window"]), float(params["hedge_ratio"]))
+        groups.setdefault(key, []).append((float(params["z_entry"]), float(params["z_exit"])))
+
+    tasks = []
+    for (window, hedge_ratio), thresholds in groups.items():
+        for start in range(0, len(thresholds), chunk_size):
+            tasks.append((base_params, window, hedge_ratio, thresholds[start:start + chunk_size]))
+    return tasks
+
+
+def _init_worker(data, volume=None):
+    global _DATA, _VOLUME
+    _DATA = data
+    _VOLUME = volume
+
+
+def _run_group(task):
+    base_params, window, hedge_ratio, thresholds = task
+
+    bt = PairBacktester(**{**base_params, "window": window, "hedge_ratio": hedge_ratio})
+    bt.data = _DATA
+    bt.compute_spread() # Rolling mean/std computed once for the whole group
+
+    # Positions for every (z_entry, z_exit) of the group in a single 2-D call
+    z_entry = np.array([t[0] for t in thresholds])
+    z_exit = np.array([t[1] for t in thresholds])
+    positions = pair_positions(bt.z_score.to_numpy()[:, None], z_entry, z_exit)
+
+    if bt.execution_model == "event":
+        # Event-driven fills are path dependent: one compiled simulation per run
+        return _run_group_event(bt, window, hedge_ratio, thresholds, positions)
+
+    # PnL and metrics of every run of the group as (bars x runs) matrices
+    price1 = bt.data[bt.label1].to_numpy()[:, None]
+    price2 = bt.data[bt.label2].to_numpy()[:, None]
+    hedge = bt.hedge_ratio if bt.hedge_ratios is None else bt.hedge_ratios.to_numpy()[:, None]
+    spread = bt.spread.to_numpy()[:, None]
+
+    spread_return = None
+    if bt.hedge_ratios is not None:
+        spread_return = np.full_like(spread, np.nan)
+        spread_return[1:] = np.diff(price1, axis=0) - hedge[:-1] * np.diff(price2, axis=0)
+
+    total_cost_rate = bt.transaction_costs + bt.slippage
+    _, _, _, _, pnl = spread_pnl(
+        positions, spread, price1, hedge * price2, bt.capital, total_cost_rate,
+        bt.positioning_method, bt.margin_rate, spread_return=spread_return,
+    )
+
+    factor = bt.bars_per_year()
+    metrics = compute_metrics(pnl / bt.capital, factor)
+    metrics.update(trade_stats(positions, pnl, factor))
+
+    rows = []
+    for j, (entry, exit) in enumerate(thresholds):
+        rows.append({
+            "window": window, "z_entry": entry, "z_exit": exit, "hedge_ratio": hedge_ratio,
+            **{k: float(v[j]) for k, v in metrics.items()},
+        })
+    return rows
+
+
+def _run_group_event(bt, window, hedge_ratio, thresholds, positions):
+    if bt.volume is None and _VOLUME is not None:
+        bt.volume = _VOLUME
+
+    rows = []
+    for j, (entry, exit) in enumerate(thresholds):
+        bt.z_entry, bt.z_exit = entry, exit
+        bt.position = pd.Series(positions[:, j], index=bt.data.index)
+        bt.compute_pnl()
+        rows.append({"window": window, "z_entry": entry, "z_exit": exit, "hedge_ratio": hedge_ratio, **bt.compute_metrics()})
+    return rows
+
+
+def run_sweep(base_params, specs, processes=None, chunk_size=64):
+    # Load the price data once for the whole sweep
+    loader = PairBacktester(**base_params)
+    loader.load_data()
+
+    tasks = _group_specs(base_params, specs, chunk_size)
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(loader.data, loader.volume)
+        results = [_run_group(task) for task in tasks]
+    else:
+        # Fork shares the loaded prices copy-on-write; spawn (Windows) pickles them once per worker
+        method = "fork" if "fork" in mp.get_all_start_methods() else None
+        ctx = mp.get_context(method)
+        with ctx.Pool(processes, initializer=_init_worker, initargs=(loader.data, loader.volume)) as pool:
+            results = pool.map(_run_group, tasks)
+
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def render_sweep_reports(base_params, results, out_dir, top=None, processes=None):
+    # Batch report: the three figures of each run (best `top` by Sharpe ratio, all if None) in out_dir/run_<i>/
+    from plots import render_jobs, report_jobs # matplotlib only loaded when reports are requested
+    if top:
+        results = results.sort_values("Sharpe Ratio", ascending=False).head(top)
+
+    loader = PairBacktester(**base_params)
+    loader.load_data()
+
+    # Backtests re-run here (cheap), only the downsampled series go to the rendering workers
+    jobs = []
+    for i, row in results.iterrows():
+        bt = PairBacktester(**{**base_params, **{k: row[k] for k in SWEEP_KEYS}, "window": int(row["window"])})
+        bt.data = loader.data
+        bt.volume = loader.volume
+        bt.compute_spread()
+        bt.generate_signals()
+        bt.compute_pnl()
+        jobs += report_jobs(bt.pnl, bt.spread, bt.z_score, os.path.join(out_dir, f"run_{i}"))
+    return render_jobs(jobs, processes)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The week folder is a flat set of modules imported by bare name (as by the run_*.py scripts)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+import align
+from align import align_arrays, load_aligned
+from price_store import PriceStore
+
+# N-way alignment on hand-built series with staggered gaps, on the calendar t = 0..9:
+#   A misses t=3, B misses t=5..7, C starts at t=1 and misses t=9. Prices are 100 / 200 / 300 + t.
+
+NAMES = ["A", "B", "C"]
+PRESENT = {
+    "A": [0, 1, 2, 4, 5, 6, 7, 8, 9],
+    "B": [0, 1, 2, 3, 4, 8, 9],
+    "C": [1, 2, 3, 4, 5, 6, 7, 8],
+}
+BASE = {"A": 100.0, "B": 200.0, "C": 300.0}
+
+
+def _align(fill_policy, max_staleness=None):
+    indexes = [np.array(PRESENT[n], dtype=np.int64) for n in NAMES]
+    values = [BASE[n] + np.array(PRESENT[n], dtype=float) for n in NAMES]
+    return align_arrays(indexes, values, NAMES, fill_policy, max_staleness)
+
+
+def test_drop():
+    calendar, matrix, report = _align("drop")
+    assert calendar.tolist() == [1, 2, 4, 8]
+    assert np.array_equal(matrix, np.column_stack([BASE[n] + calendar for n in NAMES]))
+    assert report["union_bars"] == 10 and report["aligned_bars"] == 4
+    assert report["symbols"]["A"] == {"bars": 9, "missing": 1, "filled": 0, "max_gap": 1}
+    assert report["symbols"]["B"] == {"bars": 7, "missing": 3, "filled": 0, "max_gap": 3}
+    assert report["symbols"]["C"] == {"bars": 8, "missing": 2, "filled": 0, "max_gap": 1}
+
+
+def test_ffill_unlimited():
+    # Every gap carries the last price; C has no price before t=1, so t=0 is still dropped
+    calendar, matrix, report = _align("ffill")
+    assert calendar.tolist() == list(range(1, 10))
+    expected = {
+        "A": [101, 102, 102, 104, 105, 106, 107, 108, 109],
+        "B": [201, 202, 203, 204, 204, 204, 204, 208, 209],
+        "C": [301, 302, 303, 304, 305, 306, 307, 308, 308],
+    }
+    assert np.array_equal(matrix, np.column_stack([expected[n] for n in NAMES]).astype(float))
+    assert [report["symbols"][n]["filled"] for n in NAMES] == [1, 3, 1]
+    assert report["aligned_bars"] == 9
+
+
+def test_ffill_max_staleness():
+    # B at t=7 would be 3 bars stale: left missing, so the bar is dropped
+    calendar, matrix, report = _align("ffill", max_staleness=2)
+    assert calendar.tolist() == [1, 2, 3, 4, 5, 6, 8, 9]
+    assert matrix[:, 1].tolist() == [201, 202, 203, 204, 204, 204, 208, 209]
+    assert [report["symbols"][n]["filled"] for n in NAMES] == [1, 2, 1]
+
+
+def test_flag():
+    # Whole union calendar kept; missing prices stay NaN (the flag the caller filters on)
+    calendar, matrix, report = _align("flag")
+    assert calendar.tolist() == list(range(10))
+    missing = {n: sorted(set(range(10)) - set(PRESENT[n])) for n in NAMES}
+    for j, n in enumerate(NAMES):
+        assert np.flatnonzero(np.isnan(matrix[:, j])).tolist() == missing[n]
+        present = PRESENT[n]
+        assert np.array_equal(matrix[present, j], BASE[n] + np.array(present, dtype=float))
+    assert report["aligned_bars"] == 10
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        _align("bfill")
+
+
+def test_load_aligned_frames(tmp_path):
+    # CSVs with local offsets across DST -> one UTC DatetimeIndex; the union calendar is memoized
+    local = pd.date_range("2021-03-10", periods=10, freq="D", tz="America/New_York")
+    paths = []
+    for n in NAMES:
+        path = tmp_path / f"{n}.csv"
+        rows = PRESENT[n]
+        pd.DataFrame({"Close": BASE[n] + np.array(rows, dtype=float)}, index=pd.Index(local[rows], name="Date")).to_csv(path)
+        paths.append(str(path))
+
+    store = PriceStore(str(tmp_path / ".price_store"))
+    align._CALENDARS.clear()
+    frame, report = load_aligned(store, paths, NAMES, fill_policy="drop")
+    assert frame.index.equals(local[[1, 2, 4, 8]].tz_convert("UTC").rename("Date"))
+    assert frame.columns.tolist() == NAMES
+    assert frame["C"].tolist() == [301.0, 302.0, 304.0, 308.0]
+    assert len(align._CALENDARS) == 1
+
+    flagged, _ = load_aligned(store, paths, NAMES, fill_policy="flag")
+    assert len(align._CALENDARS) == 1 # Same symbol set: calendar reused
+    assert len(flagged) == 10 and flagged["B"].isna().sum() == 3
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bars import (
+    annualization_factor, index_annualization_factor, resample_chunks, resample_ticks, rolling_mean_std, session_ids,
+)
+
+# Bar-frequency layer: rolling statistics against pandas (within and across sessions), annualization
+# inferred from the bar frequency, and chunked resampling against whole-file resampling.
+
+SESSION = {"start": "09:30", "end": "16:00", "tz": "America/New_York"}
+
+
+def _minute_bars(days=3, seed=0):
+    # Regular-session 1min bars over a few days (overnight gaps between sessions), drifting prices
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(f"2024-03-{8 + d} 09:30", f"2024-03-{8 + d} 15:59", freq="min", tz="America/New_York")
+        for d in range(days)
+    ])).tz_convert("UTC")
+    rng = np.random.default_rng(seed)
+    values = 1_000 + np.cumsum(rng.normal(0, 0.5, len(index)))
+    values[rng.random(len(index)) < 0.01] = np.nan
+    return index, values
+
+
+@pytest.mark.parametrize("window", [1, 2, 30, 390])
+def test_count_window_matches_pandas(window):
+    _, values = _minute_bars()
+    mean, std = rolling_mean_std(values, window, block_size=97) # Several blocks
+    rolling = pd.Series(values).rolling(window)
+    assert np.allclose(mean, rolling.mean(), rtol=1e-12, equal_nan=True)
+    assert np.allclose(std, rolling.std(), rtol=1e-6, equal_nan=True)
+
+
+def test_count_window_resets_per_session():
+    index, values = _minute_bars()
+    sessions = session_ids(index.asi8, SESSION)
+    mean, std = rolling_mean_std(values, 30, ts=index.asi8, sessions=sessions)
+    grouped = pd.Series(values).groupby(sessions).rolling(30)
+    assert np.allclose(mean, grouped.mean().to_numpy(), rtol=1e-12, equal_nan=True)
+    assert np.allclose(std, grouped.std().to_numpy(), rtol=1e-6, equal_nan=True)
+    assert np.isnan(mean[390:390 + 29]).all() # First bars of the second session: window not filled yet
+
+
+def test_time_window_matches_pandas():
+    index, values = _minute_bars()
+    series = pd.Series(values, index=index)
+    mean, std = rolling_mean_std(values, "30min", ts=index.asi8)
+    rolling = series.rolling("30min", min_periods=2)
+    assert np.allclose(mean, rolling.mean().to_numpy(), rtol=1e-12, equal_nan=True)
+    assert np.allclose(std, rolling.std().to_numpy(), rtol=1e-6, equal_nan=True)
+
+    # Across the session boundary: the window restarts at the open instead of reaching into the overnight gap
+    sessions = session_ids(index.asi8, SESSION)
+    mean, _ = rolling_mean_std(values, "2h", ts=index.asi8, sessions=sessions)
+    grouped = series.groupby(sessions).rolling("2h", min_periods=2).mean().to_numpy()
+    assert np.allclose(mean, grouped, rtol=1e-12, equal_nan=True)
+
+
+def test_long_drifting_history():
+    # Block re-centering keeps the cumulative sums accurate far from zero
+    rng = np.random.default_rng(1)
+    values = 1e6 + np.cumsum(rng.normal(0, 1, 200_000))
+    mean, std = rolling_mean_std(values, 100)
+    rolling = pd.Series(values).rolling(100)
+    assert np.allclose(mean, rolling.mean(), rtol=1e-12, equal_nan=True)
+    assert np.allclose(std[99:], rolling.std()[99:], rtol=1e-4)
+
+
+def test_annualization_from_bar_frequency():
+    assert annualization_factor("1D") == 252
+    assert annualization_factor("7D") == pytest.approx(365.25 / 7)
+    assert annualization_factor("1h", SESSION) == pytest.approx(252 * 6.5)
+    assert annualization_factor("1min", SESSION) == pytest.approx(252 * 390)
+    assert annualization_factor("1min", bars_per_day=1440) == 252 * 1440
+    with pytest.raises(ValueError):
+        annualization_factor("1min")
+
+    # Inferred from the index: daily closes with DST shifts in UTC, hourly and minute session bars
+    daily = pd.bdate_range("2021-01-04", periods=300, tz="America/New_York").tz_convert("UTC")
+    assert index_annualization_factor(daily) == 252
+    index, _ = _minute_bars()
+    assert index_annualization_factor(index) == 252 * 390
+    assert index_annualization_factor(index, "1min", SESSION) == pytest.approx(252 * 390)
+    hourly = index[::60]
+    assert index_annualization_factor(hourly) == 252 * 7 # 09:30 ... 15:30 opens
+    assert index_annualization_factor(pd.RangeIndex(100)) == 252
+
+
+def _ticks(n=30_000, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-03-08 13:00", tz="UTC").value
+    ts = start + np.cumsum(rng.exponential(4e9, n)).astype(np.int64) # Several sessions and overnight gaps
+    return ts, 100 + np.cumsum(rng.normal(0, 0.01, n)), rng.integers(1, 500, n).astype(float)
+
+
+@pytest.mark.parametrize("session", [None, SESSION])
+@pytest.mark.parametrize("chunk_size", [3, 777, 10_000])
+def test_resample_chunks_matches_whole(session, chunk_size):
+    ts, price, size = _ticks()
+    whole = resample_ticks(ts, price, size, "5min", session)
+    chunks = [(ts[i:i + chunk_size], price[i:i + chunk_size], size[i:i + chunk_size]) for i in range(0, len(ts), chunk_size)]
+    parts = list(resample_chunks(chunks, "5min", session))
+    for key, values in whole.items():
+        assert np.array_equal(np.concatenate([p[key] for p in parts]), values), key
+    if session is None:
+        assert whole["ticks"].sum() == len(ts)
+    else:
+        assert 0 < whole["ticks"].sum() < len(ts) # Ticks outside the session dropped
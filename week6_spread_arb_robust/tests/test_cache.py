@@ -0,0 +1,118 @@
+import os
+import shutil
+import pytest
+import cache
+from robust_spread_arb import PairBacktester
+
+# Stage cache: the key chain starts from the hash of the package sources (editing any module, subpackages
+# included, recomputes every stage) and the CSV content hashes; a stage is reused as long as nothing upstream
+# of it changed, and the oldest entries are evicted past max_bytes.
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_code_version_covers_subpackages(tmp_path):
+    _write(tmp_path / "engine.py", "x = 1\n")
+    _write(tmp_path / "strategies" / "pair.py", "z_entry = 2.0\n")
+    _write(tmp_path / "tests" / "test_engine.py", "pass\n")
+    before = cache.code_version(tmp_path)
+
+    _write(tmp_path / "tests" / "test_engine.py", "assert True\n")
+    assert cache.code_version(tmp_path) == before # Tests are not part of the code version
+
+    _write(tmp_path / "strategies" / "pair.py", "z_entry = 2.5\n")
+    assert cache.code_version(tmp_path) != before
+
+
+def test_package_sources_include_strategies():
+    root = os.path.dirname(os.path.abspath(cache.__file__))
+    files = [os.path.relpath(p, root) for p in cache.source_files(root)]
+    assert os.path.join("strategies", "pair.py") in files
+    assert not any(p.startswith("tests") or "__pycache__" in p for p in files)
+
+
+def test_code_change_forces_recompute(tmp_path, monkeypatch):
+    def run():
+        bt = PairBacktester("SPY.csv", "IVV.csv", plots=False, cache_subdir=str(tmp_path / "cache"))
+        metrics = bt.run_backtest(verbose=False)
+        return bt.cache, metrics
+
+    first, metrics = run()
+    assert first.hits == 0
+    second, cached = run()
+    assert second.misses == 0 and second.hits == 5
+    assert cached == metrics
+
+    monkeypatch.setattr(cache, "_CODE_VERSION", "edited sources")
+    third, recomputed = run()
+    assert third.hits == 0 and third.misses == 5
+    assert recomputed["Sharpe Ratio"] == metrics["Sharpe Ratio"]
+
+
+def _backtester(tmp_path, **params):
+    return PairBacktester("SPY.csv", "IVV.csv", data_subdir=str(tmp_path / "data"), plots=False,
+                          cache_subdir=str(tmp_path / "cache"), **params)
+
+
+@pytest.fixture
+def data_copy(tmp_path):
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+    (tmp_path / "data").mkdir()
+    for name in ("SPY.csv", "IVV.csv"):
+        shutil.copyfile(os.path.join(source, name), tmp_path / "data" / name)
+    return tmp_path
+
+
+def test_new_z_entry_reuses_z_score(data_copy):
+    bt = _backtester(data_copy, z_entry=2.0)
+    bt.run_backtest(verbose=False)
+    assert (bt.cache.hits, bt.cache.misses) == (0, 5)
+
+    # load and spread (hedge ratio, rolling mean/std, z-score) hit; signals, pnl and metrics recompute
+    bt = _backtester(data_copy, z_entry=1.5)
+    metrics = bt.run_backtest(verbose=False)
+    assert (bt.cache.hits, bt.cache.misses) == (2, 3)
+    fresh = PairBacktester("SPY.csv", "IVV.csv", data_subdir=str(data_copy / "data"), plots=False, z_entry=1.5)
+    assert metrics == fresh.run_backtest(verbose=False)
+
+
+def test_csv_change_invalidates(data_copy):
+    _backtester(data_copy).run_backtest(verbose=False)
+    path = data_copy / "data" / "SPY.csv"
+
+    # Touched but identical content: same fingerprint, every stage served from the cache
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    bt = _backtester(data_copy)
+    bt.run_backtest(verbose=False)
+    assert (bt.cache.hits, bt.cache.misses) == (5, 0)
+
+    # New content: everything from the load stage on is recomputed
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]))
+    bt = _backtester(data_copy)
+    bt.run_backtest(verbose=False)
+    assert (bt.cache.hits, bt.cache.misses) == (0, 5)
+    assert len(bt.data) == len(lines) - 2 # Header and the dropped last bar
+
+
+def test_lru_eviction(tmp_path):
+    store = cache.ResultCache(str(tmp_path), max_bytes=10**9)
+    payload = b"x" * 1_000
+    for i, key in enumerate(["a", "b", "c"]):
+        store.put(key, payload)
+        os.utime(store._path(key), ns=(i * 10**9, i * 10**9)) # a oldest, c newest
+    size = os.path.getsize(store._path("a"))
+
+    assert store.get("a") == payload # Hit: a becomes the most recently used
+    store.max_bytes = 2 * size
+    store.evict()
+    assert not os.path.exists(store._path("b"))
+    assert os.path.exists(store._path("a")) and os.path.exists(store._path("c"))
+
+    store.max_bytes = size
+    store.put("d", payload) # Over the bound again: only the newest entry fits
+    assert [k for k in "acd" if os.path.exists(store._path(k))] == ["d"]
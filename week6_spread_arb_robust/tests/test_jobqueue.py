@@ -0,0 +1,121 @@
+import json
+import os
+import pytest
+from jobqueue import JobQueue, run_local_workers, shard_jobs
+from sweep import grid_specs
+
+# SQLite job queue: leases, retries and idempotent results, with several worker processes on one machine.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease=60.0, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def _expire_leases(queue):
+    # Heartbeats far in the past: the workers holding the jobs look crashed
+    queue.conn.execute("UPDATE jobs SET heartbeat = heartbeat - 3600")
+
+
+def test_enqueue_is_idempotent(queue):
+    payloads = [{"params": {}, "specs": [{"window": w}]} for w in (10, 20)]
+    assert queue.enqueue("s", payloads) == 2
+    assert queue.enqueue("s", payloads) == 0
+    assert queue.counts("s")["pending"] == 2
+
+
+def test_stale_job_is_reclaimed(queue):
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    first = queue.claim("w1")
+    assert len(first) == 1 and queue.claim("w2") == [] # Leased to w1
+
+    _expire_leases(queue)
+    second = queue.claim("w2")
+    assert [job["id"] for job in second] == [first[0]["id"]]
+    assert second[0]["attempts"] == 2
+
+
+def test_late_complete_is_discarded(queue):
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    job = queue.claim("w1")[0]
+    _expire_leases(queue)
+    reclaimed = queue.claim("w2")[0]
+
+    assert queue.complete(reclaimed, "w2", [{"run": "w2"}], 1.0)
+    assert not queue.complete(job, "w1", [{"run": "w1"}], 2.0) # w1 no longer holds the job
+    assert queue.results("s").to_dict("records") == [{"run": "w2", "worker": "w2"}]
+    assert queue.counts("s")["done"] == 1
+
+
+def test_duplicate_result_is_ignored(queue):
+    # A second completion of the same job key (e.g. after retry) keeps the first stored result
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    job = queue.claim("w1")[0]
+    assert queue.complete(job, "w1", [{"run": 1}], 1.0)
+    queue.conn.execute("UPDATE jobs SET status = 'running', worker = 'w2'")
+    assert queue.complete(job, "w2", [{"run": 2}], 1.0)
+    assert queue.results("s").to_dict("records") == [{"run": 1, "worker": "w1"}]
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    job = queue.claim("w1")[0]
+    queue.fail(job, "w2", "not the holder") # Ignored: w2 does not hold the job
+    assert queue.counts("s")["running"] == 1
+
+    queue.fail(job, "w1", "ValueError: boom")
+    assert queue.counts("s")["pending"] == 1
+
+    job = queue.claim("w1")[0]
+    assert job["attempts"] == 2
+    queue.fail(job, "w1", "ValueError: boom again")
+    assert queue.counts("s")["failed"] == 1
+    assert queue.claim("w1") == []
+    error = queue.conn.execute("SELECT error FROM jobs").fetchone()[0]
+    assert error == "ValueError: boom again"
+
+    assert queue.retry_failed("s") == 1
+    assert queue.claim("w1")[0]["attempts"] == 1
+
+
+def test_expired_job_without_attempts_fails(queue):
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    queue.claim("w1")
+    _expire_leases(queue)
+    queue.claim("w2")
+    _expire_leases(queue)
+    assert queue.claim("w3") == []
+    assert queue.counts("s")["failed"] == 1
+
+
+def test_max_runtime_reclaims_hung_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease=60.0, max_runtime=10.0)
+    queue.enqueue("s", [{"params": {}, "specs": []}])
+    job = queue.claim("w1")[0]
+    queue.heartbeat("w1", [job["id"]]) # Alive, but running for too long
+    queue.conn.execute("UPDATE jobs SET started = started - 60")
+    assert [j["id"] for j in queue.claim("w2")] == [job["id"]]
+    queue.close()
+
+
+def test_local_workers_drain_sweep(tmp_path):
+    with open(os.path.join(ROOT, "config.json"), "r") as params_file:
+        params = {**json.load(params_file), "cache_subdir": None, "plots": False}
+    specs = grid_specs({"window": [10, 20], "z_entry": [1.64, 2.0], "z_exit": [0.5], "hedge_ratio": [0.992]})
+    path = str(tmp_path / "jobs.sqlite")
+
+    queue = JobQueue(path)
+    assert queue.enqueue("sweep", shard_jobs(specs, chunk_size=1)) == 4
+    done = run_local_workers(path, params, processes=3)
+    assert sum(done.values()) == 4 and len(done) == 3
+
+    assert queue.counts("sweep") == {"pending": 0, "running": 0, "done": 4, "failed": 0}
+    keys = [row[0] for row in queue.conn.execute("SELECT key FROM results")]
+    assert len(keys) == len(set(keys)) == 4
+    results = queue.results("sweep")
+    assert sorted(zip(results["window"], results["z_entry"])) == sorted((s["window"], s["z_entry"]) for s in specs)
+    queue.close()
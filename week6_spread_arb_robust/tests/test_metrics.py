@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metrics import compute_metrics, trade_stats
+from robust_spread_arb import PairBacktester
+
+# The one-pass metrics engine must reproduce the original utils formulas (kept below as the reference)
+# on the sample pair, for 1-D input and per column of 2-D input.
+
+CONFIG = {"hedge_ratio": 0.992, "window": 20, "z_entry": 1.64, "z_exit": 1.28, "margin_rate": 1}
+
+
+def reference_metrics(daily_returns, annualization_factor=252):
+    # Original utils.calculate_* and PairBacktester.compute_metrics on a pandas Series
+    r = pd.Series(daily_returns).replace([np.inf, -np.inf], np.nan).dropna()
+    volatility = r.std()
+    downside_vol = r[r < 0].std()
+    annual_return = r.mean() * annualization_factor
+    cum_pnl = 1 + r.cumsum()
+    peak = cum_pnl.cummax().replace(0, np.nan)
+    max_dd = ((cum_pnl - peak) / peak).min()
+    return {
+        "Annualize Return (%)": 100 * annual_return,
+        "Volatility (%)": 100 * volatility * np.sqrt(annualization_factor),
+        "Sharpe Ratio": 0.0 if volatility == 0 else annual_return / (volatility * np.sqrt(annualization_factor)),
+        "Sortino Ratio": 0.0 if downside_vol == 0 else annual_return / (downside_vol * np.sqrt(annualization_factor)),
+        "Max Drawdown (%)": 100 * max_dd,
+        "Calmar Ratio": 0.0 if max_dd == 0 or np.isnan(max_dd) else annual_return / abs(max_dd),
+        "Hit Ratio (%)": 100 * r[r > 0].count() / r[r != 0].count(),
+    }
+
+
+def reference_trade_stats(position, pnl, annualization_factor=252):
+    # Trade by trade: the PnL of bar t belongs to the trade held over it (opened at or before t-1)
+    pnl = np.nan_to_num(pnl, nan=0.0, posinf=0.0, neginf=0.0)
+    trades, current, previous = [], None, 0
+    for t, p in enumerate(position):
+        if current is not None and previous != 0:
+            current[0] += pnl[t]
+            current[1] += 1
+        if p != 0 and p != previous:
+            current = [0.0, 0]
+            trades.append(current)
+        previous = p
+    turnover = np.abs(np.diff(position, prepend=0)).sum() / len(position) * annualization_factor
+    n = len(trades) or np.nan
+    return {
+        "Trades": float(len(trades)),
+        "Turnover (x/yr)": turnover,
+        "Trade Win Rate (%)": 100 * sum(t[0] > 0 for t in trades) / n,
+        "Avg Trade PnL ($)": sum(t[0] for t in trades) / n,
+        "Avg Holding (bars)": sum(t[1] for t in trades) / n,
+    }
+
+
+@pytest.fixture(scope="module")
+def sample():
+    bt = PairBacktester("SPY.csv", "IVV.csv", plots=False, **CONFIG)
+    metrics = bt.run_backtest(verbose=False)
+    return bt, metrics
+
+
+def _assert_close(result, expected):
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert result[key] == pytest.approx(expected[key], rel=1e-10, nan_ok=True), key
+
+
+def test_sample_pair_known_values(sample):
+    _, metrics = sample
+    assert metrics["Sharpe Ratio"] == pytest.approx(1.7179, abs=1e-4)
+    assert metrics["Trades"] == 97
+
+
+def test_matches_reference_1d(sample):
+    bt, _ = sample
+    returns = (bt.pnl / bt.capital).to_numpy()
+    _assert_close(compute_metrics(returns), reference_metrics(returns))
+    _assert_close(trade_stats(bt.position.to_numpy(), bt.pnl.to_numpy()), reference_trade_stats(bt.position.to_numpy(), bt.pnl.to_numpy()))
+
+
+def test_matches_reference_2d(sample):
+    # Columns with their own NaN / inf patterns and positions: each one against the reference alone
+    bt, _ = sample
+    returns = (bt.pnl / bt.capital).to_numpy()
+    rng = np.random.default_rng(0)
+    shuffled = rng.permutation(returns)
+    shuffled[rng.random(len(returns)) < 0.05] = np.inf
+    matrix = np.column_stack([returns, -returns, shuffled, np.full(len(returns), np.nan)])
+    position = bt.position.to_numpy()
+    positions = np.column_stack([position, -position, np.roll(position, 7), np.zeros_like(position)])
+    pnl = matrix * bt.capital
+
+    metrics = compute_metrics(matrix)
+    stats = trade_stats(positions, pnl)
+    for j in range(matrix.shape[1]):
+        column = {k: v[j] for k, v in metrics.items()}
+        if j == 3: # No valid return: ratios reported as 0, moments as NaN
+            assert column["Sharpe Ratio"] == column["Hit Ratio (%)"] == 0.0
+            assert np.isnan(column["Volatility (%)"])
+        else:
+            _assert_close(column, reference_metrics(matrix[:, j]))
+        _assert_close({k: v[j] for k, v in stats.items()}, reference_trade_stats(positions[:, j], pnl[:, j]))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from chunked import run_chunked
+from robust_spread_arb import PairBacktester
+from strategies import IndicatorCache, PairStrategy, Strategy
+from universe import UniverseBacktester
+
+# Every spread-arb engine runs the signal and PnL arithmetic of strategies/pair.py, so they must agree
+# with PairBacktester on the same pair and parameters.
+
+PARAMS = {"hedge_ratio": 0.992, "window": 20, "z_entry": 1.64, "z_exit": 1.28, "margin_rate": 1}
+
+
+@pytest.fixture(scope="module")
+def backtester():
+    bt = PairBacktester("SPY.csv", "IVV.csv", plots=False, cache_subdir=None, **PARAMS)
+    bt.run_backtest(verbose=False)
+    return bt
+
+
+def test_universe_matches(backtester):
+    ub = UniverseBacktester.from_files(["SPY.csv", "IVV.csv"], [("SPY", "IVV", PARAMS["hedge_ratio"])],
+                                       **{k: v for k, v in PARAMS.items() if k != "hedge_ratio"})
+    ub.run_backtest(verbose=False)
+    assert np.array_equal(ub.position[:, 0], backtester.position.to_numpy())
+    assert np.allclose(ub.pnl[:, 0], backtester.pnl.to_numpy(), equal_nan=True)
+
+
+def test_strategy_matches(backtester):
+    strategy = PairStrategy("SPY", "IVV", transaction_costs_bps=1, slippage_bps=1, **PARAMS)
+    cache = IndicatorCache.from_files(["SPY.csv", "IVV.csv"])
+    position = strategy.positions(cache)
+    assert np.array_equal(position, backtester.position.to_numpy())
+    assert np.allclose(strategy.pnl(cache, position), backtester.pnl.to_numpy(), equal_nan=True)
+
+
+@pytest.mark.parametrize("chunk_size", [97, 1_000, 1_000_000])
+def test_chunked_matches(backtester, tmp_path, chunk_size):
+    metrics = run_chunked(backtester, str(tmp_path / "chunked.csv"), chunk_size=chunk_size)
+    expected = backtester.compute_metrics()
+    assert metrics["Trades"] == expected["Trades"]
+    assert metrics["Sharpe Ratio"] == pytest.approx(expected["Sharpe Ratio"], rel=1e-12)
+
+
+def test_strategy_is_abstract():
+    class NoPositions(Strategy):
+        def symbols(self):
+            return ["SPY"]
+
+    with pytest.raises(TypeError):
+        NoPositions()
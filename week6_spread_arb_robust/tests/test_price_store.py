@@ -0,0 +1,52 @@
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from price_store import PriceStore
+
+# Columnar price cache: conversions racing in several processes must never expose a partial array.
+
+
+def _write_csv(path, n=20_000):
+    index = pd.date_range("2020-01-01", periods=n, freq="min", tz="America/New_York")
+    pd.DataFrame({"Close": np.arange(n, dtype=float), "Volume": np.arange(n, dtype=float) * 2},
+                 index=pd.Index(index, name="Date")).to_csv(path)
+
+
+def _convert_repeatedly(cache_dir, path, times):
+    store = PriceStore(cache_dir)
+    for _ in range(times):
+        store._convert(path, store._symbol_dir(path), os.stat(path))
+
+
+def test_load_roundtrip(tmp_path):
+    path = str(tmp_path / "ABC.csv")
+    _write_csv(path, n=100)
+    frame = PriceStore(str(tmp_path / "store")).load(path)
+    assert list(frame.columns) == ["Close", "Volume"]
+    assert str(frame.index.tz) == "UTC"
+    assert frame.index[0] == pd.Timestamp("2020-01-01 05:00", tz="UTC")
+    assert np.array_equal(frame["Close"].to_numpy(), np.arange(100, dtype=float))
+
+
+def test_concurrent_conversions(tmp_path):
+    path = str(tmp_path / "ABC.csv")
+    _write_csv(path)
+    cache_dir = str(tmp_path / "store")
+    store = PriceStore(cache_dir)
+    store.load(path)
+
+    context = mp.get_context("fork")
+    writers = [context.Process(target=_convert_repeatedly, args=(cache_dir, path, 5)) for _ in range(3)]
+    for writer in writers:
+        writer.start()
+    try:
+        while any(writer.is_alive() for writer in writers):
+            index, data = store.load_arrays(path)
+            assert len(index) == len(data["Close"]) == len(data["Volume"]) == 20_000
+            assert np.array_equal(data["Close"], np.arange(20_000, dtype=float))
+    finally:
+        for writer in writers:
+            writer.join()
+    assert all(writer.exitcode == 0 for writer in writers)
+    assert not [f for f in os.listdir(store._symbol_dir(path)) if f.endswith(".tmp")]
@@ -0,0 +1,158 @@
+import os
+import pandas as pd
+import numpy as np
+from align import load_aligned
+from bars import index_annualization_factor
+from price_store import PriceStore
+from strategies.pair import pair_positions, spread_pnl
+from metrics import compute_metrics, trade_stats
+
+
+class UniverseBacktester:
+    def __init__(
+            self,
+            prices,
+            pairs,
+            window=100,
+            z_entry=2.0,
+            z_exit=0.5,
+            transaction_costs_bps=1,
+            slippage_bps=1,
+            capital=1_000_000,
+            positioning_method="net",
+            margin_rate=0.1,
+            annualization_factor=None,
+         ):
+
+        # prices: DataFrame with one aligned price column per symbol
+        # pairs: list of (symbol1, symbol2, hedge_ratio), each pair trades `capital`
+        self.prices = prices
+        self.pairs = list(pairs)
+        self.labels = [f"{s1}/{s2}" for s1, s2, _ in self.pairs]
+
+        columns = {symbol: i for i, symbol in enumerate(prices.columns)}
+        self.leg1 = np.array([columns[s1] for s1, _, _ in self.pairs])
+        self.leg2 = np.array([columns[s2] for _, s2, _ in self.pairs])
+        self.hedge_ratio = np.array([h for _, _, h in self.pairs], dtype=float)
+
+        self.window = window
+        self.z_entry = z_entry
+        self.z_exit = z_exit
+
+        self.transaction_costs_bps = transaction_costs_bps
+        self.transaction_costs = transaction_costs_bps / 10_000
+        self.slippage_bps = slippage_bps
+        self.slippage = slippage_bps / 10_000
+
+        self.capital = capital
+        self.positioning_method = positioning_method
+        self.margin_rate = margin_rate
+        self.annualization_factor = annualization_factor # None: from the bar frequency of the price index
+        self.alignment = None # Alignment report when loaded with from_files
+
+        # Internal containers: 2-D arrays (bars x pairs)
+        self.price1 = None
+        self.hedged_price2 = None
+        self.spread = None
+        self.z_score = None
+        self.position = None
+        self.units = None
+        self.unit_cost = None
+        self.trade_entry = None
+        self.cost = None
+        self.pnl = None
+        self.portfolio_pnl = None
+        self.daily_returns = None
+
+
+    @classmethod
+    def from_files(cls, files, pairs, data_subdir="data", fill_policy="drop", max_staleness=None, **kwargs):
+        # Load one CSV per symbol from the data directory and align them on one calendar (see align.py)
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        data_dir = os.path.join(script_dir, data_subdir)
+
+        store = PriceStore(os.path.join(data_dir, ".price_store"))
+        prices, report = load_aligned(
+            store, [os.path.join(data_dir, file) for file in files], [os.path.splitext(file)[0].upper() for file in files],
+            fill_policy=fill_policy, max_staleness=max_staleness,
+        )
+        ub = cls(prices, pairs, **kwargs)
+        ub.alignment = report
+        return ub
+
+
+    def compute_spread(self):
+        values = self.prices.to_numpy(dtype=float)
+        self.price1 = values[:, self.leg1]
+        self.hedged_price2 = self.hedge_ratio * values[:, self.leg2]
+
+        self.spread = self.price1 - self.hedged_price2
+
+        # Rolling statistics over every pair column at once
+        rolling = pd.DataFrame(self.spread).rolling(window=self.window)
+        rolling_mean = rolling.mean().to_numpy()
+        rolling_std = rolling.std().to_numpy()
+
+        self.z_score = (self.spread - rolling_mean) / rolling_std
+
+
+    def generate_signals(self):
+        self.position = pair_positions(self.z_score, self.z_entry, self.z_exit)
+
+
+    def compute_pnl(self):
+        total_cost_rate = self.transaction_costs + self.slippage
+        self.unit_cost, self.units, self.trade_entry, self.cost, self.pnl = spread_pnl(
+            self.position, self.spread, self.price1, self.hedged_price2,
+            self.capital, total_cost_rate, self.positioning_method, self.margin_rate,
+        )
+
+        # Portfolio PnL: sum over pairs, NaN only where no pair has a value yet
+        portfolio_pnl = np.nansum(self.pnl, axis=1)
+        portfolio_pnl[np.isnan(self.pnl).all(axis=1)] = np.nan
+        self.portfolio_pnl = pd.Series(portfolio_pnl, index=self.prices.index)
+
+
+    def compute_metrics(self):
+        if self.portfolio_pnl is None:
+            raise ValueError("PnL not computed yet. Run compute_pnl() first.")
+
+        portfolio_capital = self.capital * len(self.pairs)
+        daily_returns = self.portfolio_pnl / portfolio_capital
+        daily_returns = daily_returns.replace([np.inf, -np.inf], np.nan).dropna()
+        self.daily_returns = daily_returns
+
+        return compute_metrics(daily_returns.to_numpy(), self.bars_per_year())
+
+
+    def bars_per_year(self):
+        # Given annualization factor, or the bar frequency of the price index (252 for daily bars)
+        if self.annualization_factor is not None:
+            return self.annualization_factor
+        return index_annualization_factor(self.prices.index)
+
+
+    def pair_metrics(self):
+        # One row of metrics per pair, from a single 2-D metrics call
+        daily_returns = self.pnl / self.capital
+        factor = self.bars_per_year()
+        metrics = compute_metrics(daily_returns, factor)
+        metrics.update(trade_stats(self.position, self.pnl, factor))
+        return pd.DataFrame(metrics, index=self.labels)
+
+
+    def run_backtest(self, verbose=True, compute_metrics=True):
+        self.compute_spread()
+        self.generate_signals()
+        self.compute_pnl()
+
+        if verbose:
+            cumulative_pnl = self.portfolio_pnl.cumsum().iloc[-1]
+            print("✅ Universe backtest complete")
+            print(f"Pairs: {len(self.pairs)}")
+            print(f"Final cumulative PnL: ${cumulative_pnl:.2f}")
+            print(f"Final cumulative return: {(cumulative_pnl / (self.capital * len(self.pairs))):.2%}")
+            print(f"Total trades: {self.trade_entry.sum()}")
+
+        if compute_metrics:
+            return self.compute_metrics()
@@ -0,0 +1,142 @@
+import itertools
+import multiprocessing as mp
+import os
+import numpy as np
+import pandas as pd
+from robust_spread_arb import PairBacktester
+from rolling import rolling_moments, spread_zscore
+
+# Shared with the worker processes: base params, aligned prices and rolling moments per candidate window
+_STATE = None
+
+
+def make_folds(n_bars, train_size, test_size, step=None, anchored=False):
+    # (train_start, train_end, test_start, test_end) bar indices, end exclusive
+    step = step or test_size
+    folds = []
+    train_start, train_end = 0, train_size
+    while train_end + test_size <= n_bars:
+        folds.append((train_start, train_end, train_end, train_end + test_size))
+        train_end += step
+        if not anchored:
+            train_start += step
+    return folds
+
+
+def estimate_hedge_ratio(price1, price2):
+    # OLS slope of price1 on price2 (with intercept)
+    p1 = np.asarray(price1, dtype=float)
+    p2 = np.asarray(price2, dtype=float)
+    p2_centered = p2 - p2.mean()
+    return float(np.dot(p1 - p1.mean(), p2_centered) / np.dot(p2_centered, p2_centered))
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _evaluate(lo, hi, window, hedge_ratio, z_entry, z_exit):
+    # Run the signal/PnL/metrics stages of PairBacktester on bars [lo, hi) with a precomputed z-score
+    params, data, price1, price2, moments = (_STATE[k] for k in ("params", "data", "price1", "price2", "moments"))
+
+    bt = PairBacktester(**{**params, "window": window, "hedge_ratio": hedge_ratio, "z_entry": z_entry, "z_exit": z_exit})
+    bt.data = data.iloc[lo:hi]
+    spread, z_score = spread_zscore(price1, price2, moments[window], hedge_ratio, lo, hi)
+    bt.spread = pd.Series(spread, index=bt.data.index)
+    bt.z_score = pd.Series(z_score, index=bt.data.index)
+
+    bt.generate_signals()
+    bt.compute_pnl()
+    metrics = bt.compute_metrics()
+    return metrics, bt.pnl, bt.position
+
+
+def _run_fold(fold):
+    train_start, train_end, test_start, test_end = fold
+    price1, price2, candidates, objective = (_STATE[k] for k in ("price1", "price2", "candidates", "objective"))
+
+    # Re-estimate the hedge ratio and the thresholds on the train slice only
+    hedge_ratio = estimate_hedge_ratio(price1[train_start:train_end], price2[train_start:train_end])
+
+    best, best_score = None, -np.inf
+    for window, z_entry, z_exit in candidates:
+        metrics, _, _ = _evaluate(train_start, train_end, window, hedge_ratio, z_entry, z_exit)
+        score = metrics[objective]
+        if np.isfinite(score) and score > best_score:
+            best, best_score = (window, z_entry, z_exit), score
+
+    if best is None:
+        best = candidates[0]
+    window, z_entry, z_exit = best
+
+    # Out-of-sample evaluation on the next slice
+    test_metrics, test_pnl, test_position = _evaluate(test_start, test_end, window, hedge_ratio, z_entry, z_exit)
+
+    index = _STATE["data"].index
+    row = {
+        "train_start": index[train_start],
+        "train_end": index[train_end - 1],
+        "test_start": index[test_start],
+        "test_end": index[test_end - 1],
+        "hedge_ratio": hedge_ratio,
+        "window": window,
+        "z_entry": z_entry,
+        "z_exit": z_exit,
+        f"Train {objective}": best_score,
+        **{f"Test {k}": v for k, v in test_metrics.items()},
+    }
+    return row, test_pnl, test_position
+
+
+def run_walk_forward(base_params, grid, train_size, test_size, step=None, anchored=False, objective="Sharpe Ratio", processes=None):
+    # grid: {"window": [...], "z_entry": [...], "z_exit": [...]} candidates re-selected on every train slice
+    loader = PairBacktester(**base_params)
+    loader.load_data()
+    data = loader.data
+    price1 = data[loader.label1].to_numpy()
+    price2 = data[loader.label2].to_numpy()
+
+    candidates = [
+        (int(w), float(ze), float(zx))
+        for w, ze, zx in itertools.product(grid["window"], grid["z_entry"], grid["z_exit"])
+    ]
+
+    # Rolling moments computed once per window over the full history and shared by every fold:
+    # overlapping train/test slices only index into them (they are backward-looking, so no lookahead)
+    moments = {w: rolling_moments(price1, price2, w) for w in sorted({c[0] for c in candidates})}
+
+    state = {
+        "params": base_params,
+        "data": data,
+        "price1": price1,
+        "price2": price2,
+        "moments": moments,
+        "candidates": candidates,
+        "objective": objective,
+    }
+
+    folds = make_folds(len(data), train_size, test_size, step=step, anchored=anchored)
+    if not folds:
+        raise ValueError("Not enough data for a single train/test fold.")
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(folds) == 1:
+        _init_worker(state)
+        results = [_run_fold(fold) for fold in folds]
+    else:
+        method = "fork" if "fork" in mp.get_all_start_methods() else None
+        with mp.get_context(method).Pool(min(processes, len(folds)), initializer=_init_worker, initargs=(state,)) as pool:
+            results = pool.map(_run_fold, folds)
+
+    fold_table = pd.DataFrame([row for row, _, _ in results])
+
+    # Stitched out-of-sample PnL / positions and their metrics
+    oos_pnl = pd.concat([pnl for _, pnl, _ in results])
+    oos_position = pd.concat([position for _, _, position in results])
+    latest = ~oos_pnl.index.duplicated(keep="last") # Overlapping test slices (step < test_size)
+    loader.pnl = oos_pnl = oos_pnl[latest]
+    loader.position = oos_position[latest]
+    oos_metrics = loader.compute_metrics()
+
+    return fold_table, oos_pnl, oos_metrics